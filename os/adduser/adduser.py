@@ -1,133 +1,155 @@
 import csv
-import requests
-import urllib.parse
+import functools
 import logging
-from dotenv import load_dotenv
 import os
+import sys
 from typing import Optional, Dict, Any
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wppos import config, runner, transport, users
+from wppos import groups as group_directory
 
-# --- Setup environment ---
-env_path = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=env_path)
 
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-SESSION_COOKIE = os.getenv("SESSION_COOKIE")
+TENANT_ID = config.TENANT_ID
+CSV_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "input.csv")
+BASE_URL = config.BASE_URL
 
-headers = {
-    "Authorization": f"Bearer {BEARER_TOKEN}",
-    "Accept": "application/json",
-    "User-Agent": "python-requests/2.31"
-}
+# Memberships packed into one PATCH /api/az/groups/users
+BATCH_SIZE = int(os.getenv("WPP_GROUP_USERS_BATCH_SIZE", "100"))
+# Payload-level rejections: splitting the batch can isolate the bad entry
+BISECT_STATUSES = (400, 409, 422)
 
-cookies = {
-    "session": SESSION_COOKIE
-}
+logger = logging.getLogger(__name__)
 
-TENANT_ID = "4c039217-7d17-4207-8314-98348983718a"
-CSV_FILE_PATH = "input.csv"
-BASE_URL = "https://media.os.wpp.com"
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+@functools.lru_cache(maxsize=None)
+def get_api() -> transport.HttpClient:
+    """Session setup, done on first use so importing this module stays cheap."""
+    import requests
 
-# Session setup
-session = requests.Session()
-session.headers.update({
-    "Authorization": f"Bearer {BEARER_TOKEN}",
-    "Content-Type": "application/json",
-    "Accept": "application/json"
-})
-session.cookies.set("session_cookie_name", SESSION_COOKIE)  # Update cookie name if known
+    bearer_token, session_cookie = config.credentials()
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"Bearer {bearer_token}",
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    })
+    session.cookies.set("session_cookie_name", session_cookie)  # Update cookie name if known
+    # Throttled/retrying wrapper around the session (see wppos/transport.py)
+    return transport.HttpClient(session)
 
 
 def search_group_by_name(group_name: str) -> Optional[str]:
-    encoded_name = urllib.parse.quote(group_name.strip())
-    url = f"{BASE_URL}/api/tenants/{TENANT_ID}/groups?page=1&itemsPerPage=50&sort=name&filter%5Bsearch%5D={encoded_name}"
-
+    """Look the group up in the tenant-wide directory (crawled once per run)."""
     try:
-        response = session.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        for group in data.get("data", []):
-            if group["name"].lower() == group_name.strip().lower():
-                return group["id"]
-        return None
+        return group_directory.get_directory(TENANT_ID, session=get_api()).first_id(group_name)
     except Exception as e:
         logger.error(f"Error searching group '{group_name}': {e}")
         return None
 
 
 def search_user_by_email(email: str) -> Optional[Dict[str, Any]]:
-    encoded_email = urllib.parse.quote(email.strip())
-    url = f"{BASE_URL}/api/users?offset=0&limit=50&sortBy=firstname&orderBy=asc&filter%5Bsearch%5D={encoded_email}"
-
+    """Exact (case-insensitive) email lookup in the local user mirror."""
     try:
-        response = session.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        for user in data.get("data", []):
-            if user.get("email", "").lower() == email.strip().lower():
-                return user
-        return None
+        return users.get_mirror(session=get_api()).find_by_email(email)
     except Exception as e:
         logger.error(f"Error searching user '{email}': {e}")
         return None
 
 
-def assign_user_to_group(group_id: str, user_email: str):
+def assign_users_to_group(group_id: str, user_emails: list) -> Dict[str, tuple]:
+    """
+    Add many users to one group with a single PATCH.
+    Returns {email: (ok, detail)}. A batch rejected for its payload (400,
+    409, 422) is bisected so one bad entry does not fail the whole batch; any
+    other error (expired token, wrong route, ...) fails the batch at once.
+    """
     url = f"{BASE_URL}/api/az/groups/users"
     payload = {
-        "create": [{"groupId": group_id, "userId": user_email}],
+        "create": [{"groupId": group_id, "userId": email} for email in user_emails],
         "delete": []
     }
 
     try:
-        response = session.patch(url, json=payload)
+        response = get_api().patch(url, json=payload)
+    except Exception as e:
+        return {email: (False, f"Exception during PATCH: {e}") for email in user_emails}
 
-        # ✅ Accept 200, 201, 204 as success
-        if response.status_code in (200, 201, 204):
-            logger.info(f"✅ Successfully assigned {user_email} to group {group_id}")
-        else:
-            logger.error(f"❌ Failed to assign {user_email} to group {group_id}. Status: {response.status_code}, Response: {response.text}")
+    # ✅ Accept 200, 201, 204 as success
+    if response.status_code in (200, 201, 204):
+        return {email: (True, None) for email in user_emails}
 
-    except Exception as e:
-        logger.error(f"Exception during PATCH for {user_email}: {e}")
+    if response.status_code in BISECT_STATUSES and len(user_emails) > 1:
+        mid = len(user_emails) // 2
+        results = assign_users_to_group(group_id, user_emails[:mid])
+        results.update(assign_users_to_group(group_id, user_emails[mid:]))
+        return results
+
+    detail = f"Status: {response.status_code}, Response: {response.text}"
+    return {email: (False, detail) for email in user_emails}
 
 
-def assign_users_by_username(username_part: str, group_id: str, row_num: int):
+def find_users_by_username(username_part: str, row_num: int) -> list:
     """
-    Search users by partial name (username before @), assign all matches to group.
+    Search users by partial name (username before @) and return all matching emails.
     """
     logger.info(f"Row {row_num}: Searching users by username fragment: '{username_part}'")
-    url = f"{BASE_URL}/api/users?offset=0&limit=50&sortBy=firstname&orderBy=asc&filter%5Bsearch%5D={urllib.parse.quote(username_part)}"
 
     try:
-        response = session.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        found_any = False
-        for user in data.get("data", []):
+        emails = []
+        # Substring match on username / email / first / last name in the local mirror
+        for user in users.get_mirror(session=get_api()).search(username_part):
             email = user.get("email", "").lower()
-            # Optional: you can match username part exactly if needed
-            # But usually, search API already does fuzzy match
             logger.info(f"Row {row_num}: Found potential match: {email}")
-            assign_user_to_group(group_id, email)
-            found_any = True
+            emails.append(email)
 
-        if not found_any:
+        if not emails:
             logger.warning(f"Row {row_num}: No users found for username '{username_part}'")
+        return emails
 
     except Exception as e:
         logger.error(f"Row {row_num}: Error searching users by username '{username_part}': {e}")
+        return []
+
+
+def assign_pending(pending: Dict[str, Dict[str, list]]):
+    """Send the collected memberships group by group and log one result per row."""
+    batches = []
+    for group_id, members in pending.items():
+        emails = list(members)
+        for start in range(0, len(emails), max(1, BATCH_SIZE)):
+            batches.append((group_id, emails[start:start + BATCH_SIZE]))
+
+    logger.info(f"Assigning users to {len(pending)} group(s) in {len(batches)} batch(es)")
+
+    for outcome in runner.run_ordered(lambda batch: assign_users_to_group(*batch), batches):
+        group_id, emails = outcome.item
+        results = outcome.result if outcome.ok else {
+            email: (False, f"Exception during PATCH: {outcome.error}") for email in emails
+        }
+        for email in emails:
+            ok, detail = results[email]
+            for row_num in pending[group_id][email]:
+                if ok:
+                    logger.info(f"Row {row_num}: ✅ Successfully assigned {email} to group {group_id}")
+                else:
+                    logger.error(f"Row {row_num}: ❌ Failed to assign {email} to group {group_id}. {detail}")
 
 
-def main():
-    with open(CSV_FILE_PATH, mode='r', encoding='utf-8') as csvfile:
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Add users to groups from a GroupName,UserEmail CSV.")
+    parser.add_argument("input", nargs="?", default=CSV_FILE_PATH, help="CSV: GroupName,UserEmail (no header)")
+    args = parser.parse_args(argv)
+
+    # Setup logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # group_id -> {email: [row numbers that asked for it]}
+    pending: Dict[str, Dict[str, list]] = {}
+
+    with open(args.input, mode='r', encoding='utf-8') as csvfile:
         reader = csv.reader(csvfile)
         for row_num, row in enumerate(reader, start=1):
             # Skip if row is completely empty
@@ -163,18 +185,21 @@ def main():
             # First: Try direct email match
             user = search_user_by_email(raw_user_email)
             if user:
-                assign_user_to_group(group_id, raw_user_email)
+                pending.setdefault(group_id, {}).setdefault(raw_user_email, []).append(row_num)
             else:
                 # Fallback: Extract username part (before @) and search broadly
                 if "@" in raw_user_email:
                     username_part = raw_user_email.split("@")[0].strip()
                     if username_part:
-                        assign_users_by_username(username_part, group_id, row_num)
+                        for email in find_users_by_username(username_part, row_num):
+                            pending.setdefault(group_id, {}).setdefault(email, []).append(row_num)
                     else:
                         logger.warning(f"Row {row_num}: Could not extract username from '{raw_user_email}'. Skipping.")
                 else:
                     logger.warning(f"Row {row_num}: Invalid email format '{raw_user_email}'. Skipping.")
 
+    assign_pending(pending)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
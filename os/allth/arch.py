@@ -1,129 +1,163 @@
-import requests
-from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wppos import config, fuzzy, hierarchy, runner, transport
 
 # --- Configuration ---
-TENANT_ID = "4c039217-7d17-4207-8314-98348983718a"
-HIERARCHY_URL = f"https://media.os.wpp.com/api/v2/tenants/{TENANT_ID}/hierarchy-tree"
-PATCH_URL = "https://media.os.wpp.com/api/az/groups/roles"
+TENANT_ID = config.TENANT_ID
+PATCH_URL = f"{config.BASE_URL}/api/az/groups/roles"
+INPUT_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "brands.txt")
 
 # Static group and role IDs
 STATIC_GROUP_ID = "9d3aa2cf-2211-4d34-a844-32b63dcc80c2"
-STATIC_ROLE_ID = "1544916c-0ce0-4042-a8e5-6e18042c73b7"
-
-# --- Load environment ---
-env_path = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=env_path)
-
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-SESSION_COOKIE = os.getenv("SESSION_COOKIE")
-
-if not BEARER_TOKEN or not SESSION_COOKIE:
-    raise ValueError("❌ Missing BEARER_TOKEN or SESSION_COOKIE in .env file")
-
-HEADERS = {
-    "Authorization": f"Bearer {BEARER_TOKEN}",
-    "Accept": "application/json",
-    "Content-Type": "application/json",
-    "User-Agent": "python-requests/2.31"
-}
-
-COOKIES = {
-    "session": SESSION_COOKIE
-}
-
-# --- Step 1: Fetch hierarchy to get account_uid (azId) for each brand ---
-print("🔍 Fetching hierarchy data...")
-response = requests.get(HIERARCHY_URL, headers=HEADERS, cookies=COOKIES)
-
-if response.status_code != 200:
-    print(f"❌ Failed to fetch hierarchy: {response.status_code} - {response.text}")
-    exit(1)
-
-data = response.json()
-mapping = data.get("mapping", {})
-
-# --- Step 2: Read brand names from file ---
-txt_file_path = r"C:\Users\Azath.A\os\clientgroup\brands.txt"
-try:
-    with open(txt_file_path, "r", encoding="utf-8") as file:
-        brand_names = [line.strip() for line in file if line.strip()]
-except FileNotFoundError:
-    print(f"❌ brands.txt not found at {txt_file_path}")
-    exit(1)
-
-print(f"📄 Loaded {len(brand_names)} brand(s) from file.")
-
-# --- Step 3: Match brands to account_uids ---
-accounts_to_assign = []
-
-for brand in brand_names:
-    matched_item = next(
-        (item for item in mapping.values()
-         if item.get("name", "").lower() == brand.lower()),
-        None
-    )
-
-    if matched_item:
-        account_uid = matched_item.get("azId")
-        if account_uid:
-            accounts_to_assign.append({
-                "brand_name": brand,
-                "account_id": account_uid
-            })
-            print(f"✅ Matched '{brand}' → account_uid: {account_uid}")
-        else:
-            print(f"⚠️ No azId found for brand: {brand}")
-    else:
-        print(f"⚠️ Brand '{brand}' not found in hierarchy.")
-
-if not accounts_to_assign:
-    print("🚫 No valid accounts found to assign. Exiting.")
-    exit(0)
-
-# --- Step 4: Assign roles ONE BY ONE ---
-print(f"\n🚀 Starting individual assignments for {len(accounts_to_assign)} account(s)...")
+STATIC_ROLE_ID = config.ROLE_HIERARCHY
 
-success_count = 0
-skip_count = 0
-fail_count = 0
-
-for item in accounts_to_assign:
-    brand_name = item["brand_name"]
-    account_id = item["account_id"]
+# Entries packed into one PATCH (1 = the old one-request-per-account mode)
+BATCH_SIZE = int(os.getenv("WPP_ROLES_BATCH_SIZE", "50"))
 
+# --- Role assignment (batched) ---
+def patch_roles(items):
     payload = {
         "create": [{
             "group_id": STATIC_GROUP_ID,
             "role_id": STATIC_ROLE_ID,
-            "account_id": account_id
-        }],
+            "account_id": item["account_id"]
+        } for item in items],
         "delete": []
     }
+    return transport.patch(PATCH_URL, headers=config.headers(), cookies=config.cookies(), json=payload)
+
+
+def assign_chunk(items):
+    """PATCH one chunk and return [(item, status, detail)] in chunk order.
 
-    print(f"\n➡️  Processing: {brand_name} (account_id: {account_id})")
-    patch_response = requests.patch(PATCH_URL, headers=HEADERS, cookies=COOKIES, json=payload)
+    A 422 means at least one entry already exists and the chunk was rejected,
+    so the chunk is bisected until the existing entries are isolated.
+    """
+    patch_response = patch_roles(items)
 
     if patch_response.status_code == 201:
-        result = patch_response.json()
-        assigned = result[0]  # assuming one item returned
-        print(f"🎉 SUCCESS: Assigned role to {brand_name}")
-        print(f"   ➤ UID: {assigned['uid']}, Group: {assigned['group_uid']}, Account: {assigned['account_uid']}")
-        success_count += 1
-
-    elif patch_response.status_code == 422:
-        error_detail = patch_response.json().get("message", "Unknown error")
-        print(f"🔶 ALREADY EXISTS (422): {error_detail}")
-        skip_count += 1
-
-    else:
-        print(f"❌ FAILED ({patch_response.status_code}): {patch_response.text}")
-        fail_count += 1
-
-# --- Final Summary ---
-print("\n" + "="*60)
-print("✅ ASSIGNMENT SUMMARY:")
-print(f"   Success: {success_count}")
-print(f"   Skipped (Already Exists): {skip_count}")
-print(f"   Failed: {fail_count}")
-print("="*60)
\ No newline at end of file
+        result = patch_response.json() or []
+        by_account = {a.get("account_uid"): a for a in result}
+        outcomes = []
+        for pos, item in enumerate(items):
+            assigned = by_account.get(item["account_id"])
+            if assigned is None and len(result) == len(items):
+                assigned = result[pos]
+            outcomes.append((item, "success", assigned or {}))
+        return outcomes
+
+    if patch_response.status_code == 422 and len(items) > 1:
+        mid = len(items) // 2
+        return assign_chunk(items[:mid]) + assign_chunk(items[mid:])
+
+    if patch_response.status_code == 422:
+        # Never raise mid-bisection: that would drop the siblings' outcomes
+        try:
+            error_detail = (patch_response.json() or {}).get("message", "Unknown error")
+        except (ValueError, AttributeError):
+            error_detail = patch_response.text or "Unknown error"
+        return [(items[0], "skip", error_detail)]
+
+    detail = f"({patch_response.status_code}): {patch_response.text}"
+    return [(item, "fail", detail) for item in items]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Assign the static role to every brand account.")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE_PATH, help="TXT file, one brand per line")
+    args = parser.parse_args(argv)
+
+    bearer_token, session_cookie = config.credentials()
+    if not bearer_token or not session_cookie:
+        raise ValueError("❌ Missing BEARER_TOKEN or SESSION_COOKIE in .env file")
+
+    # --- Step 1: Fetch hierarchy to get account_uid (azId) for each brand ---
+    print("🔍 Fetching hierarchy data...")
+    try:
+        index = hierarchy.get_index(TENANT_ID, headers=config.headers(), cookies=config.cookies())
+    except RuntimeError as e:
+        print(f"❌ Failed to fetch hierarchy: {e}")
+        sys.exit(1)
+
+    # --- Step 2: Read brand names from file ---
+    try:
+        with open(args.input, "r", encoding="utf-8") as file:
+            brand_names = [line.strip() for line in file if line.strip()]
+    except FileNotFoundError:
+        print(f"❌ brands.txt not found at {args.input}")
+        sys.exit(1)
+
+    print(f"📄 Loaded {len(brand_names)} brand(s) from file.")
+
+    # --- Step 3: Match brands to account_uids ---
+    accounts_to_assign = []
+    misses = [brand for brand in brand_names if not index.first(brand)]
+    suggestions = fuzzy.for_hierarchy(index).top_many(misses) if misses else {}
+
+    for brand in brand_names:
+        matched_item = index.first(brand)
+
+        if matched_item:
+            account_uid = matched_item.get("azId")
+            if account_uid:
+                accounts_to_assign.append({
+                    "brand_name": brand,
+                    "account_id": account_uid
+                })
+                print(f"✅ Matched '{brand}' → account_uid: {account_uid}")
+            else:
+                print(f"⚠️ No azId found for brand: {brand}")
+        else:
+            print(f"⚠️ Brand '{brand}' not found in hierarchy.")
+            if suggestions.get(brand):
+                print(f"   💡 Did you mean: {fuzzy.describe(suggestions[brand])}")
+
+    if not accounts_to_assign:
+        print("🚫 No valid accounts found to assign. Exiting.")
+        return
+
+    # --- Step 4: Assign roles in batches ---
+    chunks = [accounts_to_assign[i:i + BATCH_SIZE] for i in range(0, len(accounts_to_assign), max(1, BATCH_SIZE))]
+    print(f"\n🚀 Starting assignments for {len(accounts_to_assign)} account(s) in {len(chunks)} batch(es) of up to {BATCH_SIZE}...")
+
+    success_count = 0
+    skip_count = 0
+    fail_count = 0
+
+    for outcome in runner.run_ordered(assign_chunk, chunks):
+        if outcome.ok:
+            results = outcome.result
+        else:
+            results = [(item, "fail", f"(error): {outcome.error}") for item in outcome.item]
+
+        for item, status, detail in results:
+            brand_name = item["brand_name"]
+            account_id = item["account_id"]
+            print(f"\n➡️  Processing: {brand_name} (account_id: {account_id})")
+
+            if status == "success":
+                print(f"🎉 SUCCESS: Assigned role to {brand_name}")
+                print(f"   ➤ UID: {detail.get('uid')}, Group: {detail.get('group_uid')}, Account: {detail.get('account_uid')}")
+                success_count += 1
+            elif status == "skip":
+                print(f"🔶 ALREADY EXISTS (422): {detail}")
+                skip_count += 1
+            else:
+                print(f"❌ FAILED {detail}")
+                fail_count += 1
+
+    # --- Final Summary ---
+    print("\n" + "="*60)
+    print("✅ ASSIGNMENT SUMMARY:")
+    print(f"   Success: {success_count}")
+    print(f"   Skipped (Already Exists): {skip_count}")
+    print(f"   Failed: {fail_count}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
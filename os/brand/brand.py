@@ -1,62 +1,78 @@
-import requests
-import pandas as pd
+import csv
+import functools
 import os
-import json
-from dotenv import load_dotenv
 import sys
 
-# Define output file path
-OUTPUT_FILE_PATH = r"C:\Users\Azath.A\os\brand\output\output.txt"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wppos import catalog, config, hierarchy, runner, transport, tree_cache
+from wppos.checkpoint import Checkpoint
+from wppos.journal import Journal, Timer
 
-# Open the output file
-output_file = open(OUTPUT_FILE_PATH, "w", encoding="utf-8")
+# Result journal + checkpoint: one record per input item (see wppos/journal.py);
+# `--resume` skips items that already reached a terminal outcome
+HERE = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.path.join(HERE, "output", "journal.jsonl")
+CHECKPOINT_PATH = os.path.join(HERE, "output", "checkpoint.sqlite")
+INPUT_FILE_PATH = os.path.join(HERE, "input.csv")
 
-# Optional: Keep printing to console AND file
-_original_print = print
+COLUMNS = ["Market", "ClientName", "BrandName", "Category"]
 
-def print(*args, **kwargs):
-    # Print to console
-    _original_print(*args, **kwargs)
-    # Print to file
-    sep = kwargs.get("sep", " ")
-    end = kwargs.get("end", "\n")
-    output_file.write(sep.join(map(str, args)) + end)
-    output_file.flush() 
 
+# --- Categories dictionary (category.json, loaded once on first use) ---
+def category_lookup() -> dict:
+    return config.categories()
 
-tenant_id = "4c039217-7d17-4207-8314-98348983718a"
 
-# 🔑 Load credentials
-env_path = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=env_path)
+def get_category_id(category_name: str) -> str:
+    """category.json id of ``category_name`` (case-insensitive)."""
+    cat_id = category_lookup().get(category_name.lower())
+    if not cat_id:
+        raise ValueError(f"Category '{category_name}' not found in category.json")
+    return cat_id
 
-bearer_token = os.getenv("BEARER_TOKEN")
-session_cookie = os.getenv("SESSION_COOKIE")
 
-headers = {
-    "Authorization": f"Bearer {bearer_token}",
-    "Accept": "application/json",
-    "Content-Type": "application/json",
-    "User-Agent": "python-requests/2.31"
-}
-cookies = {"session": session_cookie}
+def get_brand_mdId(brand_name: str) -> str:
+    """mdId of the brand named exactly ``brand_name`` (local /api/brands catalog)."""
+    brands = catalog.get_catalog("brands", headers=config.headers(), cookies=config.cookies())
+    return brands.resolve(brand_name)
 
-# --- Load categories dictionary from file ---
-with open(r"C:\Users\Azath.A\os\category.json", "r", encoding="utf-8") as f:
-    categories_json = json.load(f)
-categories_data = categories_json["data"]
-category_lookup = {c["name"].strip().lower(): c["id"] for c in categories_data}
 
+def resolve_brand_ids(brand_names) -> dict:
+    """mdId (or the lookup error) for each distinct brand name.
 
-def get_brand_mdId(brand_name: str) -> str:
-    """Call /api/brands to get mdId for a given brand name"""
-    url = f"https://media.os.wpp.com/api/brands?page=1&itemsPerPage=50&filter[search]={brand_name}"
-    resp = requests.get(url, headers=headers, cookies=cookies)
-    resp.raise_for_status()
-    data = resp.json().get("data", [])
-    if not data:
-        raise ValueError(f"Brand '{brand_name}' not found in API")
-    return data[0]["id"]  # mdId
+    A name that is missing or ambiguous maps to its ValueError; a failed
+    catalog crawl (RuntimeError) is raised, since it would fail every name.
+    """
+    brand_ids = {}
+    for name in dict.fromkeys(brand_names):
+        try:
+            brand_ids[name] = get_brand_mdId(name)
+        except ValueError as e:
+            brand_ids[name] = e
+    return brand_ids
+
+
+def resolve_parents(index: hierarchy.HierarchyIndex, pairs) -> dict:
+    """(market, client) -> market azId (None if not linked) for each distinct pair.
+
+    Every market named in ``pairs`` is expanded once into its neighbours in
+    both directions: the clients below it and the node above it. A pair
+    resolves to the first market hosting the client, else to a market that
+    sits under the client.
+    """
+    links = {}  # market name -> [(market id, ids below, id above)]
+    parents = {}
+    for market_name, client_name in dict.fromkeys(pairs):
+        if market_name not in links:
+            links[market_name] = [(m_id, set(index.child_ids(m_id)), index.parent_id(m_id))
+                                  for m_id in index.find_ids(market_name, ("MARKET",))]
+        client_ids = set(index.find_ids(client_name, ("CLIENT", "BRAND")))
+        markets = links[market_name]
+        found = next((m_id for m_id, below, _ in markets if below & client_ids), None)
+        if found is None:
+            found = next((m_id for m_id, _, above in markets if above in client_ids), None)
+        parents[(market_name, client_name)] = None if found is None else index.az_ids[found]
+    return parents
 
 
 def get_parentId(market_name: str, client_name: str) -> str:
@@ -64,47 +80,16 @@ def get_parentId(market_name: str, client_name: str) -> str:
     Fetch /hierarchy-tree and get specific market azId
     by validating that the market contains the desired client.
     """
-    url = f"https://media.os.wpp.com/api/v2/tenants/{tenant_id}/hierarchy-tree"
-    resp = requests.get(url, headers=headers, cookies=cookies)
-    resp.raise_for_status()
-    data = resp.json()
-    mapping = data.get("mapping", {})
-
-    market_nodes = {
-        node["azId"]: node
-        for node in mapping.values()
-        if node.get("type") == "MARKET"
-        and node.get("name", "").strip().lower() == market_name.strip().lower()
-    }
-
-    client_nodes = {
-        node["azId"]: node
-        for node in mapping.values()
-        if node.get("type") in ("CLIENT", "BRAND")
-        and node.get("name", "").strip().lower() == client_name.strip().lower()
-    }
-
-    # Try to link market ↔︎ client
-    for m_id, m_node in market_nodes.items():
-        for child in m_node.get("children", []):
-            if child in client_nodes:
-                return m_id  # found the Market hosting this Client!
-
-    for c_id, c_node in client_nodes.items():
-        for child in c_node.get("children", []):
-            if child in market_nodes:
-                return child  # found the Market as child of Client!
-
-    raise ValueError(f"Market '{market_name}' with client '{client_name}' not found.")
+    index = hierarchy.get_index(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+    parent_id = resolve_parents(index, [(market_name, client_name)])[(market_name, client_name)]
+    if parent_id is None:
+        raise ValueError(f"Market '{market_name}' with client '{client_name}' not found.")
+    return parent_id
 
 
 def post_org_unit(brand_name: str, category_name: str, parentId: str, mdId: str):
-    """POST the organization-unit with given details."""
-    cat_id = category_lookup.get(category_name.lower())
-    if not cat_id:
-        raise ValueError(f"Category '{category_name}' not found in category.json")
-
-    url = f"https://media.os.wpp.com/_apps/os-workspaces/api/tenants/{tenant_id}/organization-units?disableTenantCache=true"
+    """POST the organization-unit with given details. Returns (log lines, journal fields)."""
+    cat_id = get_category_id(category_name)
 
     payload = {
         "type": "predefined",
@@ -126,31 +111,131 @@ def post_org_unit(brand_name: str, category_name: str, parentId: str, mdId: str)
         }
     }
 
-    resp = requests.post(url, headers=headers, cookies=cookies, json=payload)
+    with Timer() as t:
+        resp = transport.post(config.ORG_UNITS_URL, headers=config.headers(), cookies=config.cookies(), json=payload)
+    rec = {"status": resp.status_code, "latency_ms": t.ms}
 
     if resp.status_code in (200, 201):  # ✅ Accept success
-        print(f"✅ Created Org Unit for Brand '{brand_name}' under Market {parentId}")
-        # You can also parse and print the new azId if you want:
         created = resp.json()
-        print(f"   ➡️ OrgUnit azId: {created.get('azId')}")
-    else:
-        print(f"❌ Failed POST for {brand_name}: {resp.status_code} {resp.text}")
-
-# --- Run on CSV ---
-csv_file = r"C:\Users\Azath.A\os\brand\input.csv"
-df = pd.read_csv(csv_file, header=None, names=["Market", "ClientName", "BrandName", "Category"])
-
-for _, row in df.iterrows():
+        rec.update(outcome="success", azId=created.get("azId"))
+        return [
+            f"✅ Created Org Unit for Brand '{brand_name}' under Market {parentId}",
+            f"   ➡️ OrgUnit azId: {created.get('azId')}",
+        ], rec
+    rec.update(outcome="exists" if resp.status_code == 409 else "failed", message=resp.text)
+    return [f"❌ Failed POST for {brand_name}: {resp.status_code} {resp.text}"], rec
+
+
+def process_row(row, brand_ids: dict, parents: dict):
+    """Create one CSV row from the pre-resolved lookups (runs on a worker thread).
+    Returns (log lines, journal record)."""
     market_name = row["Market"]          # e.g., Germany
     client_name = row["ClientName"]      # e.g., Amazon
     brand_name = row["BrandName"]        # e.g., 7 Vidas
     category_name = row["Category"]      # e.g., Charities
 
-    print(f"\n🚀 Processing: Market={market_name}, Client={client_name}, Brand={brand_name}, Category={category_name}")
+    lines = [f"\n🚀 Processing: Market={market_name}, Client={client_name}, Brand={brand_name}, Category={category_name}"]
+    rec = {"ids": {}}
+    # Which lookup a ValueError at this point means failed
+    stage = "brand_not_found"
     try:
-        mdId = get_brand_mdId(brand_name)
-        parentId = get_parentId(market_name, client_name)
-        post_org_unit(brand_name, category_name, parentId, mdId)
+        mdId = brand_ids[brand_name]
+        if isinstance(mdId, Exception):
+            raise mdId
+        rec["ids"]["mdId"] = mdId
+        stage = "market_not_found"
+        parentId = parents[(market_name, client_name)]
+        if parentId is None:
+            raise ValueError(f"Market '{market_name}' with client '{client_name}' not found.")
+        rec["ids"]["parentId"] = parentId
+        stage = "category_not_found"
+        get_category_id(category_name)
+    except catalog.AmbiguousName as e:
+        lines.append(f"⚠️ Ambiguous brand: {e}")
+        rec.update(outcome="brand_ambiguous", message=str(e))
+        return lines, rec
+    except ValueError as e:
+        lines.append(f"⚠️ Error: {e}")
+        rec.update(outcome=stage, message=str(e))
+        return lines, rec
     except Exception as e:
-        print(f"⚠️ Error: {e}")
-output_file.close()
\ No newline at end of file
+        lines.append(f"⚠️ Error: {e}")
+        rec.update(outcome="error", message=str(e))
+        return lines, rec
+
+    # Every lookup passed: a failure from here on (even a malformed 2xx body) is retryable
+    try:
+        post_lines, post_rec = post_org_unit(brand_name, category_name, parentId, mdId)
+        lines.extend(post_lines)
+        if post_rec.get("azId"):
+            rec["ids"]["azId"] = post_rec.pop("azId")
+        rec.update(post_rec)
+    except Exception as e:
+        lines.append(f"⚠️ Error: {e}")
+        rec.update(outcome="error", message=str(e))
+    return lines, rec
+
+
+def read_rows(path: str) -> list:
+    """Header-less CSV rows as dicts keyed by COLUMNS."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return [dict(zip(COLUMNS, r + [""] * len(COLUMNS))) for r in csv.reader(f) if any(c.strip() for c in r)]
+
+
+def row_key(row) -> str:
+    return f"{row['Market']},{row['ClientName']},{row['BrandName']},{row['Category']}"
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create brand org-units under (market, client) pairs.")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE_PATH, help="CSV: Market,ClientName,BrandName,Category (no header)")
+    parser.add_argument("--resume", action="store_true", help="skip rows already done in the last run")
+    args = parser.parse_args(argv)
+
+    rows = read_rows(args.input)
+
+    checkpoint = Checkpoint(CHECKPOINT_PATH, resume=args.resume)
+    journal = Journal(JOURNAL_PATH, script="brand", mode="a" if args.resume else "w", checkpoint=checkpoint)
+
+    todo = checkpoint.pending(rows, key=row_key)
+    if len(todo) < len(rows):
+        print(f"⏭️ Resume: skipping {len(rows) - len(todo)} row(s) already done.")
+
+    # Resolve every distinct brand and (market, client) pair once, against one snapshot
+    try:
+        index = hierarchy.get_index(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+    except RuntimeError as e:
+        print(f"❌ Failed to fetch hierarchy: {e}")
+        journal.close()
+        checkpoint.close()
+        sys.exit(1)
+    try:
+        brand_ids = resolve_brand_ids(row["BrandName"] for row in todo)
+    except RuntimeError as e:
+        print(f"❌ Failed to load the brand catalog: {e}")
+        journal.close()
+        checkpoint.close()
+        sys.exit(1)
+    parents = resolve_parents(index, ((row["Market"], row["ClientName"]) for row in todo))
+    print(f"🔎 Resolved {len(brand_ids)} brand(s) and {len(parents)} market/client pair(s) for {len(todo)} row(s).")
+
+    # Rows run concurrently; their log blocks are printed in input order
+    work = functools.partial(process_row, brand_ids=brand_ids, parents=parents)
+    created = 0
+    try:
+        for outcome in runner.run_ordered(work, todo):
+            lines, rec = outcome.result
+            for line in lines:
+                print(line)
+            journal.record(row_key(outcome.item), **rec)
+            created += rec.get("outcome") == "success"
+    finally:
+        tree_cache.invalidate_if(created, config.TENANT_ID)
+    journal.close()
+    checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
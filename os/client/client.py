@@ -1,122 +1,174 @@
-import requests
-import pandas as pd
-from dotenv import load_dotenv
+import csv
+import functools
 import os
-import re
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wppos import catalog, config, fuzzy, hierarchy, runner, tree_cache
+from wppos.checkpoint import Checkpoint
+from wppos.journal import Journal, Timer
+
 # === FILE PATHS ===
-OUTPUT_FILE_PATH = r"C:\Users\Azath.A\os\client\output\output.txt"
-INPUT_FILE_PATH = r"C:\Users\Azath.A\os\client\name.txt"
-ENV_PATH = r"C:\Users\Azath.A\os\auth.env"
-
-TENANT_ID = "4c039217-7d17-4207-8314-98348983718a"
-
-# === File Logging Setup ===
-output_file = open(OUTPUT_FILE_PATH, "w", encoding="utf-8")
-_original_print = print
-def print(*args, **kwargs):
-    """Print to console AND to log file at once."""
-    _original_print(*args, **kwargs)
-    sep = kwargs.get("sep", " ")
-    end = kwargs.get("end", "\n")
-    output_file.write(sep.join(map(str, args)) + end)
-    output_file.flush()
-
-# === Environment Variables ===
-load_dotenv(dotenv_path=ENV_PATH)
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-SESSION_COOKIE = os.getenv("SESSION_COOKIE")
-
-if not BEARER_TOKEN:
-    sys.exit("❌ Missing BEARER_TOKEN in environment file.")
-
-# === HTTP Session Setup ===
-session = requests.Session()
-headers = {
-    "accept": "application/json, text/plain, */*",
-    "content-type": "application/json",
-    "authorization": f"Bearer {BEARER_TOKEN}",
-    "user-agent": "Mozilla/5.0"
-}
-if SESSION_COOKIE:
-    session.headers.update({"cookie": SESSION_COOKIE})
-session.headers.update(headers)
+HERE = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.path.join(HERE, "output", "journal.jsonl")
+CHECKPOINT_PATH = os.path.join(HERE, "output", "checkpoint.sqlite")
+INPUT_FILE_PATH = os.path.join(HERE, "name.txt")
 
 # === Helper: Normalized String Comparison ===
-def normalize_name(name: str) -> str:
-    """Normalize client name for case-insensitive, whitespace-tolerant comparison."""
-    name = name.lower().strip()
-    name = re.sub(r"\s+", " ", name)  # collapse multiple spaces
-    return name
+# Case-insensitive, whitespace-tolerant; also the key of the local client catalog
+normalize_name = catalog.normalize_name
 
 # === Load Client Names from File ===
-ext = os.path.splitext(INPUT_FILE_PATH)[1].lower()
-if ext == ".csv":
-    df = pd.read_csv(INPUT_FILE_PATH)
-    if "ClientName" not in df.columns:
-        raise ValueError("CSV file must contain a 'ClientName' column.")
-    client_names = df["ClientName"].dropna().tolist()
-elif ext == ".txt":
-    with open(INPUT_FILE_PATH, "r", encoding="utf-8") as f:
-        client_names = [line.strip() for line in f if line.strip()]
-else:
+def read_client_names(path: str) -> list:
+    """Client names from a TXT (one per line) or CSV (ClientName column) file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            if "ClientName" not in (reader.fieldnames or []):
+                raise ValueError("CSV file must contain a 'ClientName' column.")
+            return [row["ClientName"].strip() for row in reader if (row["ClientName"] or "").strip()]
+    if ext == ".txt":
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
     raise ValueError("File must be CSV or TXT.")
 
-# === Process Each Client ===
-for client_name in client_names:
-    print(f"\n🔍 Processing client: {client_name}")
-
-    search_url = (
-        f"https://media.os.wpp.com/api/clients"
-        f"?page=1&itemsPerPage=50&filter[search]={client_name}"
-    )
-    resp = session.get(search_url)
-    if resp.status_code != 200:
-        print(f"❌ Failed to search client {client_name}: {resp.status_code}")
-        continue
-
-    data = resp.json()
-    results = data.get("data", [])
-    if not results:
-        print(f"⚠️ Client '{client_name}' not found in API search.")
-        continue
-
-    # Try to find an EXACT normalized match
-    normalized_input = normalize_name(client_name)
-    matched = next(
-        (item for item in results if normalize_name(item["name"]) == normalized_input),
-        None
-    )
-
-    if not matched:
-        print(f"⚠️ No exact match found for '{client_name}'. Closest API hit: {results[0]['name']}")
-        continue
-
-    client_id = matched["id"]
-    print(f"✅ Found exact client '{client_name}' with mdId: {client_id}")
+# === Process One Client (runs on a worker thread) ===
+def process_client(client_name: str, index: hierarchy.HierarchyIndex, matches: dict,
+                   clients: catalog.MasterCatalog, suggestions: dict = None):
+    """Match + create one client. Returns (log lines, journal record).
+
+    ``matches`` maps each input name to its exact catalog entries (see
+    ``MasterCatalog.resolve_many``); ``index`` is the hierarchy snapshot used
+    to skip clients that already exist; ``suggestions`` holds fuzzy matches
+    (wppos/fuzzy.py) for names without an exact match.
+    """
+    api = config.api()
+    lines = [f"\n🔍 Processing client: {client_name}"]
+    rec = {"ids": {}}
+
+    # Exact normalized match from the local /api/clients catalog
+    found = matches.get(client_name) or []
+    if not found:
+        closest = clients.closest(client_name)
+        if closest is None:
+            lines.append(f"⚠️ Client '{client_name}' not found in API search.")
+            rec.update(outcome="not_found")
+        else:
+            lines.append(f"⚠️ No exact match found for '{client_name}'. Closest API hit: {closest['name']}")
+            rec.update(outcome="no_exact_match", message=f"Closest API hit: {closest['name']}")
+        similar = (suggestions or {}).get(client_name)
+        if similar:
+            lines.append(f"   💡 Did you mean: {fuzzy.describe(similar)}")
+            rec["suggestions"] = [s.name for s in similar]
+        return lines, rec
+    if len(found) > 1:
+        error = catalog.AmbiguousName("clients", client_name, found)
+        lines.append(f"⚠️ Ambiguous client: {error}")
+        rec.update(outcome="ambiguous", message=str(error))
+        return lines, rec
+
+    client_id = found[0]["id"]
+    rec["ids"]["mdId"] = client_id
+    lines.append(f"✅ Found exact client '{client_name}' with mdId: {client_id}")
+
+    existing = index.find_by_mdid(client_id, ("CLIENT",))
+    if existing:
+        lines.append(f"ℹ️ Org-unit for '{client_name}' already exists → skipping.")
+        rec["ids"]["azId"] = existing[0].get("azId")
+        rec.update(outcome="exists", message="already in hierarchy snapshot")
+        return lines, rec
 
     # === Step 2: Create Organization Unit ===
-    post_url = (
-        f"https://media.os.wpp.com/_apps/os-workspaces/api/tenants/"
-        f"{TENANT_ID}/organization-units?disableTenantCache=true"
-    )
     payload = {
         "type": "predefined",
         "categories": [],
         "data": {"mdId": client_id}
     }
 
-    resp = session.post(post_url, json=payload)
+    with Timer() as t:
+        resp = api.post(config.ORG_UNITS_URL, json=payload)
+    rec.update(status=resp.status_code, latency_ms=t.ms)
 
     if resp.status_code in (200, 201):
-        print(f"✅ Successfully created org-unit for '{client_name}' →",
-              resp.json().get("status", "LIVE"))
+        created = resp.json()
+        lines.append(f"✅ Successfully created org-unit for '{client_name}' → "
+                     f"{created.get('status', 'LIVE')}")
+        rec["ids"]["azId"] = created.get("azId")
+        rec.update(outcome="success")
     elif resp.status_code == 409:
-        print(f"ℹ️ Org-unit for '{client_name}' already exists → skipping.")
+        lines.append(f"ℹ️ Org-unit for '{client_name}' already exists → skipping.")
+        rec.update(outcome="exists")
     else:
-        print(f"❌ Failed for {client_name}: {resp.status_code}")
-        print("Response:", resp.text)
-
-# === Close Log File ===
-output_file.close()
\ No newline at end of file
+        lines.append(f"❌ Failed for {client_name}: {resp.status_code}")
+        lines.append(f"Response: {resp.text}")
+        rec.update(outcome="failed", message=resp.text)
+    return lines, rec
+
+
+# === Main ===
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate clients and create their org-units.")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE_PATH, help="TXT or CSV file of client names")
+    parser.add_argument("--resume", action="store_true", help="skip clients already done in the last run")
+    args = parser.parse_args(argv)
+
+    config.require_token()
+    client_names = read_client_names(args.input)
+
+    # Result journal + checkpoint (`--resume` re-drives only unfinished clients)
+    checkpoint = Checkpoint(CHECKPOINT_PATH, resume=args.resume)
+    journal = Journal(JOURNAL_PATH, script="client", mode="a" if args.resume else "w", checkpoint=checkpoint)
+
+    # Existing CLIENT org-units (shared snapshot cache) let us skip the POST
+    # for clients that are already in the hierarchy instead of finding out through a 409.
+    try:
+        index = hierarchy.get_index(config.TENANT_ID, session=config.api())
+    except RuntimeError as e:
+        print(f"⚠️ Could not load hierarchy snapshot, relying on POST results: {e}")
+        index = hierarchy.HierarchyIndex({})
+
+    todo = checkpoint.pending(client_names)
+    if len(todo) < len(client_names):
+        print(f"⏭️ Resume: skipping {len(client_names) - len(todo)} client(s) already done.")
+
+    # Match every name against the local /api/clients catalog in one pass
+    clients = catalog.get_catalog("clients", session=config.api())
+    try:
+        matches = clients.resolve_many(todo)
+    except RuntimeError as e:
+        print(f"❌ Failed to load the client catalog: {e}")
+        journal.close()
+        checkpoint.close()
+        sys.exit(1)
+    print(f"📚 Client catalog: {len(clients)} entries, {sum(1 for m in matches.values() if m)}/{len(matches)} name(s) matched.")
+
+    # Near-miss suggestions for the unmatched names, from the same local catalog
+    misses = [name for name, found in matches.items() if not found]
+    suggestions = fuzzy.for_catalog(clients).top_many(misses) if misses else {}
+
+    # Process each client (concurrently, logged in input order)
+    work = functools.partial(process_client, index=index, matches=matches, clients=clients,
+                             suggestions=suggestions)
+    created = 0
+    try:
+        for outcome in runner.run_ordered(work, todo):
+            if outcome.ok:
+                lines, rec = outcome.result
+            else:
+                lines = [f"\n🔍 Processing client: {outcome.item}", f"❌ Failed for {outcome.item}: {outcome.error}"]
+                rec = {"outcome": "error", "message": str(outcome.error)}
+            for line in lines:
+                print(line)
+            journal.record(outcome.item, **rec)
+            created += rec.get("outcome") == "success"
+    finally:
+        tree_cache.invalidate_if(created, config.TENANT_ID)
+    journal.close()
+    checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,78 +1,64 @@
-import re
+import os
+import sys
 
-def parse_log_file(input_filename):
-    with open(input_filename, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Split by "🔍 Processing client: " to get each client block
-    blocks = content.split('🔍 Processing client: ')[1:]  # Skip first empty if any
-
-    success_clients = []
-    not_found_clients = []
-    already_exists_409_clients = []
-    unable_to_do_400_clients = []
-
-    for block in blocks:
-        lines = block.strip().splitlines()
-        if not lines:
-            continue
-
-        # First line is client name
-        client_name = lines[0].strip()
-
-        # Join remaining lines for easier parsing
-        body = '\n'.join(lines[1:])
-
-        # Check for success
-        if '✅ Successfully created' in body:
-            success_clients.append(client_name)
-            continue
-
-        # Check for 400 error
-        if '❌ Failed for' in body and ': 400' in body:
-            unable_to_do_400_clients.append(client_name)
-            continue
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from wppos import logparse
+from wppos.journal import latest_records
 
-        # Check for 409 error
-        if 'Found exact client' in body:
-            already_exists_409_clients.append(client_name)
-            continue
-
-        # Check for "not found" messages
-        if ("⚠️ Client '" + client_name + "' not found in API search.") in body or \
-           ("⚠️ Not found in hierarchy: " + client_name) in body:
-            not_found_clients.append(client_name)
-            continue
-
-        # Fallback: if none match, log as unknown (optional, you can skip or classify differently)
-        # For now, we'll treat unclassified as not found
-        not_found_clients.append(client_name)
-
-    # Write to files
-    with open('success.txt', 'w', encoding='utf-8') as f:
-        for client in success_clients:
-            f.write(client + '\n')
-
-    with open('not_found.txt', 'w', encoding='utf-8') as f:
-        for client in not_found_clients:
-            f.write(client + '\n')
-
-    with open('already_exists_409.txt', 'w', encoding='utf-8') as f:
-        for client in already_exists_409_clients:
-            f.write(client + '\n')
-
-    with open('unable_to_do_400.txt', 'w', encoding='utf-8') as f:
-        for client in unable_to_do_400_clients:
-            f.write(client + '\n')
-
-    print(f"✅ Success: {len(success_clients)} clients")
-    print(f"⚠️ Not Found: {len(not_found_clients)} clients")
-    print(f"❌ Already Exists (409): {len(already_exists_409_clients)} clients")
-    print(f"❌ Unable to Do (400): {len(unable_to_do_400_clients)} clients")
-    print("📁 Files written: success.txt, not_found.txt, already_exists_409.txt, unable_to_do_400.txt")
+def parse_log_file(input_filename):
+    """Legacy output.txt log: streamed in one pass by wppos.logparse (bounded memory)."""
+    dialect, counts = logparse.classify_file(input_filename, ".")
+    logparse.print_summary(input_filename, dialect, counts)
+
+
+def write_lines(filename, entries):
+    with open(filename, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(entry + '\n')
+
+
+def parse_journal(input_filename):
+    """Bucket the JSONL journal written by client.py (no text parsing needed)."""
+    buckets = {
+        'success.txt': [],
+        'not_found.txt': [],
+        'ambiguous.txt': [],
+        'already_exists_409.txt': [],
+        'unable_to_do_400.txt': [],
+        'failed_other.txt': [],
+    }
+
+    for rec in latest_records(input_filename):
+        outcome = rec.get('outcome')
+        if outcome == 'success':
+            buckets['success.txt'].append(rec['key'])
+        elif outcome == 'ambiguous':
+            buckets['ambiguous.txt'].append(f"{rec['key']} | {rec.get('message', '')}")
+        elif outcome == 'exists':
+            buckets['already_exists_409.txt'].append(rec['key'])
+        elif outcome == 'failed' and rec.get('status') == 400:
+            buckets['unable_to_do_400.txt'].append(rec['key'])
+        elif outcome in ('failed', 'error'):
+            buckets['failed_other.txt'].append(f"{rec['key']} | {rec.get('status', '')} {rec.get('message', '')}".rstrip())
+        else:
+            buckets['not_found.txt'].append(rec['key'])
+
+    for filename, entries in buckets.items():
+        write_lines(filename, entries)
+
+    print(f"✅ Success: {len(buckets['success.txt'])} clients")
+    print(f"⚠️ Not Found: {len(buckets['not_found.txt'])} clients")
+    print(f"⚠️ Ambiguous: {len(buckets['ambiguous.txt'])} clients")
+    print(f"❌ Already Exists (409): {len(buckets['already_exists_409.txt'])} clients")
+    print(f"❌ Unable to Do (400): {len(buckets['unable_to_do_400.txt'])} clients")
+    print(f"❗ Other Failures: {len(buckets['failed_other.txt'])} clients")
+    print("📁 Files written: " + ", ".join(buckets))
 
 
 # Usage
 if __name__ == "__main__":
-    input_file = "output.txt"  # <-- Change this to your actual input filename
-    parse_log_file(input_file)
\ No newline at end of file
+    input_file = "journal.jsonl"  # <-- or a legacy output.txt log
+    if input_file.endswith(".jsonl"):
+        parse_journal(input_file)
+    else:
+        parse_log_file(input_file)
\ No newline at end of file
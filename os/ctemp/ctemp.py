@@ -1,107 +1,148 @@
+import csv
 import os
-import requests
-from dotenv import load_dotenv
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wppos import config, hierarchy
 
 # --- Config ---
-TENANT_ID = "4c039217-7d17-4207-8314-98348983718a"
-HIERARCHY_URL = f"https://media.os.wpp.com/api/v2/tenants/{TENANT_ID}/hierarchy-tree"
+TENANT_ID = config.TENANT_ID
 
 MARKET_NAME = "Germany"  # static market
-INPUT_PATH = r"C:\Users\Azath.A\os\ctemp\brands.txt"  # one name per line (client or brand)
-
-# --- Auth ---
-ENV_PATH = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=ENV_PATH)
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-SESSION_COOKIE = os.getenv("SESSION_COOKIE")
-
-headers = {
-    "Authorization": f"Bearer {BEARER_TOKEN}",
-    "Accept": "application/json",
-    "User-Agent": "python-requests/2.31",
-}
-cookies = {"session": SESSION_COOKIE} if SESSION_COOKIE else {}
-
-def _norm(s: str) -> str:
-    return (s or "").strip().lower()
-
-def fetch_tree():
-    resp = requests.get(HIERARCHY_URL, headers=headers, cookies=cookies)
-    resp.raise_for_status()
-    mapping = resp.json().get("mapping", {}) or {}
-    # Build indexes
-    nodes_by_id = {}
-    for node in mapping.values():
-        az = node.get("azId")
-        if az:
-            nodes_by_id[az] = node
-
-    parent_of = {}
-    for node in nodes_by_id.values():
-        for child in (node.get("children") or []):
-            parent_of[child] = node["azId"]
-
-    # Find the Germany market azId
-    market_azid = None
-    for node in nodes_by_id.values():
-        if node.get("type") == "MARKET" and _norm(node.get("name")) == _norm(MARKET_NAME):
-            market_azid = node.get("azId")
-            break
-    if not market_azid:
-        raise RuntimeError(f"Market '{MARKET_NAME}' not found in hierarchy.")
-
-    # Name index for CLIENT/BRAND
-    name_index = {}
-    for node in nodes_by_id.values():
-        if node.get("type") in ("CLIENT", "BRAND"):
-            name_index.setdefault(_norm(node.get("name")), []).append(node)
-
-    return nodes_by_id, parent_of, name_index, market_azid
-
-def ascend_to_client_if_in_market(start_azid, market_azid, nodes_by_id, parent_of):
-    """Walk up parents from start_azid. Return client azId if the chain includes the target market."""
-    seen = set()
-    current = start_azid
-    client_azid = None
-    in_market_chain = False
-
-    while current and current not in seen:
-        seen.add(current)
-        node = nodes_by_id.get(current)
-        if not node:
-            break
-        if node.get("type") == "CLIENT" and client_azid is None:
-            client_azid = current
-        if current == market_azid:
-            in_market_chain = True
-        current = parent_of.get(current)
-
-    if in_market_chain and client_azid:
-        return client_azid
-    return None
-
-def resolve_client_azid_in_market(name, nodes_by_id, parent_of, name_index, market_azid):
-    candidates = name_index.get(_norm(name), [])
-    # Prefer CLIENT nodes over BRAND nodes when names collide
-    candidates.sort(key=lambda n: 0 if n.get("type") == "CLIENT" else 1)
-    for cand in candidates:
-        client_azid = ascend_to_client_if_in_market(cand.get("azId"), market_azid, nodes_by_id, parent_of)
+INPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "brands.txt")  # one name per line (client or brand)
+
+def fetch_tree(market_name=MARKET_NAME):
+    index = hierarchy.get_index(TENANT_ID, headers=config.headers(), cookies=config.cookies())
+
+    # Find the market azId (Germany unless overridden)
+    market = index.first(market_name, ("MARKET",))
+    if not market:
+        raise RuntimeError(f"Market '{market_name}' not found in hierarchy.")
+
+    return index, market["azId"]
+
+def ascend_to_client_if_in_market(start_azid, market_azid, index):
+    """Return the client azId owning start_azid if the target market is above it (at any depth)."""
+    node_id = index.node_id(start_azid)
+    market_id = index.node_id(market_azid)
+    if node_id is None or market_id is None:
+        return None
+
+    # Both answers come from the index's ancestry tables in O(1), no parent walk
+    if not index.is_ancestor(market_id, node_id):
+        return None
+    client_id = index.nearest_ancestor(node_id, "CLIENT")
+    return index.az_ids[client_id] if client_id != hierarchy.NO_NODE else None
+
+def resolve_client_azid_in_market(name, index, market_azid):
+    # find() already ranks CLIENT nodes before BRAND nodes when names collide
+    for cand in index.find(name, ("CLIENT", "BRAND")):
+        client_azid = ascend_to_client_if_in_market(cand["azId"], market_azid, index)
         if client_azid:
             return client_azid
     return None
 
-def main():
-    nodes_by_id, parent_of, name_index, market_azid = fetch_tree()
-
-    # Read a single input file with one name per line (client or brand)
-    with open(INPUT_PATH, "r", encoding="utf-8") as f:
-        names = [line.strip() for line in f if line.strip()]
-
+# --- Batch input (streamed) ---
+
+def read_names(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+def read_pairs(path):
+    """(name, market) rows of a CSV file; a name,market header row is skipped."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or not row[0].strip() or not row[1].strip():
+                continue
+            name, market = row[0].strip(), row[1].strip()
+            if (name.lower(), market.lower()) == ("name", "market"):
+                continue
+            yield name, market
+
+def cross_pairs(names, markets):
+    """Every name with every market (name-major, so each name is looked up once)."""
     for name in names:
-        client_azid = resolve_client_azid_in_market(name, nodes_by_id, parent_of, name_index, market_azid)
-        if client_azid:
-            # Only print: clientAzId,marketAzId
-            print(f"{client_azid},{market_azid}")
+        for market in markets:
+            yield name, market
+
+def client_in_markets(candidate_ids, market_ids, index):
+    """(clientAzId, marketAzId) for the first candidate under any of market_ids, else (None, None).
+
+    A market name usually has one MARKET node per client, so every node with
+    that name counts, not only the first one.
+    """
+    for node_id in candidate_ids:
+        for market_id in index.ancestors_of_type(node_id, "MARKET"):
+            if market_id in market_ids:
+                client_id = index.nearest_ancestor(node_id, "CLIENT")
+                if client_id != hierarchy.NO_NODE:
+                    return index.az_ids[client_id], index.az_ids[market_id]
+                break
+    return None, None
+
+def resolve_pairs(index, pairs):
+    """Yield (name, market, clientAzId or None, marketAzId or None) per pair, in input order.
+
+    All pairs run against the one index; each market name is looked up once
+    and a missing market is reported once on stderr.
+    """
+    markets = {}             # market name -> MARKET node ids
+    candidates = (None, [])  # last name -> its CLIENT/BRAND node ids
+    for name, market in pairs:
+        if market not in markets:
+            markets[market] = frozenset(index.find_ids(market, ("MARKET",)))
+            if not markets[market]:
+                print(f"⚠️ Market '{market}' not found in hierarchy.", file=sys.stderr)
+        if candidates[0] != name:
+            # find_ids() already ranks CLIENT nodes before BRAND nodes when names collide
+            candidates = (name, index.find_ids(name, ("CLIENT", "BRAND")))
+        client_azid, market_azid = client_in_markets(candidates[1], markets[market], index)
+        yield name, market, client_azid, market_azid
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print clientAzId,marketAzId for names under one or more markets.")
+    parser.add_argument("input", nargs="?", default=INPUT_PATH, help="TXT file, one client or brand name per line")
+    parser.add_argument("--market", action="append", dest="markets",
+                        help=f"market name, repeatable: every name is checked in every market (default: {MARKET_NAME})")
+    parser.add_argument("--markets-file", help="TXT file, one market name per line (crossed with the names)")
+    parser.add_argument("--pairs", help="CSV file of name,market rows instead of names x markets")
+    parser.add_argument("--full", action="store_true",
+                        help="print name,market,clientAzId,marketAzId for every pair, misses included")
+    parser.add_argument("--out", help="write the CSV here instead of stdout")
+    args = parser.parse_args(argv)
+
+    markets = list(args.markets or [])
+    if args.markets_file:
+        markets.extend(read_names(args.markets_file))
+    if args.pairs:
+        if markets:
+            parser.error("--pairs already names the market of every row")
+        pairs = read_pairs(args.pairs)
+    else:
+        pairs = cross_pairs(read_names(args.input), list(dict.fromkeys(markets or [MARKET_NAME])))
+
+    # One snapshot for every market
+    index = hierarchy.get_index(TENANT_ID, headers=config.headers(), cookies=config.cookies())
+
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        writer = csv.writer(out, lineterminator="\n")
+        if args.full:
+            writer.writerow(["name", "market", "clientAzId", "marketAzId"])
+        # Rows are written as they resolve, so huge inputs never sit in memory
+        for name, market, client_azid, market_azid in resolve_pairs(index, pairs):
+            if args.full:
+                writer.writerow([name, market, client_azid or "", market_azid or ""])
+            elif client_azid:
+                # Only print: clientAzId,marketAzId
+                writer.writerow([client_azid, market_azid])
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,103 +1,59 @@
-import requests, csv, json
-import pandas as pd
-from dotenv import load_dotenv
 import os
 import sys
 
-# Define output file path
-OUTPUT_FILE_PATH = r"C:\Users\Azath.A\os\group\output\output.txt"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wppos import config, hierarchy, transport
+from wppos.checkpoint import Checkpoint
+from wppos.journal import Journal, Timer
+from wppos import groups as group_directory
 
-# Open the output file
-output_file = open(OUTPUT_FILE_PATH, "w", encoding="utf-8")
-
-# Optional: Keep printing to console AND file
-_original_print = print
-
-def print(*args, **kwargs):
-    # Print to console
-    _original_print(*args, **kwargs)
-    # Print to file
-    sep = kwargs.get("sep", " ")
-    end = kwargs.get("end", "\n")
-    output_file.write(sep.join(map(str, args)) + end)
-    output_file.flush() 
-
-# --- Setup ---
-tenant_id = "4c039217-7d17-4207-8314-98348983718a"
-
-# --- Setup environment ---
-env_path = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=env_path)
-
-bearer_token = os.getenv("BEARER_TOKEN")
-session_cookie = os.getenv("SESSION_COOKIE")
-
-headers = {
-    "Authorization": f"Bearer {bearer_token}",
-    "Accept": "application/json",
-    "Content-Type": "application/json",
-    "User-Agent": "python-requests/2.31"
-}
-cookies = {"session": session_cookie}
+# Result journal + checkpoint: one record per input item (see wppos/journal.py);
+# `--resume` skips items that already reached a terminal outcome
+HERE = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.path.join(HERE, "output", "journal.jsonl")
+CHECKPOINT_PATH = os.path.join(HERE, "output", "checkpoint.sqlite")
+INPUT_FILE_PATH = os.path.join(HERE, "brands.txt")
 
 # --- Static Role IDs ---
-ROLE_HIERARCHY = "1544916c-0ce0-4042-a8e5-6e18042c73b7"
-ROLE_ARCHITECT = "6948d8e6-eca6-4c12-9241-a47db34db467"
+ROLE_HIERARCHY = config.ROLE_HIERARCHY
+ROLE_ARCHITECT = config.ROLE_ARCHITECT
 
 # --- Helper Functions ---
 
 def get_azid_for_brand(brand_name: str):
     """Look up azId (account_uid) for a brand from hierarchy-tree (case-insensitive)."""
-    url_hierarchy = f"https://media.os.wpp.com/api/v2/tenants/{tenant_id}/hierarchy-tree"
-    r = requests.get(url_hierarchy, headers=headers, cookies=cookies)
-    if r.status_code not in (200, 201):
-        raise RuntimeError(f"Hierarchy API failed: {r.status_code} - {r.text}")
-    data = r.json()
-    return next(
-        (item.get("azId") for item in data.get("mapping", {}).values()
-         if item.get("name", "").strip().lower() == brand_name.strip().lower()),
-        None
-    )
+    index = hierarchy.get_index(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+    node = index.first(brand_name)
+    return node.get("azId") if node else None
 
 def check_group_exists(brand_name: str):
-    """Check if group exists for brand (case-insensitive match)."""
-    url_groups = f"https://media.os.wpp.com/api/tenants/{tenant_id}/groups"
-    params = {
-        "page": 1,
-        "itemsPerPage": 50,
-        "sort": "name",
-        "filter[search]": brand_name
-    }
-    r = requests.get(url_groups, headers=headers, cookies=cookies, params=params)
-    if r.status_code not in (200, 201):
-        raise RuntimeError(f"Groups API failed: {r.status_code} - {r.text}")
-    data = r.json()
-    # Make results truly case-insensitive by filtering manually
-    return [
-        g for g in data.get("data", [])
-        if g.get("name", "").strip().lower() == brand_name.strip().lower()
-    ]
+    """Check if group exists for brand (case-insensitive match, tenant-wide directory)."""
+    directory = group_directory.get_directory(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+    return directory.find(brand_name)
 
 def create_group(brand_name: str, account_uid: str):
     """Create group in /az/groups."""
-    url_post = "https://media.os.wpp.com/api/az/groups"
+    url_post = f"{config.BASE_URL}/api/az/groups"
     payload = {
         "account_uid": account_uid,
         "name": brand_name,
         "description": f"Client : {brand_name}",
         "custom_data": {}
     }
-    r = requests.post(url_post, headers=headers, cookies=cookies, json=payload)
+    r = transport.post(url_post, headers=config.headers(), cookies=config.cookies(), json=payload)
     if r.status_code not in (200, 201):  # ✅ 201 is now success
         raise RuntimeError(f"Create group failed: {r.status_code} - {r.text}")
-    return r.json()
+    group = r.json()
+    # Keep the directory in sync so later rows see the new group
+    group_directory.get_directory(config.TENANT_ID, headers=config.headers(), cookies=config.cookies()).add(group)
+    return group
 
 
 def patch_group_users():
     """Patch users endpoint (empty payload for now)."""
-    url_patch_users = "https://media.os.wpp.com/api/az/groups/users"
+    url_patch_users = f"{config.BASE_URL}/api/az/groups/users"
     payload = {"create": [], "delete": []}
-    r = requests.patch(url_patch_users, headers=headers, cookies=cookies, json=payload)
+    r = transport.patch(url_patch_users, headers=config.headers(), cookies=config.cookies(), json=payload)
     if r.status_code not in (200, 201, 204):  # ✅ accept 201/204 too
         raise RuntimeError(f"Patch users failed: {r.status_code} - {r.text}")
     return r.text if r.text else "{}"  # return at least an empty JSON string
@@ -105,7 +61,7 @@ def patch_group_users():
 
 def patch_group_roles(group_uid: str, account_uid: str):
     """Patch roles for a group (Hierarchy & Architect)."""
-    url_patch_roles = "https://media.os.wpp.com/api/az/groups/roles"
+    url_patch_roles = f"{config.BASE_URL}/api/az/groups/roles"
     payload = {
         "create": [
             {
@@ -121,62 +77,100 @@ def patch_group_roles(group_uid: str, account_uid: str):
         ],
         "delete": []
     }
-    r = requests.patch(url_patch_roles, headers=headers, cookies=cookies, json=payload)
+    r = transport.patch(url_patch_roles, headers=config.headers(), cookies=config.cookies(), json=payload)
     if r.status_code not in (200, 201, 204):  # ✅ handle all success statuses
         raise RuntimeError(f"Patch roles failed: {r.status_code} - {r.text}")
     return r.json() if r.text else {}
 
-# --- Main Workflow ---
-txt_file_path = r"C:\Users\Azath.A\os\group\brands.txt"
-with open(txt_file_path, "r", encoding="utf-8") as file:
-    brand_names = [line.strip() for line in file if line.strip()]
-
-for brand_name in brand_names:
-    print(f"\n🔎 Processing brand: {brand_name}")
-
-    # Step 1: Get azId (account_uid) with error handling
-    try:
-        account_uid = get_azid_for_brand(brand_name)
-    except RuntimeError as e:
-        print(f"❌ Failed to fetch azId for '{brand_name}': {e}")
-        continue
-
-    if not account_uid:
-        print(f"⚠️ No azId found for '{brand_name}' in hierarchy tree. Skipping.")
-        continue
 
-    # Step 2: Check if group already exists
-    try:
-        groups = check_group_exists(brand_name)
-    except RuntimeError as e:
-        print(f"❌ Failed to check groups for '{brand_name}': {e}")
-        continue
-
-    if groups:
-        for g in groups:
-            print(f"📂 Group already exists → id: {g['id']} | name: {g['name']}")
-        continue
-
-    # Step 3: Create new group
-    try:
-        group = create_group(brand_name, account_uid)
-        group_uid = group["uid"]
-        print(f"✅ Created group → uid: {group_uid}, name: {group['name']}")
-    except Exception as e:
-        print(f"❌ Failed to create group for '{brand_name}': {e}")
-        continue
-
-    # Step 4: Patch users (noop)
-    try:
-        patch_group_users()
-        print("👤 Patched users (noop).")
-    except Exception as e:
-        print(f"❌ Failed to patch users for '{brand_name}': {e}")
-
-    # Step 5: Patch roles
+def assign_roles(journal, brand_name: str, group_uid: str, account_uid: str, **rec):
+    """Patch roles for a group and journal the brand; a failure stays retryable with --resume."""
+    ids = {"azId": account_uid, "groupId": group_uid}
     try:
         roles = patch_group_roles(group_uid, account_uid)
         print(f"🔑 Patched roles successfully → {len(roles)} roles assigned.")
+        journal.record(brand_name, "created", ids=ids, roles_assigned=len(roles), **rec)
     except Exception as e:
         print(f"❌ Failed to patch roles for '{brand_name}': {e}")
-output_file.close()
\ No newline at end of file
+        journal.record(brand_name, "roles_failed", ids=ids, message=f"roles: {e}", roles_assigned=0, **rec)
+
+# --- Main Workflow ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create a group (with roles) for each brand.")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE_PATH, help="TXT file, one brand per line")
+    parser.add_argument("--resume", action="store_true", help="skip brands already done in the last run")
+    args = parser.parse_args(argv)
+
+    with open(args.input, "r", encoding="utf-8") as file:
+        brand_names = [line.strip() for line in file if line.strip()]
+
+    checkpoint = Checkpoint(CHECKPOINT_PATH, resume=args.resume)
+    journal = Journal(JOURNAL_PATH, script="group", mode="a" if args.resume else "w", checkpoint=checkpoint)
+
+    todo = checkpoint.pending(brand_names)
+    if len(todo) < len(brand_names):
+        print(f"⏭️ Resume: skipping {len(brand_names) - len(todo)} brand(s) already done.")
+
+    for brand_name in todo:
+        print(f"\n🔎 Processing brand: {brand_name}")
+
+        # Step 1: Get azId (account_uid) with error handling
+        try:
+            account_uid = get_azid_for_brand(brand_name)
+        except RuntimeError as e:
+            print(f"❌ Failed to fetch azId for '{brand_name}': {e}")
+            journal.record(brand_name, "azid_failed", message=str(e))
+            continue
+
+        if not account_uid:
+            print(f"⚠️ No azId found for '{brand_name}' in hierarchy tree. Skipping.")
+            journal.record(brand_name, "no_azid")
+            continue
+
+        # Step 2: Check if group already exists
+        try:
+            groups = check_group_exists(brand_name)
+        except RuntimeError as e:
+            print(f"❌ Failed to check groups for '{brand_name}': {e}")
+            journal.record(brand_name, "check_failed", ids={"azId": account_uid}, message=str(e))
+            continue
+
+        if groups:
+            for g in groups:
+                print(f"📂 Group already exists → id: {g['id']} | name: {g['name']}")
+            if checkpoint.outcome(brand_name) == "roles_failed":
+                # Created by an earlier run whose role patch failed: only redo that
+                assign_roles(journal, brand_name, groups[0]["id"], account_uid, name=groups[0]["name"])
+                continue
+            journal.record(brand_name, "exists", ids={"azId": account_uid, "groupId": groups[0]["id"]},
+                           name=groups[0]["name"])
+            continue
+
+        # Step 3: Create new group
+        try:
+            with Timer() as t:
+                group = create_group(brand_name, account_uid)
+            group_uid = group["uid"]
+            print(f"✅ Created group → uid: {group_uid}, name: {group['name']}")
+        except Exception as e:
+            print(f"❌ Failed to create group for '{brand_name}': {e}")
+            journal.record(brand_name, "create_failed", ids={"azId": account_uid}, message=str(e))
+            continue
+
+        # Step 4: Patch users (noop)
+        try:
+            patch_group_users()
+            print("👤 Patched users (noop).")
+        except Exception as e:
+            print(f"❌ Failed to patch users for '{brand_name}': {e}")
+
+        # Step 5: Patch roles
+        assign_roles(journal, brand_name, group_uid, account_uid, latency_ms=t.ms, name=group["name"])
+    journal.close()
+    checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,22 @@
-import requests, csv, json
-import pandas as pd
-from dotenv import load_dotenv
+import csv
+import functools
 import os
 import sys
 
-# Define output file path
-OUTPUT_FILE_PATH = r"C:\Users\Azath.A\os\market\output\output.txt"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wppos import config, fuzzy, hierarchy, runner, transport, tree_cache
+from wppos.checkpoint import Checkpoint
+from wppos.journal import Journal, Timer
 
-# Open the output file
-output_file = open(OUTPUT_FILE_PATH, "w", encoding="utf-8")
+# Result journal + checkpoint: one record per input item (see wppos/journal.py);
+# `--resume` skips items that already reached a terminal outcome
+HERE = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.path.join(HERE, "output", "journal.jsonl")
+CHECKPOINT_PATH = os.path.join(HERE, "output", "checkpoint.sqlite")
+INPUT_FILE_PATH = os.path.join(HERE, "clients.txt")
 
-# Optional: Keep printing to console AND file
-_original_print = print
-
-def print(*args, **kwargs):
-    # Print to console
-    _original_print(*args, **kwargs)
-    # Print to file
-    sep = kwargs.get("sep", " ")
-    end = kwargs.get("end", "\n")
-    output_file.write(sep.join(map(str, args)) + end)
-    output_file.flush() 
-
-# --- Setup environment ---
-env_path = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=env_path)
-
-bearer_token = os.getenv("BEARER_TOKEN")
-session_cookie = os.getenv("SESSION_COOKIE")
-
-tenant_id = "4c039217-7d17-4207-8314-98348983718a"
-
-# Endpoints
-hierarchy_url = f"https://media.os.wpp.com/api/v2/tenants/{tenant_id}/hierarchy-tree"
-create_url = f"https://media.os.wpp.com/_apps/os-workspaces/api/tenants/{tenant_id}/organization-units?disableTenantCache=true"
-
-headers = {
-    "Authorization": f"Bearer {bearer_token}",
-    "Accept": "application/json",
-    "Content-Type": "application/json",
-    "User-Agent": "python-requests/2.31"
-}
-cookies = {"session": session_cookie}
+# Fixed Thailand mdId
+thailand_md_id = "15050f40-d2fe-4a73-a937-b8fb6d78432f"
 
 # --- File Readers ---
 def read_clients_from_txt(filename="clients.txt"):
@@ -56,34 +31,22 @@ def read_clients_from_csv(filename="clients.csv"):
             clients.append(row["client_name"].strip())
     return clients
 
-# Pick source: TXT or CSV
-client_names = read_clients_from_txt("clients.txt")
-# client_names = read_clients_from_csv("clients.csv")
-
-# --- 1. Load hierarchy once
-resp = requests.get(hierarchy_url, headers=headers, cookies=cookies)
-resp.raise_for_status()
-hierarchy = resp.json().get("mapping", {})
-
-# --- 2. Fixed Germany mdId
-thailand_md_id = "15050f40-d2fe-4a73-a937-b8fb6d78432f"
-
-# --- 3. Loop clients ---
-for client_name in client_names:
-    print("=" * 40)
-    print(f"🔍 Processing client: {client_name}")
+# --- One client (runs on a worker thread) ---
+def create_market_unit(client_name: str, index: hierarchy.HierarchyIndex, suggestions: dict = None):
+    """Create the Thailand org-unit under one client. Returns (log lines, journal record)."""
+    lines = ["=" * 40, f"🔍 Processing client: {client_name}"]
 
     # Find parent org-unit
-    parent = next(
-        (item for item in hierarchy.values() if item.get("name", "").lower() == client_name.lower()),
-        None
-    )
+    parent = index.first(client_name)
 
     if not parent:
-        print(f"⚠️  Not found in hierarchy: {client_name}")
-        continue
+        lines.append(f"⚠️  Not found in hierarchy: {client_name}")
+        if (suggestions or {}).get(client_name):
+            lines.append(f"   💡 Did you mean: {fuzzy.describe(suggestions[client_name])}")
+        return lines, {"outcome": "not_found"}
 
     parent_id = parent["azId"]
+    rec = {"ids": {"parentId": parent_id, "mdId": thailand_md_id}}
 
     # Build payload
     payload = {
@@ -96,14 +59,70 @@ for client_name in client_names:
     }
 
     # Call API
-    create_resp = requests.post(create_url, headers=headers, cookies=cookies, json=payload)
+    with Timer() as t:
+        create_resp = transport.post(config.ORG_UNITS_URL, headers=config.headers(), cookies=config.cookies(), json=payload)
+    rec.update(status=create_resp.status_code, latency_ms=t.ms)
     if create_resp.status_code == 201:
-        print(f"✅ Successfully created Thailand org-unit under {client_name}")
+        lines.append(f"✅ Successfully created Thailand org-unit under {client_name}")
+        rec["outcome"] = "success"
     else:
-        print(f"❌ Failed for {client_name}: {create_resp.status_code}")
+        lines.append(f"❌ Failed for {client_name}: {create_resp.status_code}")
         try:
-            print(create_resp.json())
-        except:
-            print(create_resp.text)
-
-output_file.close()
\ No newline at end of file
+            lines.append(str(create_resp.json()))
+        except ValueError:
+            lines.append(create_resp.text)
+        rec.update(outcome="exists" if create_resp.status_code == 409 else "failed",
+                   message=lines[-1])
+    return lines, rec
+
+# --- Main ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create the Thailand org-unit under each client.")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE_PATH, help="TXT (one client per line) or CSV (client_name column)")
+    parser.add_argument("--resume", action="store_true", help="skip clients already done in the last run")
+    args = parser.parse_args(argv)
+
+    # Pick source: TXT or CSV
+    if args.input.lower().endswith(".csv"):
+        client_names = read_clients_from_csv(args.input)
+    else:
+        client_names = read_clients_from_txt(args.input)
+
+    checkpoint = Checkpoint(CHECKPOINT_PATH, resume=args.resume)
+    journal = Journal(JOURNAL_PATH, script="market", mode="a" if args.resume else "w", checkpoint=checkpoint)
+
+    # 1. Load hierarchy once (shared snapshot cache + name index)
+    index = hierarchy.get_index(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+
+    # 2. Loop clients (concurrently, logged in input order)
+    todo = checkpoint.pending(client_names)
+    if len(todo) < len(client_names):
+        print(f"⏭️ Resume: skipping {len(client_names) - len(todo)} client(s) already done.")
+
+    # Near-miss suggestions for clients not in the hierarchy (one local batch)
+    misses = [name for name in todo if not index.first(name)]
+    suggestions = fuzzy.for_hierarchy(index, ("CLIENT",)).top_many(misses) if misses else {}
+
+    work = functools.partial(create_market_unit, index=index, suggestions=suggestions)
+    created = 0
+    try:
+        for outcome in runner.run_ordered(work, todo):
+            if outcome.ok:
+                lines, rec = outcome.result
+            else:
+                lines = ["=" * 40, f"🔍 Processing client: {outcome.item}", f"❌ Failed for {outcome.item}: {outcome.error}"]
+                rec = {"outcome": "error", "message": str(outcome.error)}
+            for line in lines:
+                print(line)
+            journal.record(outcome.item, **rec)
+            created += rec.get("outcome") == "success"
+    finally:
+        tree_cache.invalidate_if(created, config.TENANT_ID)
+    journal.close()
+    checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
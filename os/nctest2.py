@@ -1,82 +1,77 @@
-import requests
-import pandas as pd
-from dotenv import load_dotenv
-import os
+from bisect import bisect_left, bisect_right
+
+from wppos import config, hierarchy
 
 
 # --- Setup ---
-tenant_id = "4c039217-7d17-4207-8314-98348983718a"
-url = f"https://media.os.wpp.com/api/v2/tenants/{tenant_id}/hierarchy-tree"
+tenant_id = config.TENANT_ID
 
-# 🛠️ Replace with your real token and session cookie:
-# --- Setup environment ---
-env_path = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=env_path)
+# --- Inputs (defaults) ---
+brand_name = "Amazon"
+market_name = "Germany"
+market_mdId = "c4a22815-f54d-4b8d-9b81-b3ad73add8e6"
 
-bearer_token = os.getenv("BEARER_TOKEN")
-session_cookie = os.getenv("SESSION_COOKIE")
 
-headers = {
-    "Authorization": f"Bearer {bearer_token}",
-    "Accept": "application/json",
-    "User-Agent": "python-requests/2.31"
-}
+def match_market(index, brand_name, market_name, market_mdId=None):
+    """Print every market linked to the brand/client; returns whether one was found."""
+    # Step 1: Brand nodes (CLIENT or BRAND)
+    brand_ids = set(index.find_ids(brand_name, ("BRAND", "CLIENT")))
 
-cookies = {
-    "session": session_cookie
-}
+    # Step 2: Market nodes (looser match: name or mdId)
+    by_mdid = index.find_ids_by_mdid(market_mdId, ("MARKET",)) if market_mdId else []
+    market_ids = dict.fromkeys(by_mdid + index.find_ids(market_name, ("MARKET",)))
 
-# --- Inputs ---
-brand_name = "Amazon"
-market_name = "Germany"
-market_mdId = "c4a22815-f54d-4b8d-9b81-b3ad73add8e6"
+    print("🗺️ Matching markets and brands/clients:")
+    reported = set()
 
-resp = requests.get(url, headers=headers, cookies=cookies)
-if resp.status_code != 200:
-    print("❌ API error", resp.status_code, resp.text)
-    exit()
-
-data = resp.json()
-mapping = data.get("mapping", {})
-
-# Step 1: Brand nodes (CLIENT or BRAND)
-brand_nodes = {
-    node["azId"]: node
-    for node in mapping.values()
-    if node.get("type") in ("BRAND", "CLIENT")
-    and node.get("name", "").strip().lower() == brand_name.strip().lower()
-}
-
-# Step 2: Market nodes (looser match: name or mdId)
-market_nodes = {
-    node["azId"]: node
-    for node in mapping.values()
-    if node.get("type") == "MARKET"
-    and (
-        node.get("mdId") == market_mdId
-        or node.get("name", "").strip().lower() == market_name.strip().lower()
-    )
-}
-
-print("🗺️ Matching markets and brands/clients:")
-found = False
-
-# (A) Market → children contain Brand/Client
-for m_id, m_node in market_nodes.items():
-    for child in m_node.get("children", []):
-        if child in brand_nodes:
+    def report(m_id):
+        if m_id not in reported:
+            reported.add(m_id)
             print("=" * 50)
-            print(f"🎯 Market: {m_node['name']} ({m_id})")
-            found = True
+            print(f"🎯 Market: {index.names[m_id]} ({index.az_ids[m_id]})")
+
+    # (A) Market above the Brand/Client, at any depth
+    for b_id in brand_ids:
+        for m_id in index.ancestors_of_type(b_id, "MARKET"):
+            if m_id in market_ids:
+                report(m_id)
+
+    # (B) Brand/Client above the Market, at any depth: the markets whose Euler
+    # entry number falls inside the brand's [enter, exit] span
+    ancestry = index.ancestry()
+    by_entry = sorted((ancestry.enter[m_id], m_id) for m_id in market_ids)
+    entries = [entry for entry, _ in by_entry]
+    for b_id in brand_ids:
+        if ancestry.enter[b_id] == hierarchy.NO_NODE:
+            continue
+        lo = bisect_left(entries, ancestry.enter[b_id])
+        hi = bisect_right(entries, ancestry.exit[b_id])
+        for _, m_id in by_entry[lo:hi]:  # bingo!
+            report(m_id)
+
+    found = bool(reported)
+    if not found:
+        print(f"⚠️ No match found for Brand='{brand_name}' in Market='{market_name}'")
+    return found
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check whether a brand/client is linked to a market.")
+    parser.add_argument("--brand", default=brand_name)
+    parser.add_argument("--market", default=market_name)
+    parser.add_argument("--market-mdid", default=market_mdId)
+    args = parser.parse_args(argv)
+
+    try:
+        index = hierarchy.get_index(tenant_id, headers=config.headers(), cookies=config.cookies())
+    except RuntimeError as e:
+        print("❌ API error", e)
+        return
+
+    match_market(index, args.brand, args.market, args.market_mdid)
 
-# (B) Brand/Client → children contain Market
-for b_id, b_node in brand_nodes.items():
-    for child in b_node.get("children", []):
-        if child in market_nodes:  # bingo!
-            print("=" * 50)
-            print(f"🎯 Market: {market_nodes[child]['name']} ({child})")
-            
-            found = True
 
-if not found:
-    print(f"⚠️ No match found for Brand='{brand_name}' in Market='{market_name}'")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
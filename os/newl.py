@@ -1,51 +1,53 @@
-import requests
-import pandas as pd
-from dotenv import load_dotenv
 import os
 
-# --- Setup ---
-tenant_id = "4c039217-7d17-4207-8314-98348983718a"
-url = f"https://media.os.wpp.com/api/v2/tenants/{tenant_id}/hierarchy-tree"
-
-# --- Setup environment ---
-env_path = r"C:\Users\Azath.A\os\auth.env"
-load_dotenv(dotenv_path=env_path)
-
-bearer_token = os.getenv("BEARER_TOKEN")
-session_cookie = os.getenv("SESSION_COOKIE")
-
-headers = {
-    "Authorization": f"Bearer {bearer_token}",
-    "Accept": "application/json",
-    "User-Agent": "python-requests/2.31"
-}
+from wppos import config, fuzzy, hierarchy
 
-cookies = {
-    "session": session_cookie
-}
-
-# --- API Request ---
-response = requests.get(url, headers=headers, cookies=cookies)
+# --- Setup ---
+tenant_id = config.TENANT_ID
+INPUT_FILE_PATH = os.path.join(os.path.expanduser("~"), "downloads", "brands.txt")
 
-if response.status_code == 200:
-    data = response.json()
 
-    # Load brand names dynamically from txt file
-    txt_file_path = r"C:\Users\Azath.A\downloads\brands.txt"
-    with open(txt_file_path, "r", encoding="utf-8") as file:
-        brand_names = [line.strip() for line in file if line.strip()]
+def lookup(brand_names, index):
+    """Perform case-insensitive search for each brand (near misses get suggestions)."""
+    found = {name: index.first(name) for name in brand_names}
+    misses = [name for name, item in found.items() if not item]
+    suggestions = fuzzy.for_hierarchy(index).top_many(misses) if misses else {}
 
-    # Perform case-insensitive search for each brand
     for search_name in brand_names:
-        matching_item = next(
-            (item for item in data.get("mapping", {}).values()
-             if item.get("name", "").lower() == search_name.lower()),
-            None
-        )
+        matching_item = found[search_name]
 
         if matching_item:
             print(f"🎉 Found '{search_name}': azId = {matching_item.get('azId')}")
+        elif suggestions.get(search_name):
+            print(f"⚠️ '{search_name}' not found in response. Did you mean: {fuzzy.describe(suggestions[search_name])}")
         else:
             print(f"⚠️ '{search_name}' not found in response.")
-else:
-    print(f"❌ Request failed: {response.status_code} - {response.text}")
\ No newline at end of file
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the azId of each name found in the hierarchy.")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE_PATH, help="TXT file, one name per line")
+    parser.add_argument("-n", "--name", action="append", help="look up this name instead of reading a file (repeatable)")
+    args = parser.parse_args(argv)
+
+    # --- API Request (shared snapshot cache) ---
+    try:
+        index = hierarchy.get_index(tenant_id, headers=config.headers(), cookies=config.cookies())
+    except RuntimeError as e:
+        print(f"❌ Request failed: {e}")
+        return
+
+    if args.name:
+        brand_names = args.name
+    else:
+        # Load brand names dynamically from txt file
+        with open(args.input, "r", encoding="utf-8") as file:
+            brand_names = [line.strip() for line in file if line.strip()]
+
+    lookup(brand_names, index)
+
+
+if __name__ == "__main__":
+    main()
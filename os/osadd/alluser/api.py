@@ -1,59 +1,30 @@
-import requests
-import pandas as pd
-from dotenv import load_dotenv
+import csv
 import os
+import sys
 
-# Full path to your .env file
-env_path = r"C:\Users\Azath.A\os\auth.env"
-
-# Load environment variables from that file
-load_dotenv(dotenv_path=env_path)
-
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-SESSION_COOKIE = os.getenv("SESSION_COOKIE")
-
-
-# === Setup session ===
-session = requests.Session()
-headers = {
-    "accept": "application/json, text/plain, */*",
-    "content-type": "application/json",
-    "authorization": f"Bearer {BEARER_TOKEN}",
-    "user-agent": "Mozilla/5.0"
-}
-if SESSION_COOKIE:
-    session.headers.update({"cookie": SESSION_COOKIE})
-session.headers.update(headers)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from wppos import config, users
 
 
 def get_emails(search_name):
-    url = "https://media.os.wpp.com/api/users"
-    params = {
-        "offset": 0,
-        "limit": 50,
-        "sortBy": "firstname",
-        "orderBy": "asc",
-        "filter[search]": search_name,
-        "filter[jobTitle]": "",
-        "filter[country]": "",
-        "filter[department]": "",
-        "filter[countryAlpha2Code]": ""
-    }
-
-    resp = requests.get(url, headers=headers, params=params)
-    resp.raise_for_status()
-    data = resp.json()
-
+    """Emails of users matching search_name, answered from the local user mirror."""
     emails = []
-    for user in data.get("data", []):
+    for user in users.get_mirror(session=config.api()).search(search_name):
         if "email" in user:
             emails.append(user["email"])
     return emails
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the emails of users matching each name.")
+    parser.add_argument("input", nargs="?", default="names.csv", help="one search name per line")
+    parser.add_argument("-o", "--output", default="emails.csv")
+    args = parser.parse_args(argv)
+
     # 🔹 Read search names from txt file
-    with open("names.csv", "r", encoding="utf-8") as f:
+    with open(args.input, "r", encoding="utf-8") as f:
         search_names = [line.strip() for line in f if line.strip()]
 
     all_emails = []
@@ -69,8 +40,14 @@ if __name__ == "__main__":
 
     # Save results to CSV
     if all_emails:
-        df = pd.DataFrame(all_emails)
-        df.to_csv("emails.csv", index=False)
-        print("✅ Saved emails to emails.csv")
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["name", "email"])
+            writer.writeheader()
+            writer.writerows(all_emails)
+        print(f"✅ Saved emails to {args.output}")
     else:
         print("⚠️ No results fetched")
+
+
+if __name__ == "__main__":
+    main()
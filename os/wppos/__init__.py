@@ -0,0 +1 @@
+"""Shared helpers for the OS automation scripts."""
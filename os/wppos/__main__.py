@@ -0,0 +1,6 @@
+"""``python -m wppos <command> ...`` is the same as ``wpp-os <command> ...``."""
+import sys
+
+from wppos.cli import main
+
+sys.exit(main())
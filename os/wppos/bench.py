@@ -0,0 +1,239 @@
+"""End-to-end throughput benchmark against the local mock API (mockapi.py).
+
+``wpp-os bench`` generates a tenant, starts a mock server on a free port and
+runs each workflow (client, market, brand, group, adduser, roles) on a
+generated input file, each in a fresh process with its own empty cache,
+journal and checkpoint under a temporary directory. The child times every
+HTTP call it makes (``requests.Session.request``), so the report shows per
+workflow: items/s over the whole run, requests sent (retries included), p50 /
+p99 latency to response headers and the number of 429/5xx answers seen.
+
+    wpp-os bench --items 500 --latency lognormal:40,0.6 --fail 503=0.02
+
+Nothing here talks to the real API: the children get WPP_OS_BASE_URL,
+WPP_OS_ENV (a dummy token) and WPP_OS_CACHE_DIR pointing at the mock and the
+temporary directory.
+"""
+import contextlib
+import importlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from wppos import config, mockapi
+
+# workflow -> (module, input file name)
+WORKFLOWS = {
+    "client": ("client.client", "name.txt"),
+    "market": ("market.market", "clients.txt"),
+    "brand": ("brand.brand", "input.csv"),
+    "group": ("group.group", "brands.txt"),
+    "adduser": ("adduser.adduser", "input.csv"),
+    "roles": ("allth.arch", "brands.txt"),
+}
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+# --- Inputs ---
+
+def _cycle(items: list, n: int) -> list:
+    return [items[i % len(items)] for i in range(n)] if items else []
+
+
+def make_input(tenant: mockapi.MockTenant, workflow: str, n: int, rng: random.Random) -> list:
+    """Input lines for ``workflow``: a realistic mix of new and already existing items."""
+    nodes = tenant.mapping
+    client_nodes = [nodes[c] for c in nodes[tenant.root]["children"]]
+    brand_nodes = [node for node in nodes.values() if node["type"] == "BRAND"]
+
+    if workflow == "client":
+        # Half already in the hierarchy (skipped locally), half new
+        return _cycle(rng.sample([c["name"] for c in tenant.clients], len(tenant.clients)), n)
+    if workflow == "market":
+        return _cycle([c["name"] for c in client_nodes], n)
+    if workflow in ("group", "roles"):
+        # Half of the brands already have a group
+        return _cycle([b["name"] for b in rng.sample(brand_nodes, len(brand_nodes))], n)
+    if workflow == "brand":
+        with open(config.CATEGORY_PATH, "r", encoding="utf-8") as f:
+            categories = [c["name"] for c in json.load(f)["data"]]
+        pairs = [(nodes[m]["name"], c["name"]) for c in client_nodes for m in c["children"]]
+        spare = [b["name"] for b in tenant.brands[tenant.placed_brands:]] or [b["name"] for b in tenant.brands]
+        rows = []
+        for i in range(n):
+            market, client = rng.choice(pairs)
+            rows.append(f"{market},{client},{spare[i % len(spare)]},{rng.choice(categories)}")
+        return rows
+    if workflow == "adduser":
+        groups = [g["name"] for g in tenant.groups]
+        return [f"{rng.choice(groups)},{rng.choice(tenant.users)['email']}" for _ in range(n)]
+    raise ValueError(f"Unknown workflow: {workflow}")
+
+
+# --- Child side (one workflow, one process) ---
+
+def run_child(workflow: str, input_path: str, out_dir: str) -> dict:
+    """Run one workflow's ``main`` with every HTTP call timed; returns the stats."""
+    import requests
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    original = requests.Session.request
+
+    def timed(self, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = original(self, method, url, **kwargs)
+        except Exception:
+            with lock:
+                statuses["error"] = statuses.get("error", 0) + 1
+            raise
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(resp.status_code)] = statuses.get(str(resp.status_code), 0) + 1
+        return resp
+
+    requests.Session.request = timed
+    module = importlib.import_module(WORKFLOWS[workflow][0])
+    # Keep the real <script>/output/ files untouched
+    for attr, name in (("JOURNAL_PATH", "journal.jsonl"), ("CHECKPOINT_PATH", "checkpoint.sqlite")):
+        if hasattr(module, attr):
+            setattr(module, attr, os.path.join(out_dir, name))
+
+    with open(os.path.join(out_dir, "run.log"), "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        start = time.perf_counter()
+        module.main([input_path])
+        elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "latencies_ms": latencies, "statuses": statuses}
+
+
+# --- Parent side ---
+
+def run_workflow(workflow: str, lines: list, work_dir: str, base_url: str, env: dict = None) -> dict:
+    """Write the input, run the workflow in a child process and summarize its stats."""
+    out_dir = os.path.join(work_dir, workflow)
+    os.makedirs(out_dir, exist_ok=True)
+    input_path = os.path.join(out_dir, WORKFLOWS[workflow][1])
+    with open(input_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    env_path = os.path.join(work_dir, "auth.env")
+    child_env = dict(os.environ, WPP_OS_BASE_URL=base_url, WPP_OS_ENV=env_path,
+                     WPP_OS_CACHE_DIR=os.path.join(out_dir, ".cache"), PYTHONIOENCODING="utf-8")
+    child_env.update(env or {})
+    stats_path = os.path.join(out_dir, "stats.json")
+    proc = subprocess.run(
+        [sys.executable, "-m", "wppos.bench", "--child", workflow, input_path, out_dir, stats_path],
+        cwd=config.OS_DIR, env=child_env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0 or not os.path.exists(stats_path):
+        raise RuntimeError(f"{workflow} failed (exit {proc.returncode}): {proc.stderr.strip()[-500:]}")
+    with open(stats_path, "r", encoding="utf-8") as f:
+        stats = json.load(f)
+    latencies = stats["latencies_ms"]
+    throttled = sum(n for status, n in stats["statuses"].items() if status == "429" or status.startswith("5"))
+    return {
+        "workflow": workflow,
+        "items": len(lines),
+        "seconds": round(stats["seconds"], 3),
+        "items_per_s": round(len(lines) / stats["seconds"], 1) if stats["seconds"] else 0.0,
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "throttled": throttled,
+        "statuses": stats["statuses"],
+        "log": os.path.join(out_dir, "run.log"),
+    }
+
+
+def run(workflows, items: int, tenant: mockapi.MockTenant, work_dir: str, env: dict = None,
+        seed: int = 1, report=print, **server_options) -> list:
+    """Benchmark ``workflows`` against a fresh mock server; returns one result dict each."""
+    with open(os.path.join(work_dir, "auth.env"), "w", encoding="utf-8") as f:
+        f.write("BEARER_TOKEN=bench\nSESSION_COOKIE=bench\n")
+    server = mockapi.serve(tenant, seed=seed, **server_options)
+    rng = random.Random(seed)
+    results = []
+    try:
+        for workflow in workflows:
+            result = run_workflow(workflow, make_input(tenant, workflow, items, rng), work_dir,
+                                  server.base_url, env)
+            report(format_row(result))
+            results.append(result)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+HEADER = f"{'workflow':<9} {'items':>6} {'seconds':>8} {'items/s':>8} {'requests':>8} {'p50 ms':>7} {'p99 ms':>7} {'429/5xx':>7}"
+
+
+def format_row(r: dict) -> str:
+    return (f"{r['workflow']:<9} {r['items']:>6} {r['seconds']:>8.2f} {r['items_per_s']:>8.1f} "
+            f"{r['requests']:>8} {r['p50_ms']:>7.1f} {r['p99_ms']:>7.1f} {r['throttled']:>7}")
+
+
+def main(argv=None):
+    import argparse
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["--child"]:
+        workflow, input_path, out_dir, stats_path = argv[1:5]
+        stats = run_child(workflow, input_path, out_dir)
+        with open(stats_path, "w", encoding="utf-8") as f:
+            json.dump(stats, f)
+        return
+
+    parser = argparse.ArgumentParser(description="Measure workflow throughput against a local mock API.")
+    parser.add_argument("--workflows", default=",".join(WORKFLOWS),
+                        help=f"comma-separated subset of {', '.join(WORKFLOWS)} (default: all)")
+    parser.add_argument("--items", type=int, default=200, help="input items per workflow (default: 200)")
+    parser.add_argument("--max-in-flight", type=int, help="WPP_MAX_IN_FLIGHT for the workflows")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep the work directory (inputs, logs, journals)")
+    mockapi.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    workflows = [w.strip() for w in args.workflows.split(",") if w.strip()]
+    unknown = [w for w in workflows if w not in WORKFLOWS]
+    if unknown:
+        parser.error(f"unknown workflow(s): {', '.join(unknown)}")
+    env = {"WPP_MAX_IN_FLIGHT": str(args.max_in_flight)} if args.max_in_flight else None
+
+    tenant = mockapi.tenant_from_args(args)
+    work_dir = tempfile.mkdtemp(prefix="wpp-os-bench-")
+    report = (lambda line: None) if args.json else print
+    report(f"🧪 Mock tenant: {len(tenant.mapping)} nodes, {len(tenant.groups)} groups, {len(tenant.users)} users; "
+           f"latency {args.latency}, faults {args.fail or 'none'}")
+    report(HEADER)
+    try:
+        results = run(workflows, args.items, tenant, work_dir, env=env, seed=args.seed, report=report,
+                      latency=args.latency, write_latency=args.write_latency, faults=args.fail)
+    finally:
+        if not args.keep:
+            import shutil
+
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif args.keep:
+        print(f"\n📁 Inputs, logs and journals kept in {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
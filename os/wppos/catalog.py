@@ -0,0 +1,260 @@
+"""Local copies of the master-data catalogs (/api/brands, /api/clients).
+
+brand.py used to search /api/brands?filter[search]=<name> once per row and
+take ``data[0]``, which is slow and sometimes a different brand. A
+``MasterCatalog`` crawls the whole list once (pages fetched in parallel),
+keeps it in ``.cache/catalog-<kind>.json`` and resolves names through a
+dict keyed by ``normalize_name``. A name shared by several entries raises
+``AmbiguousName`` instead of picking one. ``resolve_many`` resolves a whole
+input file as one local join and ``closest`` stands in for the API's top
+search hit in "Closest API hit" diagnostics.
+
+Refreshes are incremental: the newest entries are paged in ``-updatedAt``
+order until one older than the last sync shows up. If the API does not return
+``updatedAt`` in that order, or the copy is older than WPP_CATALOG_FULL_TTL,
+the list is crawled again in full (which also drops deleted entries). A name
+that is not found triggers one incremental refresh before giving up.
+
+Environment knobs:
+    WPP_CATALOG_TTL       seconds a catalog is used before an incremental
+                          refresh (default 3600)
+    WPP_CATALOG_FULL_TTL  seconds between full crawls (default 86400)
+"""
+import json
+import os
+import re
+import threading
+import time
+
+from wppos import config, runner, transport, tree_cache
+
+PAGE_SIZE = 100
+TTL = float(os.getenv("WPP_CATALOG_TTL", "3600"))
+FULL_TTL = float(os.getenv("WPP_CATALOG_FULL_TTL", "86400"))
+
+# The only entry fields kept
+FIELDS = ("id", "name", "updatedAt")
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(name) -> str:
+    """Case-insensitive, whitespace-tolerant key (runs of spaces collapse to one)."""
+    return _SPACES.sub(" ", (name or "").lower().strip())
+
+
+class AmbiguousName(ValueError):
+    """More than one catalog entry has this (normalized) name."""
+
+    def __init__(self, kind: str, name: str, matches: list):
+        self.matches = matches
+        listed = ", ".join(f"{m.get('name')} ({m.get('id')})" for m in matches)
+        super().__init__(f"'{name}' matches {len(matches)} {kind}: {listed}")
+
+
+class MasterCatalog:
+    """Every entry of /api/<kind>, indexed by normalized name."""
+
+    def __init__(self, kind: str, headers=None, cookies=None, session=None,
+                 page_size: int = PAGE_SIZE, path: str = None):
+        self.kind = kind
+        self.headers = headers
+        self.cookies = cookies
+        self.http = session or transport
+        self.page_size = page_size
+        self.path = path or os.path.join(tree_cache.CACHE_DIR, f"catalog-{kind}.json")
+        self.items = {}     # id -> entry
+        self.by_name = {}   # normalize_name(name) -> [entry]
+        self._keys = None   # sorted by_name keys, built on the first ``closest``
+        self.synced_at = 0.0
+        self.crawled_at = 0.0
+        self._watermark = None  # newest updatedAt seen
+        self._loaded = False
+        self._miss_refreshed = False
+        self._lock = threading.RLock()
+
+    @property
+    def url(self) -> str:
+        return f"{config.BASE_URL}/api/{self.kind}"
+
+    def _fetch_page(self, page: int, sort: str = None) -> dict:
+        params = {"page": page, "itemsPerPage": self.page_size}
+        if sort:
+            params["sort"] = sort
+        r = self.http.get(self.url, headers=self.headers, cookies=self.cookies, params=params)
+        if r.status_code != 200:
+            raise RuntimeError(f"{self.kind.capitalize()} API failed: {r.status_code} - {r.text}")
+        return r.json()
+
+    # --- Crawling ---
+
+    def crawl(self):
+        """Fetch the full list (page 1 first, then the rest in parallel)."""
+        entries = runner.crawl_pages(self._fetch_page, self.page_size)
+
+        with self._lock:
+            self.items = {}
+            self._merge(entries)
+            self.synced_at = self.crawled_at = time.time()
+            self._loaded = True
+            self._save()
+
+    def refresh(self):
+        """Pull entries updated since the last sync; fall back to a full crawl."""
+        with self._lock:
+            if not self.items or self._watermark is None or time.time() - self.crawled_at > FULL_TTL:
+                return self.crawl()
+            watermark = self._watermark
+            newer = []
+            page = 1
+            previous = None
+            while True:
+                data = self._fetch_page(page, sort="-updatedAt")
+                entries = data.get("data", [])
+                stamps = [e.get("updatedAt") for e in entries]
+                if any(s is None for s in stamps) or stamps != sorted(stamps, reverse=True):
+                    return self.crawl()  # not sortable by updatedAt here
+                if entries == previous:
+                    break  # page clamped to the last one
+                newer.extend(e for e in entries if e["updatedAt"] >= watermark)
+                # Without paginator.totalPages only a short page marks the end
+                total_pages = (data.get("paginator") or {}).get("totalPages")
+                if (len(entries) < self.page_size or stamps[-1] < watermark
+                        or (total_pages and page >= total_pages)):
+                    break
+                previous = entries
+                page += 1
+            self._merge(newer)
+            self.synced_at = time.time()
+            self._loaded = True
+            self._save()
+
+    def _merge(self, entries):
+        for entry in entries:
+            if not entry.get("id"):
+                continue
+            if entry.get("deletedAt"):
+                self.items.pop(entry["id"], None)
+                continue
+            self.items[entry["id"]] = {field: entry[field] for field in FIELDS if field in entry}
+        self.by_name = {}
+        self._keys = None
+        stamps = []
+        for entry in self.items.values():
+            self.by_name.setdefault(normalize_name(entry.get("name")), []).append(entry)
+            if entry.get("updatedAt"):
+                stamps.append(entry["updatedAt"])
+        self._watermark = max(stamps) if stamps and len(stamps) == len(self.items) else None
+
+    # --- Persistence ---
+
+    def _save(self):
+        document = {"kind": self.kind, "synced_at": self.synced_at, "crawled_at": self.crawled_at,
+                    "items": list(self.items.values())}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # the in-memory catalog is still good; next run crawls again
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.items = {}
+        self._merge(document.get("items", []))
+        self.synced_at = document.get("synced_at", 0.0)
+        self.crawled_at = document.get("crawled_at", 0.0)
+        return True
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            if not self._load():
+                return self.crawl()
+            if time.time() - self.synced_at > TTL:
+                return self.refresh()
+            self._loaded = True
+
+    # --- Lookups ---
+
+    def matches(self, name: str) -> list:
+        """Entries whose name matches ``name`` (compared by ``normalize_name``)."""
+        self._ensure_loaded()
+        return list(self.by_name.get(normalize_name(name), []))
+
+    def resolve_many(self, names) -> dict:
+        """name -> matching entries for every distinct name, as one local join.
+
+        Names with no match trigger a single incremental refresh for the batch.
+        """
+        self._ensure_loaded()
+        found = {name: self.by_name.get(normalize_name(name), []) for name in dict.fromkeys(names)}
+        if not all(found.values()) and not self._miss_refreshed:
+            with self._lock:
+                self._miss_refreshed = True
+                self.refresh()
+            found = {name: entries or self.by_name.get(normalize_name(name), [])
+                     for name, entries in found.items()}
+        return {name: list(entries) for name, entries in found.items()}
+
+    def closest(self, name: str):
+        """Best local stand-in for the API's top search hit, or None.
+
+        Like /api/<kind>?filter[search]=, a candidate contains the search text;
+        the shortest such name (the least extra text) wins.
+        """
+        self._ensure_loaded()
+        wanted = normalize_name(name)
+        if not wanted:
+            return None
+        with self._lock:
+            if self._keys is None:
+                self._keys = sorted(self.by_name, key=lambda key: (len(key), key))
+            keys = self._keys
+        key = next((key for key in keys if wanted in key), None)
+        return self.by_name[key][0] if key is not None else None
+
+    def resolve(self, name: str) -> str:
+        """id of the one entry named ``name``.
+
+        Raises ``AmbiguousName`` for several matches and ``ValueError`` for none
+        (after one incremental refresh per process, for entries added since).
+        """
+        found = self.matches(name)
+        if not found:
+            with self._lock:
+                if not self._miss_refreshed:
+                    self._miss_refreshed = True
+                    self.refresh()
+            found = self.matches(name)
+        if len(found) > 1:
+            raise AmbiguousName(self.kind, name, found)
+        if not found:
+            raise ValueError(f"{self.kind.capitalize()[:-1]} '{name}' not found in API")
+        return found[0]["id"]
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self.items)
+
+
+# kind -> MasterCatalog
+_catalogs = {}
+_lock = threading.Lock()
+
+
+def get_catalog(kind: str, headers=None, cookies=None, session=None) -> MasterCatalog:
+    """Process-wide catalog for ``kind`` ("brands", "clients"), loaded on the first lookup."""
+    with _lock:
+        catalog = _catalogs.get(kind)
+        if catalog is None:
+            catalog = MasterCatalog(kind, headers=headers, cookies=cookies, session=session)
+            _catalogs[kind] = catalog
+        return catalog
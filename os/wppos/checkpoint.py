@@ -0,0 +1,76 @@
+"""Per-run checkpoint store so a run can be resumed after 5xx or a crash.
+
+Every finished input item is recorded in ``<script>/output/checkpoint.sqlite``
+(one committed SQLite transaction per journal batch, written only after the
+batch's journal lines are flushed, WAL mode, so killing the process mid-batch
+loses at most the items still in flight). Running a script with
+``--resume`` skips items already in a terminal state and only re-drives the
+ones that failed or never finished; without it the store starts empty.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+# Outcomes worth another attempt on --resume; everything else is terminal
+RETRY_OUTCOMES = frozenset({
+    "failed", "error", "search_failed", "azid_failed", "check_failed", "create_failed",
+    "roles_failed",
+})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    outcome TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class Checkpoint:
+    """Crash-safe map of input key -> last outcome."""
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.resume = resume
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        if not resume:
+            with self._db:
+                self._db.execute("DELETE FROM items")
+
+    def outcome(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT outcome FROM items WHERE key = ?", (str(key),)).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, key: str) -> bool:
+        outcome = self.outcome(key)
+        return outcome is not None and outcome not in RETRY_OUTCOMES
+
+    def pending(self, items, key=str) -> list:
+        """Items still to do (all of them unless resuming)."""
+        if not self.resume:
+            return list(items)
+        return [item for item in items if not self.is_done(key(item))]
+
+    def mark(self, key: str, outcome: str):
+        """Durably record the outcome of one item."""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO items VALUES (?, ?, ?)",
+                             (str(key), outcome, time.time()))
+
+    def mark_many(self, outcomes):
+        """Durably record several ``(key, outcome)`` pairs in one transaction."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?)",
+                                 [(str(key), outcome, now) for key, outcome in outcomes])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
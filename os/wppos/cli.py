@@ -0,0 +1,80 @@
+"""``wpp-os`` entry point: one command, one subcommand per script.
+
+    wpp-os client [name.txt] [--resume]
+    wpp-os brand [input.csv] [--resume]
+    wpp-os group [brands.txt] [--resume]
+    wpp-os market [clients.txt] [--resume]
+    wpp-os adduser [input.csv]
+    wpp-os roles [brands.txt]
+    wpp-os lookup [brands.txt | -n NAME ...]
+    wpp-os resolve [brands.txt] [--market NAME ...] [--markets-file FILE] [--pairs FILE] [--full]
+    wpp-os suggest [names.txt | -n NAME ...] [--source hierarchy|clients|brands|groups] [-k 3]
+    wpp-os reconcile [spec.json] [--dry-run] [--rebind]
+    wpp-os logparse FILE [FILE ...]
+    wpp-os mock [--port 8080] [--clients N] [--latency DIST] [--fail SPEC]
+    wpp-os bench [--workflows client,...] [--items N] [--latency DIST] [--fail SPEC]
+    wpp-os microbench [--sizes 1e4,1e5,1e6] [--save]
+    wpp-os watch [--interval SECONDS] [--json]
+    wpp-os status [--interval SECONDS]
+
+Only the module behind the chosen subcommand is imported, so ``--help`` and
+argument errors come back without touching requests, dotenv or the network.
+Everything after the subcommand is passed to that module's ``main(argv)``.
+"""
+import importlib
+import os
+import sys
+
+# subcommand -> (module, one-line help)
+COMMANDS = {
+    "client": ("client.client", "validate clients and create their org-units"),
+    "brand": ("brand.brand", "create brand org-units under (market, client) pairs"),
+    "group": ("group.group", "create a group (with roles) for each brand"),
+    "market": ("market.market", "create the Thailand org-unit under each client"),
+    "adduser": ("adduser.adduser", "add users to groups from a CSV"),
+    "roles": ("allth.arch", "assign the static role to every brand account"),
+    "lookup": ("newl", "print the azId of each name"),
+    "resolve": ("ctemp.ctemp", "print clientAzId,marketAzId for names under one or more markets"),
+    "reconcile": ("wppos.reconcile", "plan and apply a desired-state spec (clients to role bindings)"),
+    "suggest": ("wppos.fuzzy", "suggest the closest known names for misspelled input"),
+    "logparse": ("wppos.logparse", "classify legacy output.txt logs"),
+    "mock": ("wppos.mockapi", "run a local mock of the OS API"),
+    "bench": ("wppos.bench", "measure workflow throughput against the mock API"),
+    "microbench": ("wppos.microbench", "time hierarchy operations on synthetic trees against a baseline"),
+    "watch": ("wppos.delta", "poll the hierarchy and print nodes that changed"),
+    "status": ("auth", "poll /api/feeds/status"),
+}
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: wpp-os <command> [args ...]", "", "commands:"]
+    lines += [f"  {name:<{width}}  {text}" for name, (_, text) in COMMANDS.items()]
+    lines += ["", "Run 'wpp-os <command> --help' for the command's own options."]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"wpp-os: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    # Script folders (client/, brand/, ...) import as namespace packages from os/
+    os_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if os_dir not in sys.path:
+        sys.path.insert(0, os_dir)
+
+    module = importlib.import_module(COMMANDS[command][0])
+    # argparse inside each script reports the subcommand as its program name
+    sys.argv[0] = f"wpp-os {command}"
+    result = module.main(rest)
+    return result if isinstance(result, int) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
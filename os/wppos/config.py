@@ -0,0 +1,101 @@
+"""Tenant, endpoints and credentials shared by all scripts.
+
+Nothing is read at import time: auth.env is loaded the first time a script
+asks for headers, so modules stay cheap and side-effect free to import.
+
+Environment knobs:
+    WPP_OS_ENV      path of the env file with BEARER_TOKEN / SESSION_COOKIE
+                    (default: auth.env next to the scripts)
+    WPP_TENANT_ID   tenant to work on
+    WPP_OS_BASE_URL API host (default https://media.os.wpp.com; e.g. a local
+                    ``wpp-os mock`` server)
+"""
+import os
+import threading
+
+OS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_URL = os.getenv("WPP_OS_BASE_URL", "https://media.os.wpp.com").rstrip("/")
+TENANT_ID = os.getenv("WPP_TENANT_ID", "4c039217-7d17-4207-8314-98348983718a")
+ENV_PATH = os.getenv("WPP_OS_ENV", os.path.join(OS_DIR, "auth.env"))
+
+ORG_UNITS_URL = f"{BASE_URL}/_apps/os-workspaces/api/tenants/{TENANT_ID}/organization-units?disableTenantCache=true"
+GROUPS_URL = f"{BASE_URL}/api/az/groups"
+GROUP_ROLES_URL = f"{BASE_URL}/api/az/groups/roles"
+CATEGORY_PATH = os.path.join(OS_DIR, "category.json")
+
+# --- Static Role IDs ---
+ROLE_HIERARCHY = "1544916c-0ce0-4042-a8e5-6e18042c73b7"
+ROLE_ARCHITECT = "6948d8e6-eca6-4c12-9241-a47db34db467"
+
+_lock = threading.Lock()
+_credentials = None
+_api = None
+_categories = None
+
+
+def credentials() -> tuple:
+    """(BEARER_TOKEN, SESSION_COOKIE), loading the env file once."""
+    global _credentials
+    with _lock:
+        if _credentials is None:
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=ENV_PATH)
+            _credentials = (os.getenv("BEARER_TOKEN"), os.getenv("SESSION_COOKIE"))
+        return _credentials
+
+
+def categories() -> dict:
+    """category.json as lower-cased name -> category id (read once)."""
+    global _categories
+    if _categories is None:
+        import json
+
+        with open(CATEGORY_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)["data"]
+        _categories = {c["name"].strip().lower(): c["id"] for c in data}
+    return _categories
+
+
+def require_token():
+    """Exit with a readable message when no bearer token is configured."""
+    if not credentials()[0]:
+        raise SystemExit(f"❌ Missing BEARER_TOKEN in environment file ({ENV_PATH}).")
+
+
+def headers() -> dict:
+    bearer_token, _ = credentials()
+    return {
+        "Authorization": f"Bearer {bearer_token}",
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "User-Agent": "python-requests/2.31"
+    }
+
+
+def cookies() -> dict:
+    _, session_cookie = credentials()
+    return {"session": session_cookie} if session_cookie else {}
+
+
+def api():
+    """Shared throttled client whose session carries the auth headers and raw cookie."""
+    global _api
+    if _api is None:
+        import requests
+        from wppos import transport
+
+        bearer_token, session_cookie = credentials()
+        session = requests.Session()
+        session.headers.update({
+            "accept": "application/json, text/plain, */*",
+            "content-type": "application/json",
+            "authorization": f"Bearer {bearer_token}",
+            "user-agent": "Mozilla/5.0"
+        })
+        if session_cookie:
+            session.headers.update({"cookie": session_cookie})
+        client = transport.HttpClient(session)
+        with _lock:
+            if _api is None:
+                _api = client
+    return _api
@@ -0,0 +1,192 @@
+"""Delta between a resident hierarchy index and a newer snapshot.
+
+A re-download used to mean rebuilding every index from scratch. ``diff``
+compares the index with the new mapping and reports what changed (nodes
+added, removed, renamed, reparented, or with a new type/mdId); ``apply``
+patches the in-memory ``HierarchyIndex`` with exactly those changes.
+``hierarchy.sync_index`` does both whenever a new snapshot arrives.
+
+``watch`` (``wpp-os watch``) keeps one index fresh: it revalidates the
+snapshot every interval (a 304 costs nothing) and prints each change.
+
+Environment knobs:
+    WPP_DELTA_REBUILD_RATIO  above this share of changed nodes the index is
+                             rebuilt instead of patched (default 0.2)
+    WPP_WATCH_INTERVAL       seconds between checks in watch mode (default 60)
+"""
+import json
+import os
+import sys
+import time
+from typing import NamedTuple
+
+from wppos import hierarchy
+
+REBUILD_RATIO = float(os.getenv("WPP_DELTA_REBUILD_RATIO", "0.2"))
+WATCH_INTERVAL = float(os.getenv("WPP_WATCH_INTERVAL", "60"))
+
+
+class Change(NamedTuple):
+    """One node-level difference.
+
+    ``old`` / ``new`` hold the parent azId for added/removed/reparented, the
+    name for renamed and ``(type, mdId)`` for updated.
+    """
+    kind: str
+    az_id: str
+    name: str
+    old: object = None
+    new: object = None
+
+
+def _parent_az(index, node_id: int):
+    parent = index.parent_id(node_id)
+    return None if parent == hierarchy.NO_NODE else index.az_ids[parent]
+
+
+def diff(index: hierarchy.HierarchyIndex, mapping: dict) -> list:
+    """Changes that turn ``index`` into the index of ``mapping``."""
+    nodes = [node for node in (mapping or {}).values() if node.get("azId")]
+    new_parent = {}
+    for node in nodes:
+        for child in (node.get("children") or ()):
+            new_parent[child] = node["azId"]  # last parent wins, as in HierarchyIndex
+
+    changes = []
+    for node in nodes:
+        az_id = node["azId"]
+        name = node.get("name") or ""
+        parent = new_parent.get(az_id)
+        node_id = index.node_id(az_id)
+        if node_id is None:
+            changes.append(Change("added", az_id, name, None, parent))
+            continue
+        old_name = index.names[node_id]
+        if old_name != name:
+            changes.append(Change("renamed", az_id, name, old_name, name))
+        old_parent = _parent_az(index, node_id)
+        if old_parent != parent:
+            changes.append(Change("reparented", az_id, name, old_parent, parent))
+        old_meta = (index.type_of(node_id), index.md_ids[node_id])
+        new_meta = (node.get("type"), node.get("mdId") or None)
+        if old_meta != new_meta:
+            changes.append(Change("updated", az_id, name, old_meta, new_meta))
+
+    current = {node["azId"] for node in nodes}
+    for node_id in range(len(index.az_ids)):
+        if not index.is_live(node_id):
+            continue
+        az_id = index.az_ids[node_id]
+        if az_id not in current:
+            changes.append(Change("removed", az_id, index.names[node_id], _parent_az(index, node_id), None))
+    return changes
+
+
+def can_apply(index, changes: list) -> bool:
+    """In-place patching needs a writable index and a modest number of changes."""
+    from wppos.index_file import MappedIndex
+
+    if isinstance(index, MappedIndex):
+        return False
+    return len(changes) <= REBUILD_RATIO * max(len(index), 1)
+
+
+def apply(index: hierarchy.HierarchyIndex, changes: list, mapping: dict):
+    """Patch ``index`` in place so it matches ``mapping`` (``changes`` from diff)."""
+    if not changes:
+        return
+    nodes = {node["azId"]: node for node in mapping.values() if node.get("azId")}
+    affected = set()  # azIds whose children list has to be rebuilt
+
+    for change in changes:
+        if change.kind == "added":
+            index.add_node(nodes[change.az_id])
+    for change in changes:
+        node_id = index.node_id(change.az_id)
+        if change.kind == "removed":
+            affected.add(change.old)
+            index.remove_node(node_id)
+        elif change.kind in ("renamed", "updated"):
+            index.update_node(node_id, nodes[change.az_id])
+        elif change.kind in ("added", "reparented"):
+            affected.update((change.old, change.new))
+            parent_id = index.node_id(change.new) if change.new else None
+            index.set_parent(node_id, hierarchy.NO_NODE if parent_id is None else parent_id)
+        if change.kind == "added":
+            affected.add(change.az_id)
+
+    for az_id in affected:
+        node = nodes.get(az_id)
+        node_id = index.node_id(az_id) if az_id else None
+        if node is None or node_id is None:
+            continue
+        child_ids = [index.node_id(child) for child in (node.get("children") or ())]
+        index.set_children(node_id, [c for c in child_ids if c is not None])
+
+
+# --- Watch mode ---
+
+def describe(change: Change) -> str:
+    if change.kind == "added":
+        return f"➕ Added {change.name} ({change.az_id}) under {change.new or 'root'}"
+    if change.kind == "removed":
+        return f"➖ Removed {change.name} ({change.az_id}) from {change.old or 'root'}"
+    if change.kind == "renamed":
+        return f"✏️ Renamed {change.az_id}: {change.old} → {change.new}"
+    if change.kind == "reparented":
+        return f"↪️ Moved {change.name} ({change.az_id}): {change.old or 'root'} → {change.new or 'root'}"
+    return f"🔧 Updated {change.name} ({change.az_id}): type/mdId {change.old} → {change.new}"
+
+
+def watch(tenant_id: str, interval: float = None, headers=None, cookies=None, session=None,
+          on_change=None, iterations: int = None):
+    """Revalidate the snapshot every ``interval`` seconds and report changes.
+
+    ``on_change(change)`` defaults to printing ``describe(change)``;
+    ``iterations`` bounds the number of checks (None = forever).
+    """
+    interval = WATCH_INTERVAL if interval is None else interval
+    on_change = on_change or (lambda change: print(describe(change)))
+    index, _ = hierarchy.sync_index(tenant_id, headers=headers, cookies=cookies, session=session)
+    print(f"👀 Watching hierarchy ({len(index)} nodes), checking every {interval:g}s")
+    done = 0
+    while iterations is None or done < iterations:
+        time.sleep(interval)
+        done += 1
+        try:
+            index, changes = hierarchy.sync_index(tenant_id, headers=headers, cookies=cookies,
+                                                  session=session, ttl=0)
+        except RuntimeError as e:
+            print(f"⚠️ Check failed, retrying next interval: {e}")
+            continue
+        for change in changes or ():
+            on_change(change)
+
+
+def _json_printer(change):
+    """``watch`` callback for --json: one JSON object per change, flushed for pipes."""
+    print(json.dumps(change._asdict(), ensure_ascii=False))
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    import argparse
+
+    from wppos import config
+
+    parser = argparse.ArgumentParser(description="Poll the hierarchy and print nodes that changed.")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL,
+                        help=f"seconds between checks (default: {WATCH_INTERVAL:g})")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per change")
+    args = parser.parse_args(argv)
+
+    on_change = _json_printer if args.json else None
+    try:
+        watch(config.TENANT_ID, args.interval, headers=config.headers(), cookies=config.cookies(),
+              on_change=on_change)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
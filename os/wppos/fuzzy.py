@@ -0,0 +1,213 @@
+"""Trigram fuzzy matching for names that have no exact match.
+
+newl.py, market.py and allth/arch.py used to give up on a misspelled name and
+client.py could only show the API's first search hit. ``TrigramIndex`` keeps
+an inverted index from character trigrams to candidate names. A query counts
+shared trigrams over whole posting lists at once (``Counter.update``) and
+scores candidates (Jaccard similarity) from the largest count down, stopping
+as soon as the count alone cannot beat the k-th best; the leading candidates
+are picked with ``heapq.nlargest`` so most queries never sort all counts.
+Candidates come from the hierarchy index, the master-data catalogs or the
+group directory that the scripts already hold, so suggestions never cost an
+API call.
+
+``wpp-os suggest`` runs a whole file of names through one index.
+
+Environment knobs:
+    WPP_FUZZY_MIN_SCORE   lowest similarity reported (0-1, default 0.3)
+"""
+import heapq
+import os
+from collections import Counter
+from operator import itemgetter
+from typing import NamedTuple
+
+from wppos.catalog import normalize_name
+
+MIN_SCORE = float(os.getenv("WPP_FUZZY_MIN_SCORE", "0.3"))
+TOP_K = 3
+
+
+class Suggestion(NamedTuple):
+    name: str
+    score: float
+    ids: list   # payloads of every candidate with this (normalized) name
+
+
+def trigrams(key: str) -> set:
+    """Trigrams of a normalized name, padded so short names and word starts count."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Candidate names (deduplicated by ``normalize_name``) behind a trigram index."""
+
+    def __init__(self, names, payloads=None):
+        self.keys = []       # candidate id -> normalized name
+        self.labels = []     # candidate id -> name as first seen
+        self.payloads = []   # candidate id -> [payload]
+        self.sizes = []      # candidate id -> number of distinct trigrams
+        self.postings = {}   # trigram -> [candidate id]
+        self._ids = {}       # normalized name -> candidate id
+        payloads = iter(payloads) if payloads is not None else None
+        for name in names:
+            self.add(name, next(payloads) if payloads is not None else name)
+
+    def add(self, name: str, payload=None):
+        key = normalize_name(name)
+        if not key:
+            return
+        cid = self._ids.get(key)
+        if cid is not None:
+            self.payloads[cid].append(payload)
+            return
+        cid = self._ids[key] = len(self.keys)
+        grams = trigrams(key)
+        self.keys.append(key)
+        self.labels.append(name.strip())
+        self.payloads.append([payload])
+        self.sizes.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(cid)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def exact(self, name: str) -> list:
+        """Payloads of the candidates whose normalized name equals ``name``."""
+        cid = self._ids.get(normalize_name(name))
+        return [] if cid is None else list(self.payloads[cid])
+
+    def top(self, name: str, k: int = TOP_K, min_score: float = None) -> list:
+        """Up to ``k`` best ``Suggestion``s for ``name`` scoring at least ``min_score``, best first."""
+        min_score = MIN_SCORE if min_score is None else min_score
+        grams = trigrams(normalize_name(name))
+        shared = Counter()
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting:
+                shared.update(posting)
+        n = len(grams)
+
+        # Jaccard = c / (n + size - c) <= c / n: walking candidates from the largest
+        # shared count down can stop once c / n cannot beat the k-th best score.
+        # The first few by count (picked in C) nearly always settle it.
+        best = []  # min-heap of (score, cid)
+        head = heapq.nlargest(max(4 * k, 16), shared.items(), key=itemgetter(1))
+        if not self._score(head, n, k, min_score, best) and len(head) < len(shared):
+            self._score(shared.most_common()[len(head):], n, k, min_score, best)
+        return [Suggestion(self.labels[cid], round(score, 3), list(self.payloads[cid]))
+                for score, cid in sorted(best, reverse=True)]
+
+    def _score(self, ranked, n: int, k: int, min_score: float, best: list) -> bool:
+        """Push count-descending ``ranked`` candidates into ``best``.
+
+        Returns True once the remaining candidates cannot qualify.
+        """
+        sizes = self.sizes
+        for cid, count in ranked:
+            floor = best[0][0] if len(best) == k else min_score
+            if count < floor * n:
+                return True
+            score = count / (n + sizes[cid] - count)
+            if score < floor:
+                continue
+            if len(best) < k:
+                heapq.heappush(best, (score, cid))
+            else:
+                heapq.heapreplace(best, (score, cid))
+        return False
+
+    def top_many(self, names, k: int = TOP_K, min_score: float = None) -> dict:
+        """name -> suggestions for every distinct name (one index, no API calls)."""
+        return {name: self.top(name, k, min_score) for name in dict.fromkeys(names)}
+
+
+def describe(suggestions: list) -> str:
+    """'A (0.91), B (0.74)' for log lines."""
+    return ", ".join(f"{s.name} ({s.score:.2f})" for s in suggestions)
+
+
+# --- Candidate sources ---
+
+def for_hierarchy(index, types=None) -> TrigramIndex:
+    """Names of the live hierarchy nodes (optionally only ``types``), payload azId."""
+    names = index.names
+    az_ids = index.az_ids
+    node_ids = [i for i in range(len(az_ids)) if index.is_live(i)
+                and (types is None or index.type_of(i) in types)]
+    return TrigramIndex((names[i] for i in node_ids), (az_ids[i] for i in node_ids))
+
+
+def for_catalog(catalog) -> TrigramIndex:
+    """Entries of a ``catalog.MasterCatalog``, payload mdId."""
+    len(catalog)  # loads it
+    entries = list(catalog.items.values())
+    return TrigramIndex((e.get("name") or "" for e in entries), (e["id"] for e in entries))
+
+
+def for_groups(directory) -> TrigramIndex:
+    """Groups of a ``groups.GroupDirectory``, payload group id."""
+    len(directory)  # loads it
+    groups = list(directory.by_id.values())
+    return TrigramIndex((g.get("name") or "" for g in groups), (g.get("id") for g in groups))
+
+
+def main(argv=None):
+    import argparse
+
+    from wppos import config
+
+    parser = argparse.ArgumentParser(description="Suggest the closest known names for each input name.")
+    parser.add_argument("input", nargs="?", help="TXT file, one name per line")
+    parser.add_argument("-n", "--name", action="append", help="check this name instead of reading a file (repeatable)")
+    parser.add_argument("--source", choices=("hierarchy", "clients", "brands", "groups"), default="hierarchy",
+                        help="where candidate names come from (default: hierarchy)")
+    parser.add_argument("--type", action="append", dest="types",
+                        help="hierarchy node type to consider, e.g. CLIENT (repeatable)")
+    parser.add_argument("-k", type=int, default=TOP_K, help=f"suggestions per name (default: {TOP_K})")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE,
+                        help=f"lowest similarity shown (default: {MIN_SCORE:g})")
+    args = parser.parse_args(argv)
+
+    if args.name:
+        names = args.name
+    elif args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            names = [line.strip() for line in f if line.strip()]
+    else:
+        parser.error("give an input file or --name")
+
+    if args.source == "hierarchy":
+        from wppos import hierarchy
+
+        index = hierarchy.get_index(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+        matcher = for_hierarchy(index, args.types)
+    elif args.source == "groups":
+        from wppos import groups
+
+        matcher = for_groups(groups.get_directory(config.TENANT_ID, headers=config.headers(),
+                                                  cookies=config.cookies()))
+    else:
+        from wppos import catalog
+
+        matcher = for_catalog(catalog.get_catalog(args.source, headers=config.headers(), cookies=config.cookies()))
+
+    results = matcher.top_many(names, args.k, args.min_score)
+    exact = missing = 0
+    for name, suggestions in results.items():
+        if matcher.exact(name):
+            exact += 1
+            print(f"✅ {name}")
+        elif suggestions:
+            print(f"🔎 {name} → {describe(suggestions)}")
+        else:
+            missing += 1
+            print(f"⚠️ {name} → no similar name")
+    print(f"\n📊 {exact} exact, {len(results) - exact - missing} with suggestions, {missing} without "
+          f"({len(matcher)} candidate names)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Tenant-wide group directory.
+
+adduser.py and group.py used to call /groups?filter[search]=... once per input
+row and only looked at the first 50 hits. ``GroupDirectory`` pages through the
+whole group list once (pages fetched in parallel) into a normalized-name
+index, so lookups are local and never miss a group past result 50.
+"""
+import threading
+
+from wppos import config, runner, transport
+from wppos.hierarchy import normalize
+
+BASE_URL = config.BASE_URL
+PAGE_SIZE = 100
+
+
+class GroupDirectory:
+    """Every group of a tenant, indexed by normalized name."""
+
+    def __init__(self, tenant_id: str, headers=None, cookies=None, session=None,
+                 page_size: int = PAGE_SIZE):
+        self.tenant_id = tenant_id
+        self.headers = headers
+        self.cookies = cookies
+        self.http = session or transport
+        self.page_size = page_size
+        self.by_name = {}   # normalized name -> [group]
+        self.by_id = {}     # id -> group
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def url(self) -> str:
+        return f"{BASE_URL}/api/tenants/{self.tenant_id}/groups"
+
+    def _fetch_page(self, page: int) -> dict:
+        params = {"page": page, "itemsPerPage": self.page_size, "sort": "name"}
+        r = self.http.get(self.url, headers=self.headers, cookies=self.cookies, params=params)
+        if r.status_code not in (200, 201):
+            raise RuntimeError(f"Groups API failed: {r.status_code} - {r.text}")
+        return r.json()
+
+    def refresh(self):
+        """Re-crawl the full group list (page 1 first, then the rest in parallel)."""
+        groups = runner.crawl_pages(self._fetch_page, self.page_size)
+
+        with self._lock:
+            self.by_name = {}
+            self.by_id = {}
+            for group in groups:
+                self._index(group)
+            self._loaded = True
+
+    def _index(self, group: dict):
+        self.by_id[group.get("id")] = group
+        self.by_name.setdefault(normalize(group.get("name")), []).append(group)
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if not self._loaded:
+                self.refresh()
+
+    def find(self, name: str) -> list:
+        """Groups whose name matches ``name`` case-insensitively."""
+        self._ensure_loaded()
+        return list(self.by_name.get(normalize(name), []))
+
+    def get_by_id(self, group_id: str):
+        """The group with id ``group_id``, or None."""
+        self._ensure_loaded()
+        return self.by_id.get(group_id)
+
+    def first_id(self, name: str):
+        groups = self.find(name)
+        return groups[0].get("id") if groups else None
+
+    def add(self, group: dict):
+        """Record a group created by this process (create responses carry ``uid``)."""
+        group = dict(group)
+        group.setdefault("id", group.get("uid"))
+        with self._lock:
+            if self._loaded and group["id"] not in self.by_id:
+                self._index(group)
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self.by_id)
+
+
+# tenant_id -> GroupDirectory
+_directories = {}
+_lock = threading.Lock()
+
+
+def get_directory(tenant_id: str, headers=None, cookies=None, session=None) -> GroupDirectory:
+    """Process-wide directory for a tenant, loaded lazily on the first lookup."""
+    with _lock:
+        directory = _directories.get(tenant_id)
+        if directory is None:
+            directory = GroupDirectory(tenant_id, headers=headers, cookies=cookies, session=session)
+            _directories[tenant_id] = directory
+        return directory
@@ -0,0 +1,496 @@
+"""Precomputed lookup indexes over a hierarchy-tree snapshot.
+
+The scripts used to resolve names with ``next(item for item in
+mapping.values() if ...)``. ``HierarchyIndex`` is built once per snapshot and
+answers the same questions with dictionary hits.
+
+Nodes are stored column-wise: every node gets an integer id, names and types
+are interned, the parent of each node lives in one ``array`` and children in
+a CSR pair (``child_start`` offsets into ``child_ids_flat``). Lookups return
+``Node`` views (two slots each) that read like the old JSON dicts, and walks
+can stay on integer ids throughout (``node_id``, ``parent_id``,
+``child_ids``, ``type_of``).
+
+A built index can be updated in place (see delta.py): new nodes are
+appended, removed ids become tombstones and changed children lists go to a
+small overlay in front of the CSR arrays.
+
+Ancestry questions ("is X anywhere under market M", "which client owns X")
+are answered in O(1) from ``Ancestry`` tables built on first use: Euler-tour
+entry/exit numbers and, per type, the nearest ancestor of that type. Any
+in-place update drops them; they are rebuilt on the next question.
+"""
+import sys
+import threading
+from array import array
+
+from wppos import tree_cache
+
+# When names collide, CLIENT nodes win over BRAND nodes (same order ctemp.py uses)
+TYPE_RANK = {"CLIENT": 0, "BRAND": 1}
+
+NO_NODE = -1
+
+# Types whose nearest-ancestor table is built with the Euler tour (and persisted
+# by index_file.py); other types get theirs on first use
+ANCESTRY_TYPES = ("CLIENT", "MARKET")
+
+
+def normalize(name) -> str:
+    """Case-insensitive, whitespace-trimmed form used for every name lookup."""
+    return (name or "").strip().lower()
+
+
+def _add_posting(postings: dict, key, node_id: int):
+    """Postings hold a bare int for the common single-node case, a list otherwise."""
+    current = postings.get(key)
+    if current is None:
+        postings[key] = node_id
+    elif isinstance(current, int):
+        postings[key] = [current, node_id]
+    else:
+        current.append(node_id)
+
+
+def _drop_posting(postings: dict, key, node_id: int):
+    current = postings.get(key)
+    if current == node_id:
+        del postings[key]
+    elif isinstance(current, list) and node_id in current:
+        current.remove(node_id)
+        if len(current) == 1:
+            postings[key] = current[0]
+
+
+def _posting_ids(postings: dict, key) -> tuple:
+    current = postings.get(key)
+    if current is None:
+        return ()
+    if isinstance(current, int):
+        return (current,)
+    return tuple(current)
+
+
+class Node:
+    """Read-only view of one node; behaves like the trimmed JSON dict."""
+
+    __slots__ = ("_index", "id")
+
+    FIELDS = ("azId", "mdId", "name", "type", "children")
+
+    def __init__(self, index: "HierarchyIndex", node_id: int):
+        self._index = index
+        self.id = node_id
+
+    def __getitem__(self, field):
+        index, i = self._index, self.id
+        if field == "azId":
+            return index.az_ids[i]
+        if field == "name":
+            return index.names[i]
+        if field == "type":
+            return index.type_of(i)
+        if field == "children":
+            return [index.az_ids[c] for c in index.child_ids(i)]
+        if field == "mdId":
+            md_id = index.md_ids[i]
+            if md_id is not None:
+                return md_id
+        raise KeyError(field)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __contains__(self, field):
+        return self.get(field) is not None
+
+    def keys(self):
+        return [field for field in self.FIELDS if field in self]
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and other._index is self._index and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self._index), self.id))
+
+    def __repr__(self):
+        return f"Node({ {field: self[field] for field in self.keys()} })"
+
+
+class Ancestry:
+    """Euler-tour numbers and nearest-typed-ancestor tables for one tree state.
+
+    Nodes are numbered in preorder from every root: ``enter[v]`` is v's number
+    and ``exit[v]`` the last number inside v's subtree, so a is v or one of its
+    ancestors exactly when ``enter[a] <= enter[v] <= exit[a]``.
+    ``nearest[type][v]`` is the closest node of that type from v up to its
+    root, v included. Nodes no root reaches (parent cycles) keep NO_NODE.
+    """
+
+    def __init__(self, enter, exit, nearest=None, order=None):
+        self.enter = enter
+        self.exit = exit
+        self.nearest = dict(nearest or {})  # type -> node id -> node id
+        self._order = order
+
+    def order(self):
+        """Node ids in preorder (rebuilt from ``enter`` for a loaded index)."""
+        if self._order is None:
+            order = array("l", [NO_NODE]) * (max(self.exit, default=NO_NODE) + 1)
+            for node_id, position in enumerate(self.enter):
+                if position != NO_NODE:
+                    order[position] = node_id
+            self._order = order
+        return self._order
+
+
+class HierarchyIndex:
+    """Name/type/azId/mdId/parent indexes for one hierarchy mapping."""
+
+    # Overridden per instance once the index is updated in place
+    _children_overlay = {}   # node id -> array of child ids (replaces the CSR range)
+    _removed = frozenset()   # tombstoned node ids
+    _ancestry = None         # Ancestry, built on first use
+
+    def __init__(self, mapping: dict):
+        self.az_ids = []                 # node id -> azId
+        self.md_ids = []                 # node id -> mdId or None
+        self.names = []                  # node id -> interned name
+        self.types = array("B")          # node id -> code into type_names
+        self.type_names = []             # type code -> interned type
+        self.parents = array("l")        # node id -> parent node id (NO_NODE for roots)
+        self.child_start = array("l")    # CSR offsets into child_ids_flat (n + 1 entries)
+        self.child_ids_flat = array("l")
+
+        self.id_of = {}      # azId -> node id
+        self.by_name = {}    # normalized name -> id or [ids], CLIENT before BRAND
+        self.by_mdid = {}    # mdId -> id or [ids]
+        self._type_code = {}
+
+        nodes = [node for node in (mapping or {}).values() if node.get("azId")]
+        for node in nodes:
+            self._add(node)
+
+        # Children need every id assigned first
+        self.parents = array("l", [NO_NODE]) * len(self.az_ids)
+        self.child_start.append(0)
+        for node in nodes:
+            parent = self.id_of[node["azId"]]
+            for child in (node.get("children") or []):
+                child_id = self.id_of.get(child)
+                if child_id is None:
+                    continue
+                self.child_ids_flat.append(child_id)
+                self.parents[child_id] = parent
+            self.child_start.append(len(self.child_ids_flat))
+
+        for key, ids in self.by_name.items():
+            if not isinstance(ids, int):
+                ids.sort(key=self._rank)  # stable: keeps snapshot order inside a rank
+
+    def _add(self, node: dict) -> int:
+        node_id = len(self.az_ids)
+        az_id = node["azId"]
+        self.az_ids.append(az_id)
+        self.md_ids.append(node.get("mdId") or None)
+        name = sys.intern(node.get("name") or "")
+        self.names.append(name)
+        self.types.append(self._code_for(node.get("type")))
+        self.id_of[az_id] = node_id
+        _add_posting(self.by_name, sys.intern(normalize(name)), node_id)
+        if node.get("mdId"):
+            _add_posting(self.by_mdid, node["mdId"], node_id)
+        return node_id
+
+    def _code_for(self, type_name) -> int:
+        code = self._type_code.get(type_name)
+        if code is None:
+            code = len(self.type_names)
+            self._type_code[type_name] = code
+            self.type_names.append(sys.intern(type_name) if isinstance(type_name, str) else type_name)
+        return code
+
+    def _rank(self, node_id: int) -> int:
+        return TYPE_RANK.get(self.type_of(node_id), len(TYPE_RANK))
+
+    def _add_name_posting(self, node_id: int):
+        key = sys.intern(normalize(self.names[node_id]))
+        _add_posting(self.by_name, key, node_id)
+        ids = self.by_name[key]
+        if not isinstance(ids, int):
+            ids.sort(key=self._rank)
+
+    def __len__(self):
+        return len(self.az_ids) - len(self._removed)
+
+    # --- In-place updates (used by delta.apply) ---
+
+    def _make_mutable(self):
+        self._ancestry = None
+        if "_children_overlay" not in self.__dict__:
+            self._children_overlay = {}
+            self._removed = set()
+
+    def add_node(self, node: dict) -> int:
+        """Append a node (children/parent are set separately). Returns its id."""
+        self._make_mutable()
+        node_id = len(self.az_ids)
+        az_id = node["azId"]
+        self.az_ids.append(az_id)
+        self.md_ids.append(node.get("mdId") or None)
+        self.names.append(sys.intern(node.get("name") or ""))
+        self.types.append(self._code_for(node.get("type")))
+        self.parents.append(NO_NODE)
+        self.child_start.append(self.child_start[-1])  # empty CSR range
+        self.id_of[az_id] = node_id
+        self._add_name_posting(node_id)
+        if node.get("mdId"):
+            _add_posting(self.by_mdid, node["mdId"], node_id)
+        return node_id
+
+    def remove_node(self, node_id: int):
+        self._make_mutable()
+        _drop_posting(self.by_name, normalize(self.names[node_id]), node_id)
+        if self.md_ids[node_id]:
+            _drop_posting(self.by_mdid, self.md_ids[node_id], node_id)
+        self.id_of.pop(self.az_ids[node_id], None)
+        self.parents[node_id] = NO_NODE
+        self._children_overlay[node_id] = array("l")
+        self._removed.add(node_id)
+
+    def update_node(self, node_id: int, node: dict):
+        """Apply a new name / type / mdId to an existing node."""
+        self._make_mutable()
+        _drop_posting(self.by_name, normalize(self.names[node_id]), node_id)
+        if self.md_ids[node_id]:
+            _drop_posting(self.by_mdid, self.md_ids[node_id], node_id)
+        self.names[node_id] = sys.intern(node.get("name") or "")
+        self.types[node_id] = self._code_for(node.get("type"))
+        self.md_ids[node_id] = node.get("mdId") or None
+        self._add_name_posting(node_id)
+        if self.md_ids[node_id]:
+            _add_posting(self.by_mdid, self.md_ids[node_id], node_id)
+
+    def set_children(self, node_id: int, child_ids):
+        self._make_mutable()
+        self._children_overlay[node_id] = array("l", child_ids)
+
+    def set_parent(self, node_id: int, parent_id: int):
+        self._ancestry = None
+        self.parents[node_id] = parent_id
+
+    def is_live(self, node_id: int) -> bool:
+        return node_id not in self._removed
+
+    # --- Integer-id access (used by walks) ---
+
+    def node_id(self, az_id: str):
+        """Integer id for an azId, or None."""
+        return self.id_of.get(az_id)
+
+    def view(self, node_id: int) -> Node:
+        return Node(self, node_id)
+
+    def type_of(self, node_id: int):
+        return self.type_names[self.types[node_id]]
+
+    def parent_id(self, node_id: int) -> int:
+        return self.parents[node_id]
+
+    def child_ids(self, node_id: int):
+        overlay = self._children_overlay.get(node_id)
+        if overlay is not None:
+            return overlay
+        return self.child_ids_flat[self.child_start[node_id]:self.child_start[node_id + 1]]
+
+    # --- Ancestry (O(1) once the tables exist) ---
+
+    def ancestry(self) -> Ancestry:
+        """Ancestry tables for the current tree, built on first use."""
+        ancestry = self._ancestry
+        if ancestry is None:
+            ancestry = self._ancestry = self._build_ancestry()
+        return ancestry
+
+    def _build_ancestry(self) -> Ancestry:
+        parents = self.parents
+        n = len(parents)
+        removed = self._removed
+
+        # Preorder over the children arrays, following only links the parents
+        # array agrees with, so every node is visited once even in bad data
+        order = array("l")
+        stack = [i for i in range(n - 1, -1, -1) if parents[i] == NO_NODE and i not in removed]
+        while stack:
+            node_id = stack.pop()
+            order.append(node_id)
+            children = self.child_ids(node_id)
+            if children:
+                stack.extend([c for c in reversed(children) if parents[c] == node_id])
+
+        enter = array("l", [NO_NODE]) * n
+        for position, node_id in enumerate(order):
+            enter[node_id] = position
+        # exit = last preorder number in the subtree: children come after their parent
+        exit = array("l", enter)
+        for node_id in reversed(order):
+            parent = parents[node_id]
+            if parent != NO_NODE and exit[node_id] > exit[parent]:
+                exit[parent] = exit[node_id]
+
+        ancestry = Ancestry(enter, exit, order=order)
+        for type_name in ANCESTRY_TYPES:
+            ancestry.nearest[type_name] = self._nearest_table(ancestry, type_name)
+        return ancestry
+
+    def _nearest_table(self, ancestry: Ancestry, type_name) -> array:
+        nearest = array("l", [NO_NODE]) * len(self.parents)
+        code = self._type_code.get(type_name)
+        if code is None:
+            return nearest
+        types, parents = self.types, self.parents
+        for node_id in ancestry.order():  # parents before children
+            if types[node_id] == code:
+                nearest[node_id] = node_id
+            elif parents[node_id] != NO_NODE:
+                nearest[node_id] = nearest[parents[node_id]]
+        return nearest
+
+    def _nearest(self, type_name):
+        ancestry = self.ancestry()
+        table = ancestry.nearest.get(type_name)
+        if table is None:
+            table = ancestry.nearest[type_name] = self._nearest_table(ancestry, type_name)
+        return table
+
+    def is_ancestor(self, ancestor_id: int, node_id: int) -> bool:
+        """True if ``ancestor_id`` is ``node_id`` or above it, at any depth."""
+        ancestry = self.ancestry()
+        start = ancestry.enter[ancestor_id]
+        return start != NO_NODE and start <= ancestry.enter[node_id] <= ancestry.exit[ancestor_id]
+
+    def nearest_ancestor(self, node_id: int, type_name) -> int:
+        """Closest node of ``type_name`` from ``node_id`` up (itself included), or NO_NODE."""
+        return self._nearest(type_name)[node_id]
+
+    def ancestors_of_type(self, node_id: int, type_name):
+        """Every node of ``type_name`` from ``node_id`` up to its root, nearest first."""
+        nearest = self._nearest(type_name)
+        current = nearest[node_id]
+        while current != NO_NODE:
+            yield current
+            parent = self.parents[current]
+            current = nearest[parent] if parent != NO_NODE else NO_NODE
+
+    def find_ids(self, name: str, types=None) -> list:
+        """Ids of all nodes called ``name`` (optionally of the given types), ranked."""
+        ids = _posting_ids(self.by_name, normalize(name))
+        if types is None:
+            return list(ids)
+        return [i for i in ids if self.type_of(i) in types]
+
+    def find_ids_by_mdid(self, md_id: str, types=None) -> list:
+        ids = _posting_ids(self.by_mdid, md_id)
+        if types is None:
+            return list(ids)
+        return [i for i in ids if self.type_of(i) in types]
+
+    def ids_of_type(self, type_name) -> list:
+        code = self._type_code.get(type_name)
+        if code is None:
+            return []
+        return [i for i, c in enumerate(self.types) if c == code and i not in self._removed]
+
+    # --- Node views (what the scripts use) ---
+
+    def find(self, name: str, types=None) -> list:
+        """All nodes called ``name`` (optionally of the given types), ranked."""
+        return [Node(self, i) for i in self.find_ids(name, types)]
+
+    def first(self, name: str, types=None):
+        """Best-ranked node called ``name`` or None."""
+        ids = self.find_ids(name, types)
+        return Node(self, ids[0]) if ids else None
+
+    def find_by_mdid(self, md_id: str, types=None) -> list:
+        return [Node(self, i) for i in self.find_ids_by_mdid(md_id, types)]
+
+    def node(self, az_id: str):
+        node_id = self.id_of.get(az_id)
+        return None if node_id is None else Node(self, node_id)
+
+    def parent(self, az_id: str):
+        node_id = self.id_of.get(az_id)
+        if node_id is None or self.parents[node_id] == NO_NODE:
+            return None
+        return self.az_ids[self.parents[node_id]]
+
+    def children(self, az_id: str) -> list:
+        node_id = self.id_of.get(az_id)
+        if node_id is None:
+            return []
+        return [self.az_ids[c] for c in self.child_ids(node_id)]
+
+
+# tenant_id -> (serial of the snapshot the index was built from, index)
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_index(tenant_id: str, headers=None, cookies=None, session=None,
+              ttl: float = None, force_refresh: bool = False) -> HierarchyIndex:
+    """Index for the tenant's cached snapshot, rebuilt only when the snapshot changes.
+
+    The persisted index (index_file.py) is memory-mapped when its stamp
+    matches the snapshot, so a warm start never decodes the snapshot. Otherwise
+    the index is built, saved for the next run, and the snapshot's dict
+    mapping is released so only the compact index stays resident.
+    """
+    return sync_index(tenant_id, headers=headers, cookies=cookies, session=session,
+                      ttl=ttl, force_refresh=force_refresh)[0]
+
+
+def sync_index(tenant_id: str, headers=None, cookies=None, session=None,
+               ttl: float = None, force_refresh: bool = False) -> tuple:
+    """``(index, changes)`` like get_index, plus what changed since the last call.
+
+    When a new snapshot arrives while an index is resident, the two are diffed
+    (delta.py) and the index is updated in place; ``changes`` lists the
+    ``delta.Change`` records. It is ``[]`` when nothing changed and None when
+    there was no previous index to compare with.
+    """
+    from wppos import delta, index_file
+
+    with _lock:
+        snapshot = tree_cache.get_snapshot(tenant_id, headers=headers, cookies=cookies, session=session,
+                                           ttl=ttl, force_refresh=force_refresh, load_mapping=False)
+        cached = _indexes.get(tenant_id)
+        if cached and cached[0] == snapshot["serial"]:
+            return cached[1], []
+
+        index = None
+        changes = None
+        if cached is not None and snapshot["mapping"] is not None:
+            changes = delta.diff(cached[1], snapshot["mapping"])
+            if delta.can_apply(cached[1], changes):
+                delta.apply(cached[1], changes, snapshot["mapping"])
+                index = cached[1]
+
+        if index is None:
+            path = tree_cache.index_path(tenant_id)
+            index = index_file.load(path, snapshot["stamp"])
+            if index is None:
+                if snapshot["mapping"] is None:
+                    snapshot = tree_cache.get_snapshot(tenant_id, headers=headers, cookies=cookies,
+                                                       session=session, ttl=ttl)
+                index = HierarchyIndex(snapshot["mapping"])
+                try:
+                    index_file.save(index, path, snapshot["stamp"])
+                except OSError:
+                    pass  # e.g. the old file is still mapped elsewhere; rebuilt next run
+        _indexes[tenant_id] = (snapshot["serial"], index)
+        tree_cache.release_mapping(tenant_id, snapshot["serial"])
+        return index, changes
@@ -0,0 +1,264 @@
+"""Persisted, memory-mapped form of ``HierarchyIndex``.
+
+Building the index means decoding the whole snapshot. Instead, the built
+index is written once to ``.cache/hierarchy-<tenant>.idx`` and later runs
+(and worker processes) ``mmap`` it read-only: opening costs a header read,
+pages are shared between processes through the OS page cache, and integer
+columns are used in place through ``memoryview.cast``.
+
+Layout (native byte order, every section 8-byte aligned)::
+
+    MAGIC | u32 header length | JSON header | sections ...
+
+The JSON header carries ``format`` (FORMAT_VERSION + byte order), the
+snapshot ``stamp`` the index was built from, the node count and the
+``(offset, length)`` of every section. A file whose format or stamp does not
+match is treated as missing and rebuilt by the caller.
+
+String columns are a UTF-8 blob plus ``u32`` offsets. Lookups go through
+sorted key columns (binary search on bytes, which sorts like ``str``):
+azIds through a sorted permutation, names and mdIds through distinct sorted
+keys with CSR postings (name postings keep the CLIENT-before-BRAND rank).
+The ancestry tables (Euler-tour enter/exit and the nearest CLIENT / MARKET
+per node) are saved too, so a warm start answers ancestry questions without
+walking the tree.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from wppos import hierarchy
+
+MAGIC = b"WPPOSIDX"
+FORMAT_VERSION = 2
+FORMAT = f"{FORMAT_VERSION}-{sys.byteorder}"
+
+_ALIGN = 8
+
+
+class StringColumn:
+    """Read-only sequence of strings stored as blob + offsets."""
+
+    def __init__(self, blob, offsets, empty_is_none: bool = False):
+        self._blob = blob
+        self._offsets = offsets
+        self._empty_is_none = empty_is_none
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        value = self.raw(i).decode("utf-8")
+        return None if (self._empty_is_none and not value) else value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _bisect(key_at, count: int, target: bytes):
+    """Position of ``target`` among ``count`` sorted keys, or None."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key_at(mid) < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo < count and key_at(lo) == target:
+        return lo
+    return None
+
+
+class MappedIndex(hierarchy.HierarchyIndex):
+    """``HierarchyIndex`` whose columns live in a read-only memory map."""
+
+    def __init__(self, path: str, header: dict, mm: mmap.mmap):
+        self.path = path
+        self.stamp = header["stamp"]
+        self._mm = mm
+        view = memoryview(mm)
+        sections = header["sections"]
+
+        def section(name, fmt=None):
+            offset, length = sections[name]
+            part = view[offset:offset + length]
+            return part.cast(fmt) if fmt else part
+
+        def strings(name, empty_is_none=False):
+            return StringColumn(section(f"{name}.blob"), section(f"{name}.offsets", "I"), empty_is_none)
+
+        self.az_ids = strings("az")
+        self.md_ids = strings("md", empty_is_none=True)
+        self.names = strings("names")
+        self.type_names = [name or None for name in strings("type_names")]
+        self.types = section("types", "B")
+        self.parents = section("parents", "i")
+        self.child_start = section("child_start", "i")
+        self.child_ids_flat = section("child_ids", "i")
+        self._az_sorted = section("az_sorted", "i")
+        self._name_keys = strings("name_keys")
+        self._name_start = section("name_start", "i")
+        self._name_post = section("name_post", "i")
+        self._md_keys = strings("md_keys")
+        self._md_start = section("md_start", "i")
+        self._md_post = section("md_post", "i")
+        self._type_code = {name: code for code, name in enumerate(self.type_names)}
+        self._ancestry = hierarchy.Ancestry(
+            section("euler_enter", "i"), section("euler_exit", "i"),
+            {type_name: section(f"nearest.{type_name}", "i") for type_name in header["nearest"]},
+        )
+
+    def __len__(self):
+        return len(self.parents)
+
+    def node_id(self, az_id: str):
+        if not az_id:
+            return None
+        pos = _bisect(lambda k: self.az_ids.raw(self._az_sorted[k]), len(self._az_sorted),
+                      az_id.encode("utf-8"))
+        return None if pos is None else self._az_sorted[pos]
+
+    def _postings(self, keys: StringColumn, start, post, key: str) -> list:
+        pos = _bisect(keys.raw, len(keys), key.encode("utf-8"))
+        if pos is None:
+            return []
+        return list(post[start[pos]:start[pos + 1]])
+
+    def find_ids(self, name: str, types=None) -> list:
+        ids = self._postings(self._name_keys, self._name_start, self._name_post, hierarchy.normalize(name))
+        if types is None:
+            return ids
+        return [i for i in ids if self.type_of(i) in types]
+
+    def find_ids_by_mdid(self, md_id: str, types=None) -> list:
+        if not md_id:
+            return []
+        ids = self._postings(self._md_keys, self._md_start, self._md_post, md_id)
+        if types is None:
+            return ids
+        return [i for i in ids if self.type_of(i) in types]
+
+    def node(self, az_id: str):
+        node_id = self.node_id(az_id)
+        return None if node_id is None else hierarchy.Node(self, node_id)
+
+    def parent(self, az_id: str):
+        node_id = self.node_id(az_id)
+        if node_id is None or self.parents[node_id] == hierarchy.NO_NODE:
+            return None
+        return self.az_ids[self.parents[node_id]]
+
+    def children(self, az_id: str) -> list:
+        node_id = self.node_id(az_id)
+        if node_id is None:
+            return []
+        return [self.az_ids[c] for c in self.child_ids(node_id)]
+
+
+# --- Writing ---
+
+def _string_sections(name: str, values) -> list:
+    offsets = [0]
+    parts = []
+    for value in values:
+        data = (value or "").encode("utf-8")
+        parts.append(data)
+        offsets.append(offsets[-1] + len(data))
+    return [(f"{name}.blob", b"".join(parts)), (f"{name}.offsets", _pack("I", offsets))]
+
+
+def _pack(fmt: str, values) -> bytes:
+    return array(fmt, values).tobytes()
+
+
+def _posting_sections(prefix: str, postings: dict) -> list:
+    keys = sorted(postings)
+    start = [0]
+    flat = []
+    for key in keys:
+        ids = postings[key]
+        flat.extend([ids] if isinstance(ids, int) else ids)
+        start.append(len(flat))
+    return (_string_sections(f"{prefix}_keys", keys)
+            + [(f"{prefix}_start", _pack("i", start)), (f"{prefix}_post", _pack("i", flat))])
+
+
+def save(index: hierarchy.HierarchyIndex, path: str, stamp: str):
+    """Write ``index`` to ``path`` atomically. Errors (e.g. the old file is
+    still mapped by another process on Windows) are left to the caller."""
+    n = len(index)
+    ancestry = index.ancestry()
+    sections = (
+        _string_sections("az", index.az_ids)
+        + _string_sections("md", index.md_ids)
+        + _string_sections("names", index.names)
+        + _string_sections("type_names", [str(t) if t is not None else "" for t in index.type_names])
+        + [
+            ("types", bytes(index.types)),
+            ("parents", _pack("i", index.parents)),
+            ("child_start", _pack("i", index.child_start)),
+            ("child_ids", _pack("i", index.child_ids_flat)),
+            ("az_sorted", _pack("i", sorted(range(n), key=index.az_ids.__getitem__))),
+        ]
+        + _posting_sections("name", index.by_name)
+        + _posting_sections("md", index.by_mdid)
+        + [("euler_enter", _pack("i", ancestry.enter)), ("euler_exit", _pack("i", ancestry.exit))]
+        + [(f"nearest.{t}", _pack("i", ancestry.nearest[t])) for t in hierarchy.ANCESTRY_TYPES]
+    )
+
+    # Header size depends on the offsets it lists: lay out with a fixed-width guess first
+    table = {name: [0, len(data)] for name, data in sections}
+    header = {"format": FORMAT, "stamp": stamp, "nodes": n, "nearest": list(hierarchy.ANCESTRY_TYPES),
+              "sections": table}
+    header_len = len(json.dumps(header)) + 64 * len(sections)
+    offset = _aligned(len(MAGIC) + 4 + header_len)
+    for name, data in sections:
+        table[name][0] = offset
+        offset = _aligned(offset + len(data))
+    header_bytes = json.dumps(header).encode("utf-8").ljust(header_len)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", header_len) + header_bytes)
+        for name, data in sections:
+            f.write(b"\0" * (table[name][0] - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+# --- Reading ---
+
+def load(path: str, stamp: str):
+    """``MappedIndex`` for ``path`` if it exists and matches ``stamp`` and FORMAT, else None."""
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(MAGIC) + 4)
+            if len(prefix) < len(MAGIC) + 4 or prefix[:len(MAGIC)] != MAGIC:
+                return None
+            (header_len,) = struct.unpack("<I", prefix[len(MAGIC):])
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            if header.get("format") != FORMAT or header.get("stamp") != stamp:
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        return MappedIndex(path, header, mm)
+    except (KeyError, TypeError, ValueError):
+        return None
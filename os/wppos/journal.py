@@ -0,0 +1,135 @@
+"""Machine-readable run journal (one JSON record per input item).
+
+The scripts used to monkeypatch ``print`` to tee every line into output.txt
+with a flush per line, and ``*/output/output.py`` parsed the emoji text back
+with regexes. Now each item gets one JSONL record::
+
+    {"ts": ..., "script": "client", "key": "LVMH", "outcome": "success",
+     "status": 201, "latency_ms": 143.2, "ids": {"mdId": "..."}, "message": "..."}
+
+Records are queued and written in batches by a background thread, so the hot
+loop never waits on the disk. An attached checkpoint is marked by that thread
+only after the batch is flushed, so an item is never "done" for ``--resume``
+without its journal line.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.5  # seconds
+
+_STOP = object()
+
+
+class Journal:
+    """Append-only JSONL writer with a background flushing thread."""
+
+    def __init__(self, path: str, script: str = None, mode: str = "w",
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 checkpoint=None):
+        self.path = path
+        self.script = script
+        # Optional wppos.checkpoint.Checkpoint, marked once each batch is flushed
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, mode, encoding="utf-8")
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, key, outcome: str, status: int = None, latency_ms: float = None,
+               ids: dict = None, message: str = None, **extra):
+        """Queue one record for ``key`` (the input item it describes)."""
+        rec = {"ts": round(time.time(), 3), "script": self.script, "key": key, "outcome": outcome}
+        if status is not None:
+            rec["status"] = status
+        if latency_ms is not None:
+            rec["latency_ms"] = round(latency_ms, 1)
+        if ids:
+            rec["ids"] = ids
+        if message:
+            rec["message"] = message
+        rec.update(extra)
+        self._queue.put(rec)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch))
+                self._file.flush()
+                if self.checkpoint is not None:
+                    self.checkpoint.mark_many((r["key"], r["outcome"]) for r in batch)
+            if stop:
+                return
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_journal(path: str):
+    """Yield the records of a journal file (skips a torn last line)."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def latest_records(path: str) -> list:
+    """One record per key - the last one written (resumed runs append retries)."""
+    latest = {}
+    for rec in read_journal(path):
+        latest[rec.get("key")] = rec
+    return list(latest.values())
+
+
+class Timer:
+    """``with Timer() as t: ...`` then ``t.ms`` - latency of one API call."""
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self.ms = None
+        return self
+
+    def __exit__(self, *exc):
+        self.ms = (time.perf_counter() - self._start) * 1000.0
@@ -0,0 +1,222 @@
+"""Single-pass, bounded-memory classifier for legacy output.txt logs.
+
+The per-script output/output.py parsers read the whole log into memory
+(``content.split(...)`` / ``readlines()``), which fails on the multi-GB logs
+that pile up across reruns. This module streams a log line by line, keeps
+only the current block, and appends each classified item to its bucket file
+as soon as the block ends. Several logs can be processed in parallel.
+
+Three dialects are recognised from their block headers:
+
+    client   "🔍 Processing client: <name>"      (client.py and market.py)
+    brand    "🚀 Processing: Market=..., ..."      (brand.py)
+    group    "🔎 Processing brand: <name>"        (group.py)
+
+Usage:
+    python -m wppos.logparse output.txt [more logs ...] [--out DIR] [--workers N]
+"""
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Body text kept per block; enough for every rule, bounded for runaway blocks
+MAX_BODY_CHARS = 8192
+
+# Header prefixes, most specific first ("🔎 Processing brand:" before "🔎 Processing:")
+HEADERS = (
+    ("client", "🔍 Processing client:"),
+    ("group", "🔎 Processing brand:"),
+    ("brand", "🚀 Processing:"),
+    ("brand", "🔎 Processing:"),
+)
+
+BUCKETS = {
+    "client": ["success.txt", "not_found.txt", "already_exists_409.txt",
+               "unable_to_do_400.txt", "failed_other.txt"],
+    "brand": ["success.txt", "already_exists_409.txt", "market_not_found.txt",
+              "brand_not_found.txt", "category_not_found.txt", "other_errors.txt"],
+    "group": ["clients_created.csv", "clients_found.csv", "clients_skipped.csv"],
+}
+
+_BRAND_FIELDS = {
+    name: re.compile(pattern) for name, pattern in (
+        ("market", r"Market=([^,]+)"),
+        ("client", r"Client=([^,]+)"),
+        ("brand", r"Brand=([^,]+)"),
+        ("category", r"Category=(.+)"),
+    )
+}
+_GROUP_NAME = re.compile(r"name:\s*(.*)")
+_GROUP_FOUND_NAME = re.compile(r"\| name:\s*(.*)")
+
+
+def _classify_client(key: str, body: str):
+    if "✅ Successfully created" in body:
+        return "success.txt", key
+    if "❌ Failed for" in body and ": 400" in body:
+        return "unable_to_do_400.txt", key
+    if ("❌ Failed for" in body and ": 409" in body) or "already exists" in body:
+        return "already_exists_409.txt", key
+    if "❌ Failed" in body:
+        return "failed_other.txt", key
+    if "Found exact client" in body:
+        # Found but neither created nor failed: the org-unit was already there
+        return "already_exists_409.txt", key
+    return "not_found.txt", key
+
+
+def _classify_brand(header: str, body: str):
+    fields = {}
+    for name, pattern in _BRAND_FIELDS.items():
+        match = pattern.search(header)
+        fields[name] = match.group(1).strip() if match else "Unknown"
+    key = f"{fields['market']},{fields['client']},{fields['brand']},{fields['category']}"
+
+    if "✅ Created Org Unit for Brand" in body:
+        return "success.txt", key
+    if "❌ Failed POST for" in body and ": 409" in body:
+        return "already_exists_409.txt", key
+    if "⚠️ Error: Market '" in body and "with client '" in body and "not found." in body:
+        return "market_not_found.txt", key
+    if "⚠️ Error: Brand '" in body and "not found in API" in body:
+        return "brand_not_found.txt", key
+    if "⚠️ Error: Category '" in body and "not found in category.json" in body:
+        return "category_not_found.txt", key
+    flat = body.replace("\n", " ").strip()
+    if "⚠️ Error:" in body:
+        return "other_errors.txt", f"{key} | ERROR: {flat}"
+    return "other_errors.txt", f"{key} | UNKNOWN STATUS: {flat}"
+
+
+def _classify_group(key: str, body: str):
+    status_line = body.split("\n", 1)[0]
+    if status_line.startswith("✅ Created group"):
+        match = _GROUP_NAME.search(status_line)
+        return "clients_created.csv", match.group(1).strip() if match else key
+    if "Group already exists" in status_line:
+        match = _GROUP_FOUND_NAME.search(status_line)
+        return "clients_found.csv", match.group(1).strip() if match else key
+    if "No azId found" in status_line:
+        return "clients_skipped.csv", key
+    return None, None
+
+
+CLASSIFIERS = {"client": _classify_client, "brand": _classify_brand, "group": _classify_group}
+
+
+def _match_header(line: str, dialect: str = None):
+    for name, prefix in HEADERS:
+        if (dialect is None or name == dialect) and line.startswith(prefix):
+            return name, line[len(prefix):].strip()
+    return None, None
+
+
+class _BucketWriters:
+    """Bucket files for one log, written incrementally."""
+
+    def __init__(self, out_dir: str, dialect: str):
+        os.makedirs(out_dir, exist_ok=True)
+        self.files = {}
+        self.counts = {}
+        for name in BUCKETS[dialect]:
+            f = open(os.path.join(out_dir, name), "w", encoding="utf-8", newline="")
+            if name.endswith(".csv"):
+                f.write("client_name\r\n")
+            self.files[name] = f
+            self.counts[name] = 0
+
+    def write(self, bucket: str, entry: str):
+        f = self.files[bucket]
+        if bucket.endswith(".csv"):
+            # Same quoting rules as the csv module for a one-column row
+            if any(c in entry for c in ',"\r\n'):
+                entry = '"' + entry.replace('"', '""') + '"'
+            f.write(entry + "\r\n")
+        else:
+            f.write(entry + "\n")
+        self.counts[bucket] += 1
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def classify_file(path: str, out_dir: str):
+    """Stream one log into bucket files under out_dir. Returns (dialect, counts)."""
+    dialect = None
+    writers = None
+    block = None  # [header, body lines, body chars]
+
+    def finish(block):
+        bucket, entry = CLASSIFIERS[dialect](block[0], "\n".join(block[1]))
+        if bucket:
+            writers.write(bucket, entry)
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for raw in f:
+            line = raw.strip()
+            name, header = _match_header(line, dialect)
+            if name:
+                if dialect is None:
+                    dialect = name
+                    writers = _BucketWriters(out_dir, dialect)
+                if block is not None:
+                    finish(block)
+                block = [header, [], 0]
+            elif block is not None and line and block[2] < MAX_BODY_CHARS:
+                block[1].append(line)
+                block[2] += len(line)
+        if block is not None:
+            finish(block)
+
+    if writers is None:
+        return None, {}
+    writers.close()
+    return dialect, writers.counts
+
+
+def classify_files(paths, out_dir: str = ".", workers: int = None) -> dict:
+    """Classify several logs in parallel processes. Returns {path: (dialect, counts)}.
+
+    With one log the buckets go straight into out_dir; with several, each log
+    gets out_dir/<log file name without extension>/ (numbered when names repeat).
+    """
+    paths = list(paths)
+    if len(paths) == 1:
+        return {paths[0]: classify_file(paths[0], out_dir)}
+
+    targets, seen = [], {}
+    for p in paths:
+        stem = os.path.splitext(os.path.basename(p))[0]
+        seen[stem] = seen.get(stem, 0) + 1
+        # Logs are usually all called output.txt: output, output_2, output_3, ...
+        targets.append(os.path.join(out_dir, stem if seen[stem] == 1 else f"{stem}_{seen[stem]}"))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(classify_file, paths, targets)
+        return dict(zip(paths, results))
+
+
+def print_summary(path: str, dialect: str, counts: dict):
+    if dialect is None:
+        print(f"⚠️ {path}: no recognised log blocks")
+        return
+    print(f"📁 {path} ({dialect} log)")
+    for bucket, count in counts.items():
+        print(f"   {bucket}: {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify legacy output.txt logs into bucket files.")
+    parser.add_argument("logs", nargs="+", help="output.txt log files")
+    parser.add_argument("--out", default=".", help="folder for the bucket files (default: current folder)")
+    parser.add_argument("--workers", type=int, default=None, help="parallel processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    for path, (dialect, counts) in classify_files(args.logs, args.out, args.workers).items():
+        print_summary(path, dialect, counts)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
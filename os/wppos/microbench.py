@@ -0,0 +1,344 @@
+"""Micro-benchmarks of the hierarchy operations on synthetic trees, with baselines.
+
+``synthetic_mapping`` builds a hierarchy-tree mapping of any size (10^4 to
+10^6 nodes and beyond) shaped like a real tenant. Clients have a heavy-tailed
+number of markets and markets a heavy-tailed number of brands. One client in
+ten hangs under its market instead of above it. Market names come from a
+short country list, and brand names collide with other brands and sometimes
+with clients. On each tree the suite times (best of ``--repeat`` runs) and
+measures the peak traced memory (one run under ``tracemalloc``) of:
+
+    index_build     HierarchyIndex(mapping) and its ancestry tables, what
+                    ctemp.fetch_tree pays cold
+    index_load      index_file.load of the saved index, what it pays warm
+    ascend          ctemp.ascend_to_client_if_in_market for brand nodes
+    resolve_client  ctemp.resolve_client_azid_in_market for client/brand names
+    brand_parents   brand.resolve_parents for (market, client) pairs
+    market_linkage  nctest2.match_market for (brand, market) pairs
+
+Results are compared with the stored baseline (wppos/microbench.json by
+default). Any operation slower or bigger than the tolerance allows is
+printed as a regression and the command exits with status 1; ``--save``
+records the current numbers as the new baseline for those sizes. Timings
+depend on the machine, so save a baseline on the machine that runs the
+check.
+
+    wpp-os microbench                        # 10^4 and 10^5 nodes, check
+    wpp-os microbench --sizes 1e6 --save     # add a 10^6 baseline
+
+Environment knobs:
+    WPP_BENCH_BASELINE        baseline file (default wppos/microbench.json)
+    WPP_BENCH_TIME_TOLERANCE  allowed slowdown as a fraction (default 0.5)
+    WPP_BENCH_MEM_TOLERANCE   allowed peak-memory growth (default 0.2)
+"""
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from wppos import hierarchy, index_file
+
+BASELINE_PATH = os.getenv("WPP_BENCH_BASELINE",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench.json"))
+TIME_TOLERANCE = float(os.getenv("WPP_BENCH_TIME_TOLERANCE", "0.5"))
+MEM_TOLERANCE = float(os.getenv("WPP_BENCH_MEM_TOLERANCE", "0.2"))
+
+# Differences below these are noise, whatever the ratio
+TIME_FLOOR = 0.005  # seconds
+MEM_FLOOR = 0.5     # MB
+
+DEFAULT_SIZES = (10_000, 100_000)
+OPERATIONS = ("index_build", "index_load", "ascend", "resolve_client", "brand_parents", "market_linkage")
+
+COUNTRIES = [
+    "Germany", "France", "United Kingdom", "Spain", "Italy", "India", "Japan", "Brazil", "Mexico",
+    "Canada", "Australia", "Singapore", "Netherlands", "Poland", "Sweden", "Thailand", "Norway",
+    "Denmark", "Finland", "Belgium", "Austria", "Switzerland", "Portugal", "Ireland", "Greece",
+    "Turkey", "Egypt", "South Africa", "Nigeria", "Kenya", "Argentina", "Chile", "Colombia", "Peru",
+    "China", "Hong Kong", "Taiwan", "South Korea", "Vietnam", "Indonesia", "Malaysia", "Philippines",
+    "New Zealand", "United States", "Czech Republic", "Hungary", "Romania", "Israel",
+    "Saudi Arabia", "United Arab Emirates",
+]
+
+
+# --- Synthetic trees ---
+
+def synthetic_mapping(size: int, seed: int = 1, collisions: float = 0.15) -> dict:
+    """azId -> node dict, about ``size`` nodes under one TENANT root.
+
+    ``collisions`` is the share of brand names reused from earlier brands;
+    another 2% of brands reuse a client name and 5% of clients a client name.
+    """
+    rng = random.Random(seed)
+    mapping = {}
+    client_names = []
+    brand_names = []
+
+    def add(name, type_name, parent=None, md_id=None) -> str:
+        az_id = f"{len(mapping):08x}-{seed & 0xffff:04x}-4000-8000-{rng.getrandbits(48):012x}"
+        mapping[az_id] = {"azId": az_id, "mdId": md_id, "name": name, "type": type_name, "children": []}
+        if parent is not None:
+            mapping[parent]["children"].append(az_id)
+        return az_id
+
+    def brand_name() -> str:
+        roll = rng.random()
+        if brand_names and roll < collisions:
+            return rng.choice(brand_names)
+        if roll < collisions + 0.02:
+            return rng.choice(client_names)
+        brand_names.append(f"Brand {len(brand_names):07d}")
+        return brand_names[-1]
+
+    root = add("WPP", "TENANT")
+    while len(mapping) < size:
+        if client_names and rng.random() < 0.05:
+            client = rng.choice(client_names)
+        else:
+            client_names.append(f"Client {len(client_names):06d}")
+            client = client_names[-1]
+        inverted = rng.random() < 0.1  # TENANT -> MARKET -> CLIENT -> BRAND
+        client_az = None if inverted else add(client, "CLIENT", root, f"md-{client}")
+        markets = min(len(COUNTRIES), int(rng.paretovariate(1.3)))
+        for country in rng.sample(COUNTRIES, markets):
+            if inverted:
+                market_az = add(country, "MARKET", root, f"md-{country}")
+                parent = add(client, "CLIENT", market_az, f"md-{client}")
+            else:
+                parent = market_az = add(country, "MARKET", client_az, f"md-{country}")
+            for _ in range(min(500, int(rng.paretovariate(1.1) * 3))):
+                add(brand_name(), "BRAND", parent)
+            if len(mapping) >= size:
+                break
+    return mapping
+
+
+class Workload:
+    """One synthetic tree plus the query samples every operation runs on."""
+
+    def __init__(self, size: int, queries: int = 2000, seed: int = 1):
+        self.size = size
+        self.mapping = synthetic_mapping(size, seed)
+        self.index = hierarchy.HierarchyIndex(self.mapping)
+        rng = random.Random(seed + 1)
+        index = self.index
+
+        brands = index.ids_of_type("BRAND")
+        clients = index.ids_of_type("CLIENT")
+        markets = index.ids_of_type("MARKET")
+        self.market_name = "Germany"
+        self.market_azid = index.first(self.market_name, ("MARKET",))["azId"]
+
+        self.brand_azids = [index.az_ids[i] for i in rng.choices(brands, k=queries)]
+        # Mostly client names, some brand names, a few unknown names
+        self.names = [index.names[rng.choice(clients if roll < 0.6 else brands)] if roll < 0.95
+                      else f"Unknown {i}" for i, roll in enumerate(rng.random() for _ in range(queries))]
+
+        pairs = []
+        for m_id in rng.choices(markets, k=queries):
+            linked = [c for c in list(index.child_ids(m_id)) + [index.parent_id(m_id)]
+                      if c != hierarchy.NO_NODE and index.type_of(c) == "CLIENT"]
+            if linked and rng.random() < 0.9:
+                pairs.append((index.names[m_id], index.names[rng.choice(linked)]))
+            else:
+                pairs.append((index.names[m_id], index.names[rng.choice(clients)]))
+        self.pairs = pairs
+        # match_market prints per hit, so it gets a smaller sample
+        self.linkage = [(client, market) for market, client in pairs[:max(1, queries // 10)]]
+
+        self.tmp_dir = tempfile.mkdtemp(prefix="wpp-os-microbench-")
+        self.index_path = os.path.join(self.tmp_dir, "bench.idx")
+        index_file.save(index, self.index_path, "bench")
+
+    def close(self):
+        import shutil
+
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+# --- Operations ---
+
+def _operations(work: Workload) -> dict:
+    """name -> zero-argument callable running that operation over the workload."""
+    from brand import brand
+    from ctemp import ctemp
+    import nctest2
+
+    index = work.index
+
+    def index_build():
+        built = hierarchy.HierarchyIndex(work.mapping)
+        built.ancestry()  # get_index saves the index, which includes the tables
+        built.first(work.market_name, ("MARKET",))  # the rest of ctemp.fetch_tree
+        return built
+
+    def index_load():
+        loaded = index_file.load(work.index_path, "bench")
+        loaded.first(work.market_name, ("MARKET",))
+        return loaded
+
+    def ascend():
+        for az_id in work.brand_azids:
+            ctemp.ascend_to_client_if_in_market(az_id, work.market_azid, index)
+
+    def resolve_client():
+        for name in work.names:
+            ctemp.resolve_client_azid_in_market(name, index, work.market_azid)
+
+    def brand_parents():
+        return brand.resolve_parents(index, work.pairs)
+
+    def market_linkage():
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            for name, market in work.linkage:
+                nctest2.match_market(index, name, market)
+
+    return {"index_build": index_build, "index_load": index_load, "ascend": ascend,
+            "resolve_client": resolve_client, "brand_parents": brand_parents,
+            "market_linkage": market_linkage}
+
+
+def measure(func, repeat: int = 3) -> dict:
+    """Best wall time over ``repeat`` runs plus the peak traced memory of one more."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(best, 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def run(sizes=DEFAULT_SIZES, operations=OPERATIONS, queries: int = 2000, repeat: int = 3,
+        seed: int = 1, report=print) -> dict:
+    """str(size) -> operation -> {"seconds", "peak_mb"}."""
+    results = {}
+    for size in sizes:
+        work = Workload(size, queries, seed)
+        try:
+            report(f"🌳 {size:,} requested, {len(work.index):,} nodes")
+            funcs = _operations(work)
+            results[str(size)] = {}
+            for name in operations:
+                results[str(size)][name] = measure(funcs[name], repeat)
+                report(format_result(name, results[str(size)][name]))
+        finally:
+            work.close()
+    return results
+
+
+def format_result(name: str, result: dict, note: str = "") -> str:
+    return f"   {name:<15} {result['seconds'] * 1000:>10.2f} ms {result['peak_mb']:>10.2f} MB{note}"
+
+
+# --- Baselines ---
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results: dict, path: str = BASELINE_PATH) -> dict:
+    """Merge ``results`` into the baseline file (other sizes are kept)."""
+    baseline = load_baseline(path)
+    baseline["machine"] = machine()
+    baseline.setdefault("results", {})
+    for size, operations in results.items():
+        baseline["results"].setdefault(size, {}).update(operations)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return baseline
+
+
+def machine() -> dict:
+    return {"python": platform.python_version(), "system": platform.system(),
+            "processor": platform.machine()}
+
+
+def compare(results: dict, baseline: dict, time_tolerance: float = TIME_TOLERANCE,
+            mem_tolerance: float = MEM_TOLERANCE) -> list:
+    """'size operation: what got worse' for every result beyond the tolerances."""
+    regressions = []
+    for size, operations in results.items():
+        for name, result in operations.items():
+            base = (baseline.get("results") or {}).get(size, {}).get(name)
+            if not base:
+                continue
+            slower = result["seconds"] - base["seconds"]
+            if slower > TIME_FLOOR and result["seconds"] > base["seconds"] * (1 + time_tolerance):
+                regressions.append(f"{size} {name}: {result['seconds'] * 1000:.2f} ms vs "
+                                   f"{base['seconds'] * 1000:.2f} ms baseline "
+                                   f"(+{slower / base['seconds']:.0%})")
+            bigger = result["peak_mb"] - base["peak_mb"]
+            if bigger > MEM_FLOOR and result["peak_mb"] > base["peak_mb"] * (1 + mem_tolerance):
+                regressions.append(f"{size} {name}: {result['peak_mb']:.2f} MB vs "
+                                   f"{base['peak_mb']:.2f} MB baseline (+{bigger / base['peak_mb']:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time hierarchy operations on synthetic trees against a baseline.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated node counts, e.g. 1e4,1e5,1e6 (default: 1e4,1e5)")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help=f"subset of {', '.join(OPERATIONS)}")
+    parser.add_argument("--queries", type=int, default=2000, help="lookups per query operation (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per operation, best kept (default: 3)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s.strip()]
+    operations = [o.strip() for o in args.ops.split(",") if o.strip()]
+    unknown = [o for o in operations if o not in OPERATIONS]
+    if unknown:
+        parser.error(f"unknown operation(s): {', '.join(unknown)}")
+
+    report = (lambda line: None) if args.json else print
+    results = run(sizes, operations, args.queries, args.repeat, args.seed, report)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"💾 Baseline saved to {args.baseline}", file=sys.stderr if args.json else sys.stdout)
+        return
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"⚠️ No baseline at {args.baseline}; run with --save to create one.", file=sys.stderr)
+        return
+    if baseline.get("machine") != machine():
+        print(f"⚠️ Baseline was recorded on {baseline.get('machine')}; timings may not compare.",
+              file=sys.stderr)
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"\n❌ {len(regressions)} REGRESSION(S) against {args.baseline}:", file=sys.stderr)
+        for line in regressions:
+            print(f"   {line}", file=sys.stderr)
+        sys.exit(1)
+    print("\n✅ No regression against the baseline.", file=sys.stderr if args.json else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""Local stand-in for the OS API, for load tests that must not touch production.
+
+``MockTenant`` generates a tenant of any size: a client → market → brand
+hierarchy, master data (/api/clients, /api/brands, markets), groups and
+users. ``serve`` answers the endpoints the scripts call, keeping state, so
+creates show up in the next hierarchy download and duplicates get the same
+409/422 the real API returns:
+
+    GET   /api/v2/tenants/<t>/hierarchy-tree     (ETag / If-None-Match)
+    POST  /_apps/os-workspaces/api/tenants/<t>/organization-units
+    GET   /api/tenants/<t>/groups
+    POST  /api/az/groups
+    PATCH /api/az/groups/users
+    PATCH /api/az/groups/roles
+    GET   /api/users, /api/clients, /api/brands, /api/feeds/status
+
+Every response waits for a delay drawn from a latency distribution
+(``fixed:MS``, ``uniform:LO,HI``, ``lognormal:MEDIAN,SIGMA``, ``exp:MEAN``;
+writes can have their own), and faults are injected per request from a spec
+like ``503=0.01,429=0.01,409=0.02,422=0.02``: 409 only hits POSTs, 422 only
+PATCHes, other statuses any request.
+
+Point the scripts at it with WPP_OS_BASE_URL=http://127.0.0.1:<port> (see
+``wpp-os mock --help``); ``wpp-os bench`` starts one on its own.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MARKETS = [
+    ("Thailand", "15050f40-d2fe-4a73-a937-b8fb6d78432f"),  # market.py's fixed mdId
+    ("Germany", None), ("France", None), ("United Kingdom", None), ("Spain", None),
+    ("Italy", None), ("India", None), ("Japan", None), ("Brazil", None), ("Mexico", None),
+    ("Canada", None), ("Australia", None), ("Singapore", None), ("Netherlands", None),
+    ("Poland", None), ("Sweden", None),
+]
+
+
+def _uid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+# --- Latency and faults ---
+
+def parse_latency(spec: str):
+    """``fixed:MS`` / ``uniform:LO,HI`` / ``lognormal:MEDIAN,SIGMA`` / ``exp:MEAN`` -> f(rng) in seconds."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] or [0.0]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        import math
+
+        mu = math.log(max(values[0], 1e-3))
+        sigma = values[1] if len(values) > 1 else 0.5
+        return lambda rng: rng.lognormvariate(mu, sigma) / 1000
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / max(values[0], 1e-3)) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_faults(spec: str) -> list:
+    """``'503=0.01,409=0.02'`` -> [(503, 0.01), (409, 0.02)]."""
+    faults = []
+    for part in (spec or "").split(","):
+        if part.strip():
+            status, _, rate = part.partition("=")
+            faults.append((int(status), float(rate)))
+    return faults
+
+
+# --- Tenant state ---
+
+class MockTenant:
+    """Generated tenant data plus everything created through the API."""
+
+    def __init__(self, clients: int = 100, markets: int = 3, brands: int = 5, groups: int = None,
+                 users: int = 500, spare: float = 1.0, seed: int = 1):
+        rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.version = 0
+        self._body = None  # (version, etag, serialized tree)
+        self.root = _uid(rng)
+        self.mapping = {self.root: self._node(self.root, None, "WPP", "TENANT")}
+        self.markets = [{"id": md or _uid(rng), "name": name} for name, md in MARKETS]
+        self.clients = []  # master data
+        self.brands = []
+        self.groups = []
+        self.users = []
+        self.bindings = set()
+
+        # Master data has ``spare`` times more clients/brands than the hierarchy holds
+        total_clients = clients + int(clients * spare)
+        for i in range(total_clients):
+            self.clients.append({"id": _uid(rng), "name": f"Client {i:05d}", "updatedAt": self._stamp(rng)})
+        for i in range(total_clients * markets * brands):
+            self.brands.append({"id": _uid(rng), "name": f"Brand {i:06d}", "updatedAt": self._stamp(rng)})
+        self.master = {e["id"]: e["name"] for e in self.clients + self.brands + self.markets}
+
+        brand_no = 0
+        for client in self.clients[:clients]:
+            client_az = self.add_node(self.root, client["id"], "CLIENT", rng)
+            for market in rng.sample(self.markets[1:], min(markets, len(self.markets) - 1)):
+                market_az = self.add_node(client_az, market["id"], "MARKET", rng)
+                for _ in range(brands):
+                    self.add_node(market_az, self.brands[brand_no]["id"], "BRAND", rng)
+                    brand_no += 1
+        self.placed_brands = brand_no
+
+        brand_nodes = [n for n in self.mapping.values() if n["type"] == "BRAND"]
+        for node in brand_nodes[:groups if groups is not None else len(brand_nodes) // 2]:
+            self.groups.append({"id": _uid(rng), "name": node["name"], "account_uid": node["azId"]})
+        for i in range(users):
+            first, last = f"user{i:05d}", rng.choice(["smith", "jones", "garcia", "kim", "singh"])
+            self.users.append({"id": _uid(rng), "email": f"{first}.{last}@example.com", "username": first,
+                               "firstname": first, "lastname": last, "updatedAt": self._stamp(rng)})
+        self._rng = rng
+
+    @staticmethod
+    def _stamp(rng) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(1_600_000_000 + rng.randrange(10**8)))
+
+    @staticmethod
+    def _node(az_id, md_id, name, type_name) -> dict:
+        # Extra fields like the real payload, so stream decoding has something to drop
+        return {"azId": az_id, "mdId": md_id, "name": name, "type": type_name, "children": [],
+                "status": "LIVE", "categories": [], "metadata": {"source": "mock"}}
+
+    def add_node(self, parent_az: str, md_id: str, type_name: str, rng=None) -> str:
+        with self.lock:
+            az_id = _uid(rng or self._rng)
+            self.mapping[az_id] = self._node(az_id, md_id, self.master.get(md_id, md_id), type_name)
+            self.mapping[parent_az]["children"].append(az_id)
+            self.version += 1
+            return az_id
+
+    def hierarchy(self) -> tuple:
+        """(etag, body bytes) of the current tree, serialized once per version."""
+        with self.lock:
+            if self._body is None or self._body[0] != self.version:
+                body = json.dumps({"tenantId": "mock", "rootId": self.root, "mapping": self.mapping}).encode()
+                self._body = (self.version, f'"v{self.version}"', body)
+            return self._body[1:]
+
+    def type_for(self, md_id: str, parent_az) -> str:
+        if parent_az is None or parent_az == self.root:
+            return "CLIENT"
+        if any(m["id"] == md_id for m in self.markets):
+            return "MARKET"
+        return "BRAND"
+
+
+# --- HTTP side ---
+
+def _page(items: list, query: dict) -> dict:
+    search = (query.get("filter[search]") or "").strip().lower()
+    if search:
+        items = [i for i in items if search in (i.get("name") or i.get("email") or "").lower()]
+    if query.get("sort") == "-updatedAt" or (query.get("sortBy"), query.get("orderBy")) == ("updatedAt", "desc"):
+        items = sorted(items, key=lambda i: i.get("updatedAt") or "", reverse=True)
+    if "offset" in query:
+        offset, limit = int(query["offset"]), int(query.get("limit", 50))
+        return {"data": items[offset:offset + limit], "paginator": {"totalItems": len(items)}}
+    per_page = int(query.get("itemsPerPage", 50))
+    page = int(query.get("page", 1))
+    total_pages = max(1, (len(items) + per_page - 1) // per_page)
+    return {"data": items[(page - 1) * per_page:page * per_page],
+            "paginator": {"totalPages": total_pages, "totalItems": len(items), "page": page}}
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, tenant: MockTenant, latency: str = "fixed:0", write_latency: str = None,
+                 faults: str = "", seed: int = 1):
+        super().__init__(address, _Handler)
+        self.tenant = tenant
+        self.read_delay = parse_latency(latency)
+        self.write_delay = parse_latency(write_latency) if write_latency else self.read_delay
+        self.faults = parse_faults(faults)
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self, method: str):
+        """(delay seconds, injected status or None) for one request."""
+        with self.rng_lock:
+            self.requests += 1
+            delay = (self.read_delay if method == "GET" else self.write_delay)(self.rng)
+            for status, rate in self.faults:
+                if status == 409 and method != "POST" or status == 422 and method != "PATCH":
+                    continue
+                if self.rng.random() < rate:
+                    return delay, status
+            return delay, None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as two writes; without this Nagle + delayed ACK add ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, obj=None, body: bytes = None, headers: dict = None):
+        if body is None:
+            body = b"" if obj is None else json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self._body() if method != "GET" else None
+        delay, fault = self.server.draw(method)
+        time.sleep(delay)
+        if fault is not None:
+            return self._send(fault, {"message": f"injected {fault}"},
+                              headers={"Retry-After": "0"} if fault in (429, 503) else None)
+        route = getattr(self, f"_{method.lower()}", None)
+        if route is None or not route(url.path, query, body):
+            self._send(404, {"message": f"no mock for {method} {url.path}"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    # Routes return False when the path is not theirs
+
+    def _get(self, path: str, query: dict, _body) -> bool:
+        tenant = self.server.tenant
+        if re.fullmatch(r"/api/v2/tenants/[^/]+/hierarchy-tree", path):
+            etag, body = tenant.hierarchy()
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+            else:
+                self._send(200, body=body, headers={"ETag": etag})
+        elif re.fullmatch(r"/api/tenants/[^/]+/groups", path):
+            with tenant.lock:
+                groups = sorted(tenant.groups, key=lambda g: g["name"])
+            self._send(200, _page(groups, query))
+        elif path == "/api/clients":
+            self._send(200, _page(tenant.clients, query))
+        elif path == "/api/brands":
+            self._send(200, _page(tenant.brands, query))
+        elif path == "/api/users":
+            self._send(200, _page(tenant.users, query))
+        elif path == "/api/feeds/status":
+            self._send(200, {"status": "ok"})
+        else:
+            return False
+        return True
+
+    def _post(self, path: str, _query, body: dict) -> bool:
+        tenant = self.server.tenant
+        if re.fullmatch(r"/_apps/os-workspaces/api/tenants/[^/]+/organization-units", path):
+            md_id = (body.get("data") or {}).get("mdId")
+            parent = body.get("parentId") or tenant.root
+            with tenant.lock:
+                if md_id not in tenant.master or parent not in tenant.mapping:
+                    status, reply = 400, {"message": "unknown mdId or parentId"}
+                elif any(tenant.mapping[c]["mdId"] == md_id for c in tenant.mapping[parent]["children"]):
+                    status, reply = 409, {"message": "organization unit already exists"}
+                else:
+                    az_id = tenant.add_node(parent, md_id, tenant.type_for(md_id, body.get("parentId")))
+                    status, reply = 201, {"azId": az_id, "status": "LIVE"}
+            self._send(status, reply)
+        elif path == "/api/az/groups":
+            with tenant.lock:
+                if any(g["name"].lower() == (body.get("name") or "").lower() for g in tenant.groups):
+                    status, reply = 409, {"message": "group already exists"}
+                else:
+                    group = {"id": str(uuid.uuid4()), "name": body.get("name"), "account_uid": body.get("account_uid")}
+                    tenant.groups.append(group)
+                    status, reply = 201, {"uid": group["id"], "name": group["name"], "account_uid": group["account_uid"]}
+            self._send(status, reply)
+        else:
+            return False
+        return True
+
+    def _patch(self, path: str, _query, body: dict) -> bool:
+        tenant = self.server.tenant
+        entries = body.get("create") or []
+        if path == "/api/az/groups/users":
+            self._send(201, [{"uid": str(uuid.uuid4()), **e} for e in entries])
+        elif path == "/api/az/groups/roles":
+            keys = [(e.get("group_id"), e.get("role_id"), e.get("account_id")) for e in entries]
+            with tenant.lock:
+                exists = any(key in tenant.bindings for key in keys) or len(set(keys)) < len(keys)
+                if not exists:
+                    tenant.bindings.update(keys)
+            if exists:
+                self._send(422, {"message": "role binding already exists"})
+            else:
+                self._send(201, [{"uid": str(uuid.uuid4()), "group_uid": g, "role_uid": r, "account_uid": a}
+                                 for g, r, a in keys])
+        else:
+            return False
+        return True
+
+
+def serve(tenant: MockTenant, host: str = "127.0.0.1", port: int = 0, **options) -> MockServer:
+    """Start a MockServer on a daemon thread and return it (``port=0`` picks a free port)."""
+    server = MockServer((host, port), tenant, **options)
+    threading.Thread(target=server.serve_forever, name="mock-os-api", daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    """Tenant / latency / fault options shared by ``wpp-os mock`` and ``wpp-os bench``."""
+    parser.add_argument("--clients", type=int, default=100, help="clients in the hierarchy (default: 100)")
+    parser.add_argument("--markets", type=int, default=3, help="markets per client (default: 3)")
+    parser.add_argument("--brands", type=int, default=5, help="brands per market (default: 5)")
+    parser.add_argument("--users", type=int, default=500, help="users (default: 500)")
+    parser.add_argument("--latency", default="lognormal:30,0.5",
+                        help="response delay distribution in ms (default: lognormal:30,0.5)")
+    parser.add_argument("--write-latency", help="delay distribution for POST/PATCH (default: --latency)")
+    parser.add_argument("--fail", default="", help="injected statuses, e.g. 503=0.01,409=0.02,422=0.02")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+
+
+def tenant_from_args(args) -> MockTenant:
+    return MockTenant(clients=args.clients, markets=args.markets, brands=args.brands, users=args.users,
+                      seed=args.seed)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local mock of the OS API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    tenant = tenant_from_args(args)
+    server = MockServer((args.host, args.port), tenant, latency=args.latency,
+                        write_latency=args.write_latency, faults=args.fail, seed=args.seed)
+    print(f"🧪 Mock OS API on {server.base_url} ({len(tenant.mapping)} nodes, {len(tenant.groups)} groups, "
+          f"{len(tenant.users)} users)")
+    print(f"   Point the scripts at it with WPP_OS_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""Declarative desired state for a tenant: plan once, write only the difference.
+
+client.py, market.py, brand.py and group.py each run blind to the others and
+find out what already exists by POSTing and reading the 409. Here the desired
+tenant is declared in one JSON spec::
+
+    {
+      "clients": [
+        {"name": "Amazon", "mdId": "<optional>",
+         "markets": [
+           {"name": "Germany", "mdId": "<optional when the market exists elsewhere>",
+            "brands": [{"name": "7 Vidas", "category": "Charities", "mdId": "<optional>"}]}
+         ]}
+      ],
+      "groups": [
+        {"name": "7 Vidas", "account": "7 Vidas", "roles": ["hierarchy", "architect"]}
+      ],
+      "bindings": [
+        {"group": "<group id or name>", "role": "hierarchy", "accounts": ["7 Vidas"]}
+      ]
+    }
+
+``plan`` compares it with one hierarchy snapshot and one group directory
+crawl and returns only the operations still needed (``--dry-run`` prints them
+and stops); ``execute`` runs them stage by stage (clients, markets, brands,
+groups, role bindings), each stage concurrently, feeding the azIds/group ids
+it creates to the next stage. A rerun against an up-to-date tenant costs the
+two snapshot reads and nothing else.
+
+Group ``account`` defaults to the group name and ``roles`` to hierarchy +
+architect (what group.py assigns); roles are aliases from ROLES or raw role
+ids. Role bindings cannot be read back from the group listing, so the ones
+confirmed by the API (created, or 422 already there) are kept in a ledger
+next to the spec and not planned again; ``--rebind`` ignores it.
+
+mdIds missing from the spec are resolved when the node has to be created:
+clients and brands by exact (normalized) name in the local catalogs of
+/api/clients and /api/brands (catalog.py), markets from an existing market
+node with the same name.
+"""
+import json
+import os
+from typing import NamedTuple
+
+from wppos import catalog, config, hierarchy, runner, transport
+from wppos.hierarchy import normalize
+from wppos.journal import Timer
+
+ROLES = {"hierarchy": config.ROLE_HIERARCHY, "architect": config.ROLE_ARCHITECT}
+DEFAULT_ROLES = ("hierarchy", "architect")
+
+# Execution order; every stage only depends on the ones before it
+STAGES = ("create_client", "create_market", "create_brand", "create_group", "bind_role")
+
+# Role bindings packed into one PATCH
+BIND_BATCH_SIZE = int(os.getenv("WPP_ROLES_BATCH_SIZE", "50"))
+
+SPEC_PATH = os.path.join(config.OS_DIR, "reconcile", "spec.json")
+
+
+class Operation(NamedTuple):
+    """One write. ``ref`` names the id it produces; ``needs`` the ids it consumes."""
+    kind: str
+    key: str
+    ref: str = None
+    needs: tuple = ()
+    params: dict = None
+
+
+class Plan(NamedTuple):
+    operations: list
+    slots: dict         # ref -> azId / group id already known from the snapshots
+    in_place: int       # spec entries that already match the tenant
+    problems: list      # spec entries that cannot be planned (reported, not fatal)
+
+
+def load_spec(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def binding_key(group_id: str, role_id: str, account_id: str) -> str:
+    return f"{group_id}:{role_id}:{account_id}"
+
+
+# --- Planning ---
+
+class _Planner:
+    def __init__(self, index, directory, ledger=None):
+        self.index = index
+        self.directory = directory
+        self.ledger = ledger
+        self.operations = []
+        self.slots = {}
+        self.planned = set()
+        self.bound = set()  # (group ref, role id, account ref) already planned
+        self.in_place = 0
+        self.problems = []
+        self.accounts = {}  # normalized client/brand name -> ref (first declared wins)
+
+    def _known(self, ref: str, value: str):
+        self.slots[ref] = value
+        self.in_place += 1
+
+    def _add(self, op: Operation):
+        self.operations.append(op)
+        if op.ref:
+            self.planned.add(op.ref)
+
+    def _matching(self, ids, entry: dict, type_name: str) -> list:
+        """Ids of ``type_name`` that match ``entry`` by mdId (if given) or name."""
+        md_id = entry.get("mdId")
+        name = normalize(entry.get("name"))
+        return [i for i in ids
+                if self.index.is_live(i) and self.index.type_of(i) == type_name
+                and (self.index.md_ids[i] == md_id if md_id else normalize(self.index.names[i]) == name)]
+
+    # Clients, markets and brands (top-down; a missing parent means every child is created)
+
+    def client(self, entry: dict):
+        name = entry["name"]
+        ref = f"client:{normalize(name)}"
+        self.accounts.setdefault(normalize(name), ref)
+        if entry.get("mdId"):
+            ids = self.index.find_ids_by_mdid(entry["mdId"], ("CLIENT",))
+        else:
+            ids = self.index.find_ids(name, ("CLIENT",))
+        node_id = ids[0] if ids else None
+        if node_id is not None:
+            self._known(ref, self.index.az_ids[node_id])
+        else:
+            self._add(Operation("create_client", name, ref, (), {"name": name, "mdId": entry.get("mdId")}))
+        for market in entry.get("markets") or ():
+            self.market(market, name, ref, node_id)
+
+    def _existing_market(self, entry: dict, client_id):
+        if client_id is None:
+            return None
+        found = self._matching(self.index.child_ids(client_id), entry, "MARKET")
+        if found:
+            return found[0]
+        # Older units hang the client under the market instead (see brand.resolve_parents)
+        if entry.get("mdId"):
+            candidates = self.index.find_ids_by_mdid(entry["mdId"], ("MARKET",))
+        else:
+            candidates = self.index.find_ids(entry["name"], ("MARKET",))
+        for market_id in candidates:
+            if client_id in self.index.child_ids(market_id):
+                return market_id
+        return None
+
+    def market(self, entry: dict, client: str, client_ref: str, client_id):
+        name = entry["name"]
+        path = f"{client} / {name}"
+        ref = f"market:{normalize(client)}/{normalize(name)}"
+        node_id = self._existing_market(entry, client_id)
+        if node_id is not None:
+            self._known(ref, self.index.az_ids[node_id])
+        else:
+            md_id = entry.get("mdId") or next(
+                (self.index.md_ids[i] for i in self.index.find_ids(name, ("MARKET",)) if self.index.md_ids[i]),
+                None)
+            if not md_id:
+                self.problems.append(f"Market '{path}' has no mdId and no existing market to copy it from")
+                return
+            self._add(Operation("create_market", path, ref, (client_ref,), {"name": name, "mdId": md_id}))
+        for brand in entry.get("brands") or ():
+            self.brand(brand, path, ref, node_id)
+
+    def brand(self, entry: dict, market_path: str, market_ref: str, market_id):
+        name = entry["name"]
+        path = f"{market_path} / {name}"
+        ref = f"brand:{normalize(market_path)}/{normalize(name)}"
+        self.accounts.setdefault(normalize(name), ref)
+        found = self._matching(self.index.child_ids(market_id), entry, "BRAND") if market_id is not None else []
+        if found:
+            self._known(ref, self.index.az_ids[found[0]])
+            return
+        category = entry.get("category") or ""
+        if category.lower() not in config.categories():
+            self.problems.append(f"Brand '{path}': category '{category}' not found in category.json")
+            return
+        self._add(Operation("create_brand", path, ref, (market_ref,),
+                            {"name": name, "mdId": entry.get("mdId"), "category": category}))
+
+    # Groups and role bindings
+
+    def account(self, name: str):
+        """Ref of the node ``name`` (declared in the spec or found like group.py does), or None."""
+        ref = self.accounts.get(normalize(name))
+        if ref and (ref in self.slots or ref in self.planned):
+            return ref
+        node = self.index.first(name)
+        if node is None:
+            return None
+        ref = f"node:{normalize(name)}"
+        self.slots[ref] = node["azId"]
+        return ref
+
+    def group(self, entry: dict):
+        name = entry["name"]
+        ref = f"group:{normalize(name)}"
+        existing = self.directory.find(name)
+        account_name = entry.get("account") or name
+        account_ref = self.account(account_name)
+        if existing:
+            self._known(ref, existing[0].get("id"))
+        elif account_ref is None:
+            self.problems.append(f"Group '{name}': account '{account_name}' not in the spec or the hierarchy")
+            return
+        else:
+            self._add(Operation("create_group", name, ref, (account_ref,), {"name": name}))
+        if account_ref is None:
+            self.problems.append(f"Group '{name}': account '{account_name}' not found, roles not bound")
+            return
+        for role in entry.get("roles", DEFAULT_ROLES):
+            self.bind(ref, role, account_ref, f"{name} → {role} on {account_name}")
+
+    def group_ref(self, group: str):
+        if self.directory.get_by_id(group) is not None:
+            ref = f"group-id:{group}"
+            self.slots[ref] = group
+            return ref
+        ref = f"group:{normalize(group)}"
+        if ref in self.slots or ref in self.planned:
+            return ref
+        group_id = self.directory.first_id(group)
+        if group_id is None:
+            return None
+        self.slots[ref] = group_id
+        return ref
+
+    def bindings(self, entry: dict):
+        group_ref = self.group_ref(entry["group"])
+        if group_ref is None:
+            self.problems.append(f"Binding: group '{entry['group']}' not found")
+            return
+        for account_name in entry.get("accounts") or ():
+            account_ref = self.account(account_name)
+            if account_ref is None:
+                self.problems.append(f"Binding: account '{account_name}' not in the spec or the hierarchy")
+                continue
+            self.bind(group_ref, entry["role"], account_ref, f"{entry['group']} → {entry['role']} on {account_name}")
+
+    def bind(self, group_ref: str, role: str, account_ref: str, key: str):
+        role_id = ROLES.get(role.lower(), role)
+        if (group_ref, role_id, account_ref) in self.bound:
+            return
+        self.bound.add((group_ref, role_id, account_ref))
+        if (self.ledger is not None and group_ref in self.slots and account_ref in self.slots
+                and self.ledger.is_done(binding_key(self.slots[group_ref], role_id, self.slots[account_ref]))):
+            self.in_place += 1
+            return
+        self._add(Operation("bind_role", key, None, (group_ref, account_ref), {"role_id": role_id}))
+
+
+def plan(spec: dict, index, directory, ledger=None) -> Plan:
+    """Operations that turn the tenant (``index`` + group ``directory``) into ``spec``.
+
+    ``ledger`` is an optional ``Checkpoint`` of role bindings already confirmed.
+    """
+    planner = _Planner(index, directory, ledger)
+    for client in spec.get("clients") or ():
+        planner.client(client)
+    for group in spec.get("groups") or ():
+        planner.group(group)
+    for binding in spec.get("bindings") or ():
+        planner.bindings(binding)
+    operations = sorted(planner.operations, key=lambda op: STAGES.index(op.kind))
+    return Plan(operations, planner.slots, planner.in_place, planner.problems)
+
+
+def describe(op: Operation) -> str:
+    if op.kind == "create_client":
+        return f"➕ Create client {op.key}"
+    if op.kind == "create_market":
+        return f"➕ Create market {op.key}"
+    if op.kind == "create_brand":
+        return f"➕ Create brand {op.key} (category {op.params['category']})"
+    if op.kind == "create_group":
+        return f"👥 Create group {op.key}"
+    return f"🔑 Bind {op.key}"
+
+
+# --- Execution ---
+
+def find_master_id(kind: str, name: str) -> str:
+    """mdId of the /api/<kind> (clients, brands) entry named exactly ``name``."""
+    return catalog.get_catalog(kind, headers=config.headers(), cookies=config.cookies()).resolve(name)
+
+
+def _post_org_unit(md_id: str, parent_id: str = None, category: str = None):
+    payload = {"type": "predefined", "categories": [], "data": {"mdId": md_id}}
+    if parent_id:
+        payload["parentId"] = parent_id
+    if category:
+        payload["categories"].append({
+            "hierarchy": [], "id": config.categories()[category.lower()], "parent": None,
+            "name": category, "aliases": [], "createdAt": None, "updatedAt": None, "deletedAt": None,
+        })
+    return transport.post(config.ORG_UNITS_URL, headers=config.headers(), cookies=config.cookies(), json=payload)
+
+
+def _run_create(op: Operation, slots: dict) -> dict:
+    """Run one create operation. Returns a journal record (``value`` = the new id)."""
+    params = op.params
+    if op.kind == "create_group":
+        payload = {"account_uid": slots[op.needs[0]], "name": params["name"],
+                   "description": f"Client : {params['name']}", "custom_data": {}}
+        with Timer() as t:
+            resp = transport.post(config.GROUPS_URL, headers=config.headers(), cookies=config.cookies(), json=payload)
+        rec = {"status": resp.status_code, "latency_ms": t.ms}
+        if resp.status_code in (200, 201):
+            group = resp.json()
+            return dict(rec, outcome="success", value=group.get("uid"), group=group)
+        return dict(rec, outcome="failed", message=resp.text)
+
+    md_id = params.get("mdId")
+    if not md_id:
+        md_id = find_master_id("clients" if op.kind == "create_client" else "brands", params["name"])
+    parent_id = slots[op.needs[0]] if op.needs else None
+    with Timer() as t:
+        resp = _post_org_unit(md_id, parent_id, params.get("category"))
+    rec = {"status": resp.status_code, "latency_ms": t.ms, "ids": {"mdId": md_id, "parentId": parent_id}}
+    if resp.status_code in (200, 201):
+        return dict(rec, outcome="success", value=resp.json().get("azId"))
+    return dict(rec, outcome="exists" if resp.status_code == 409 else "failed", message=resp.text)
+
+
+def _bind_chunk(entries: list) -> list:
+    """PATCH role bindings; [(entry, outcome, detail)]. A 422 chunk is bisected like allth/arch.py."""
+    payload = {"create": [{k: e[k] for k in ("group_id", "role_id", "account_id")} for e in entries],
+               "delete": []}
+    resp = transport.patch(config.GROUP_ROLES_URL, headers=config.headers(), cookies=config.cookies(), json=payload)
+    if resp.status_code in (200, 201, 204):
+        return [(e, "success", None) for e in entries]
+    if resp.status_code == 422 and len(entries) > 1:
+        mid = len(entries) // 2
+        return _bind_chunk(entries[:mid]) + _bind_chunk(entries[mid:])
+    if resp.status_code == 422:
+        return [(entries[0], "exists", None)]
+    return [(e, "failed", f"{resp.status_code}: {resp.text}") for e in entries]
+
+
+def execute(result: Plan, journal=None, ledger=None, directory=None, report=print) -> dict:
+    """Run the plan stage by stage. Returns outcome -> count.
+
+    Operations whose inputs were not produced (failed parent) are reported as
+    ``blocked``; created groups are added to ``directory``, confirmed bindings
+    to ``ledger``.
+    """
+    slots = dict(result.slots)
+    counts = {}
+
+    def done(op, outcome, **rec):
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if journal is not None:
+            journal.record(op.key, outcome, kind=op.kind, **rec)
+
+    for stage in STAGES:
+        ops = [op for op in result.operations if op.kind == stage]
+        ready = []
+        for op in ops:
+            if all(ref in slots for ref in op.needs):
+                ready.append(op)
+            else:
+                report(f"⏭️ Blocked: {describe(op)} (a parent was not created)")
+                done(op, "blocked")
+        if not ready:
+            continue
+
+        if stage == "bind_role":
+            entries = [{"op": op, "group_id": slots[op.needs[0]], "role_id": op.params["role_id"],
+                        "account_id": slots[op.needs[1]]} for op in ready]
+            chunks = [entries[i:i + BIND_BATCH_SIZE] for i in range(0, len(entries), max(1, BIND_BATCH_SIZE))]
+            for outcome in runner.run_ordered(_bind_chunk, chunks):
+                results = outcome.result if outcome.ok else [(e, "error", str(outcome.error)) for e in outcome.item]
+                for entry, status, detail in results:
+                    op = entry["op"]
+                    ids = {k: entry[k] for k in ("group_id", "role_id", "account_id")}
+                    if status in ("success", "exists"):
+                        report(f"{'✅' if status == 'success' else '🔶'} {describe(op)}"
+                               f"{'' if status == 'success' else ' (already there)'}")
+                        if ledger is not None:
+                            ledger.mark(binding_key(entry["group_id"], entry["role_id"], entry["account_id"]), status)
+                    else:
+                        report(f"❌ {describe(op)}: {detail}")
+                    done(op, status, ids=ids, message=detail)
+            continue
+
+        for outcome in runner.run_ordered(lambda op: _run_create(op, slots), ready):
+            op = outcome.item
+            if not outcome.ok:
+                report(f"❌ {describe(op)}: {outcome.error}")
+                done(op, "error", message=str(outcome.error))
+                continue
+            rec = dict(outcome.result)
+            value = rec.pop("value", None)
+            group = rec.pop("group", None)
+            outcome_name = rec.pop("outcome")
+            if outcome_name == "success" and value:
+                slots[op.ref] = value
+                if group is not None and directory is not None:
+                    directory.add(group)
+                report(f"✅ {describe(op)} → {value}")
+            else:
+                report(f"❌ {describe(op)}: {rec.get('status')} {rec.get('message', '')}")
+            done(op, outcome_name, **rec)
+    return counts
+
+
+def main(argv=None):
+    import argparse
+
+    from wppos import groups as group_directory
+    from wppos import tree_cache
+    from wppos.checkpoint import Checkpoint
+    from wppos.journal import Journal
+
+    parser = argparse.ArgumentParser(description="Bring the tenant in line with a desired-state spec.")
+    parser.add_argument("spec", nargs="?", default=SPEC_PATH, help="JSON spec (clients, groups, bindings)")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without writing anything")
+    parser.add_argument("--rebind", action="store_true", help="plan role bindings even if already confirmed")
+    args = parser.parse_args(argv)
+
+    spec = load_spec(args.spec)
+    out_dir = os.path.join(os.path.dirname(os.path.abspath(args.spec)), "output")
+    ledger = Checkpoint(os.path.join(out_dir, "ledger.sqlite"), resume=True)
+
+    config.require_token()
+    index = hierarchy.get_index(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+    directory = group_directory.get_directory(config.TENANT_ID, headers=config.headers(), cookies=config.cookies())
+
+    result = plan(spec, index, directory, ledger=None if args.rebind else ledger)
+    for problem in result.problems:
+        print(f"⚠️ {problem}")
+    print(f"📋 Plan: {len(result.operations)} operation(s), {result.in_place} spec entr{'y' if result.in_place == 1 else 'ies'} already in place")
+    for op in result.operations:
+        print(f"   {describe(op)}")
+
+    if args.dry_run or not result.operations:
+        ledger.close()
+        return
+
+    journal = Journal(os.path.join(out_dir, "journal.jsonl"), script="reconcile")
+    counts = execute(result, journal=journal, ledger=ledger, directory=directory)
+    journal.close()
+    ledger.close()
+    if any(op.kind != "bind_role" for op in result.operations):
+        tree_cache.invalidate(config.TENANT_ID)  # next read picks up the new units
+    print("\n📊 " + ", ".join(f"{name}: {n}" for name, n in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
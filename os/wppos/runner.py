@@ -0,0 +1,94 @@
+"""Bounded concurrent execution for per-item API work.
+
+The create pipelines used to POST one item at a time and wait for every round
+trip. ``run_ordered`` keeps up to ``max_in_flight`` items running on a thread
+pool and hands outcomes back in input order, so the logs read exactly like a
+sequential run. ``crawl_pages`` uses it to read a paginated listing.
+
+Environment knobs:
+    WPP_MAX_IN_FLIGHT   items processed concurrently (default 16); wppos.transport
+                        adapts the number of HTTP calls in flight below this
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+MAX_IN_FLIGHT = int(os.getenv("WPP_MAX_IN_FLIGHT", "16"))
+# Pages requested per round when a listing does not report its page count
+PAGE_WAVE = 8
+
+
+class Outcome(NamedTuple):
+    position: int
+    item: Any
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_ordered(func: Callable[[Any], Any], items: Iterable,
+                max_in_flight: int = None) -> Iterator[Outcome]:
+    """Run ``func(item)`` for every item with bounded concurrency.
+
+    Outcomes are yielded in input order; an exception raised by ``func`` is
+    captured in ``Outcome.error`` instead of stopping the batch.
+    """
+    limit = max(1, max_in_flight or MAX_IN_FLIGHT)
+    # Queue a little ahead of the workers so a slow head item does not idle them
+    window = limit * 2
+    pending = deque()
+
+    def collect(position, item, future):
+        try:
+            return Outcome(position, item, future.result())
+        except Exception as e:
+            return Outcome(position, item, error=e)
+
+    with ThreadPoolExecutor(max_workers=limit) as pool:
+        for position, item in enumerate(items):
+            pending.append((position, item, pool.submit(func, item)))
+            if len(pending) >= window:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+
+
+def crawl_pages(fetch_page: Callable[[int], dict], page_size: int) -> list:
+    """``data`` of every page of a paginated listing (page 1 first, the rest concurrently).
+
+    With ``paginator.totalPages`` the remaining pages are requested at once.
+    Without it, PAGE_WAVE pages go out at a time until one comes back short,
+    so a missing total never truncates the listing to page 1.
+    """
+    first = fetch_page(1)
+    items = list(first.get("data", []))
+    total_pages = (first.get("paginator") or {}).get("totalPages")
+    if total_pages:
+        for outcome in run_ordered(fetch_page, range(2, int(total_pages) + 1)):
+            if not outcome.ok:
+                raise outcome.error
+            items.extend(outcome.result.get("data", []))
+        return items
+
+    page = 2
+    previous = items
+    done = len(items) < page_size
+    while not done:
+        for outcome in run_ordered(fetch_page, range(page, page + PAGE_WAVE)):
+            if not outcome.ok:
+                raise outcome.error
+            if done:
+                continue  # past the end
+            data = outcome.result.get("data", [])
+            # A short page ends the listing; so does the same page served again
+            # (APIs that clamp an out-of-range page to the last one)
+            done = len(data) < page_size or data == previous
+            if data != previous:
+                items.extend(data)
+            previous = data
+        page += PAGE_WAVE
+    return items
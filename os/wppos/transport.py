@@ -0,0 +1,185 @@
+"""Self-throttling HTTP layer shared by all scripts.
+
+The README used to tell operators to rerun by hand whenever the server
+answered 5xx because it was loaded. Requests sent through this module are
+instead:
+
+* gated by an AIMD limiter - the number of requests in flight grows by about
+  one per round of healthy responses and is halved on 5xx, 429 or timeouts,
+  so large batches settle near what the server can actually take;
+* retried with exponential backoff and full jitter, honouring Retry-After.
+
+All clients in a process share one limiter, since they share one server.
+
+Environment knobs:
+    WPP_MAX_IN_FLIGHT      ceiling for concurrent requests (default 16)
+    WPP_HTTP_START_LIMIT   starting concurrency (default 4)
+    WPP_HTTP_MAX_RETRIES   retries per request after the first try (default 5)
+    WPP_HTTP_TIMEOUT       per-request timeout in seconds (default 60)
+"""
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_IN_FLIGHT = int(os.getenv("WPP_MAX_IN_FLIGHT", "16"))
+START_LIMIT = int(os.getenv("WPP_HTTP_START_LIMIT", "4"))
+MAX_RETRIES = int(os.getenv("WPP_HTTP_MAX_RETRIES", "5"))
+TIMEOUT = float(os.getenv("WPP_HTTP_TIMEOUT", "60"))
+
+# Statuses that mean "server is overloaded, try again later"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+BACKOFF_BASE = 0.5   # seconds
+BACKOFF_CAP = 30.0   # seconds
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease cap on requests in flight."""
+
+    def __init__(self, initial: int = START_LIMIT, minimum: int = 1, maximum: int = MAX_IN_FLIGHT,
+                 decrease: float = 0.5, cooldown: float = 1.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.decrease = decrease
+        self.cooldown = cooldown  # one cut per burst of failures, not one per failure
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._in_flight = 0
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, overloaded: bool = False):
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                now = time.monotonic()
+                if now - self._last_cut >= self.cooldown:
+                    self._limit = max(self.minimum, self._limit * self.decrease)
+                    self._last_cut = now
+            else:
+                # +1 after roughly `limit` healthy responses
+                self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def retry_after_delay(resp):
+    """Seconds to wait according to a Retry-After header, or None."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """requests.Session wrapper that goes through the shared limiter and retries."""
+
+    def __init__(self, session: requests.Session = None, limiter: AIMDLimiter = None,
+                 max_retries: int = MAX_RETRIES, timeout: float = TIMEOUT):
+        self.session = session or requests.Session()
+        self.limiter = limiter or shared_limiter()
+        self.max_retries = max_retries
+        self.timeout = timeout
+        # Enough pooled connections for the highest concurrency the limiter allows
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.limiter.maximum)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            last_try = attempt == self.max_retries
+            self.limiter.acquire()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError):
+                self.limiter.release(overloaded=True)
+                if last_try:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            overloaded = resp.status_code in RETRY_STATUSES
+            self.limiter.release(overloaded=overloaded)
+            if not overloaded or last_try:
+                return resp
+            delay = retry_after_delay(resp)
+            resp.close()  # hand a streamed connection back to the pool before retrying
+            time.sleep(backoff_delay(attempt) if delay is None else min(delay, BACKOFF_CAP))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+# --- Process-wide defaults (drop-in for requests.get / post / patch) ---
+_limiter = None
+_client = None
+_lock = threading.Lock()
+
+
+def shared_limiter() -> AIMDLimiter:
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = AIMDLimiter()
+        return _limiter
+
+
+def default_client() -> HttpClient:
+    global _client
+    if _client is None:
+        client = HttpClient()
+        with _lock:
+            if _client is None:
+                _client = client
+    return _client
+
+
+def get(url, **kwargs):
+    return default_client().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return default_client().post(url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return default_client().patch(url, **kwargs)
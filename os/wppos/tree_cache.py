@@ -0,0 +1,219 @@
+"""Shared hierarchy-tree snapshot cache (in process + on disk).
+
+Every script used to download /hierarchy-tree on its own, sometimes once per
+input row. This module keeps one snapshot per tenant in memory and in
+``.cache/``, honours a TTL and revalidates with ETag / If-Modified-Since.
+Responses and cache files are stream-decoded (see treestream.py), so only the
+node fields the scripts use are ever held in memory. Reading a cached snapshot
+only decodes its header until something actually needs the nodes; the built
+index is persisted next to it (see index_file.py) under the snapshot's
+``stamp``.
+
+Environment knobs:
+    WPP_OS_CACHE_DIR   where snapshots are stored (default: <repo>/os/.cache)
+    WPP_TREE_TTL       seconds a snapshot is trusted without asking (default 300)
+    WPP_TREE_REFRESH   set to 1 to force a full download
+"""
+import itertools
+import json
+import os
+import threading
+import time
+
+from wppos import config, transport, treestream
+
+BASE_URL = config.BASE_URL
+
+CACHE_DIR = os.getenv(
+    "WPP_OS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+)
+DEFAULT_TTL = float(os.getenv("WPP_TREE_TTL", "300"))
+FORCE_REFRESH = os.getenv("WPP_TREE_REFRESH", "").strip() == "1"
+
+# tenant_id -> {"fetched_at", "etag", "last_modified", "stamp", "mapping", "serial"}
+# ``mapping`` is None until needed or once released (see release_mapping); it
+# is read back from disk on demand. ``serial`` changes whenever the mapping
+# may have; ``stamp`` identifies the downloaded content across processes.
+_snapshots = {}
+_serials = itertools.count(1)
+# Worker threads share snapshots; only one of them may refresh at a time
+_lock = threading.RLock()
+
+
+def hierarchy_url(tenant_id: str) -> str:
+    return f"{BASE_URL}/api/v2/tenants/{tenant_id}/hierarchy-tree"
+
+
+def _cache_path(tenant_id: str) -> str:
+    return os.path.join(CACHE_DIR, f"hierarchy-{tenant_id}.json")
+
+
+def _checked_path(tenant_id: str) -> str:
+    """Sidecar holding the time of the last 304, so revalidating never rewrites the snapshot."""
+    return _cache_path(tenant_id) + ".checked"
+
+
+def index_path(tenant_id: str) -> str:
+    return os.path.join(CACHE_DIR, f"hierarchy-{tenant_id}.idx")
+
+
+def _stamp_of(snapshot: dict) -> str:
+    return snapshot.get("stamp") or snapshot.get("etag") or snapshot.get("last_modified") \
+        or f"t{snapshot.get('fetched_at', 0)}"
+
+
+def _load_from_disk(tenant_id: str, with_mapping: bool = True):
+    try:
+        snapshot = treestream.decode_file(_cache_path(tenant_id), with_mapping=with_mapping)
+    except (OSError, ValueError):
+        return None
+    if "mapping" not in snapshot or (with_mapping and not isinstance(snapshot["mapping"], dict)):
+        return None
+    try:
+        with open(_checked_path(tenant_id), "r", encoding="utf-8") as f:
+            snapshot["fetched_at"] = max(snapshot.get("fetched_at", 0), float(f.read()))
+    except (OSError, ValueError):
+        pass
+    snapshot["stamp"] = _stamp_of(snapshot)
+    snapshot["serial"] = next(_serials)
+    return snapshot
+
+
+def _save_to_disk(tenant_id: str, snapshot: dict):
+    """Write atomically so a killed run never leaves a half-written cache."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(tenant_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # mapping goes last so the header can be read without decoding the nodes
+    document = {k: v for k, v in snapshot.items() if k not in ("serial", "mapping")}
+    document["mapping"] = snapshot["mapping"]
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    try:
+        os.remove(_checked_path(tenant_id))
+    except OSError:
+        pass
+
+
+def _mark_checked(tenant_id: str, when: float):
+    try:
+        with open(_checked_path(tenant_id), "w", encoding="utf-8") as f:
+            f.write(repr(when))
+    except OSError:
+        pass
+
+
+def _is_fresh(snapshot, ttl: float) -> bool:
+    return bool(snapshot) and (time.time() - snapshot.get("fetched_at", 0)) < ttl
+
+
+def get_snapshot(tenant_id: str, headers=None, cookies=None, session=None,
+                 ttl: float = None, force_refresh: bool = False, load_mapping: bool = True) -> dict:
+    """Return the cached snapshot for a tenant, refreshing it when needed.
+
+    With ``load_mapping=False`` a released mapping is not read back from disk,
+    so callers that only compare ``serial`` stay cheap.
+    """
+    with _lock:
+        snapshot = _get_snapshot(tenant_id, headers, cookies, session, ttl, force_refresh)
+        if load_mapping and snapshot["mapping"] is None:
+            disk = _load_from_disk(tenant_id)
+            if disk is None:
+                return _get_snapshot(tenant_id, headers, cookies, session, ttl, force_refresh=True)
+            if disk["stamp"] == snapshot["stamp"]:
+                # Same content as the released copy: keep its serial so indexes stay valid
+                disk["fetched_at"] = max(disk.get("fetched_at", 0), snapshot["fetched_at"])
+                disk["serial"] = snapshot["serial"]
+            snapshot = _snapshots[tenant_id] = disk
+        return snapshot
+
+
+def _get_snapshot(tenant_id, headers, cookies, session, ttl, force_refresh):
+    ttl = DEFAULT_TTL if ttl is None else ttl
+    force_refresh = force_refresh or FORCE_REFRESH
+
+    snapshot = _snapshots.get(tenant_id)
+    if snapshot is None:
+        snapshot = _load_from_disk(tenant_id, with_mapping=False)
+        if snapshot is not None:
+            _snapshots[tenant_id] = snapshot
+
+    if not force_refresh and _is_fresh(snapshot, ttl):
+        return snapshot
+
+    # Conditional revalidation when we already hold a (stale) copy
+    request_headers = dict(headers or {})
+    if snapshot and not force_refresh:
+        if snapshot.get("etag"):
+            request_headers["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"):
+            request_headers["If-Modified-Since"] = snapshot["last_modified"]
+
+    http = session or transport
+    resp = http.get(hierarchy_url(tenant_id), headers=request_headers, cookies=cookies, stream=True)
+
+    if resp.status_code == 304 and snapshot:
+        resp.close()
+        snapshot["fetched_at"] = time.time()
+        if snapshot["mapping"] is None:
+            # Nodes are not in memory: record the check without rewriting the file
+            _mark_checked(tenant_id, snapshot["fetched_at"])
+            return snapshot
+    elif resp.status_code == 200:
+        snapshot = {
+            "fetched_at": time.time(),
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "mapping": treestream.decode_response(resp).get("mapping") or {},
+            "serial": next(_serials),
+        }
+        snapshot["stamp"] = _stamp_of(snapshot)
+    else:
+        raise RuntimeError(f"Hierarchy API failed: {resp.status_code} - {resp.text}")
+
+    _snapshots[tenant_id] = snapshot
+    _save_to_disk(tenant_id, snapshot)
+    return snapshot
+
+
+def get_mapping(tenant_id: str, headers=None, cookies=None, session=None,
+                ttl: float = None, force_refresh: bool = False) -> dict:
+    """Shortcut for the ``mapping`` part of the hierarchy-tree response."""
+    return get_snapshot(tenant_id, headers=headers, cookies=cookies, session=session,
+                        ttl=ttl, force_refresh=force_refresh)["mapping"]
+
+
+def release_mapping(tenant_id: str, serial: int):
+    """Drop the in-memory mapping of snapshot ``serial`` (its index owns the data now)."""
+    with _lock:
+        snapshot = _snapshots.get(tenant_id)
+        if snapshot is not None and snapshot.get("serial") == serial:
+            snapshot["mapping"] = None
+
+
+def invalidate(tenant_id: str):
+    """Drop the in-process copy and age the disk copy so the next read revalidates."""
+    with _lock:
+        _invalidate(tenant_id)
+
+
+def invalidate_if(created, tenant_id: str):
+    """``invalidate`` when a run ``created`` org-units.
+
+    Scripts run back to back (market.py, then brand.py, then group.py) and
+    each one must see the org-units the previous one created, not the snapshot
+    cached before them.
+    """
+    if created:
+        invalidate(tenant_id)
+
+
+def _invalidate(tenant_id: str):
+    snapshot = _snapshots.pop(tenant_id, None)
+    if snapshot is None or snapshot["mapping"] is None:
+        snapshot = _load_from_disk(tenant_id)
+    if snapshot:
+        snapshot["fetched_at"] = 0
+        _save_to_disk(tenant_id, snapshot)
@@ -0,0 +1,167 @@
+"""Incremental decoder for hierarchy-tree JSON.
+
+``resp.json()`` builds the whole response as nested dicts (every field of
+every node) before anything can be indexed. This module reads the body chunk
+by chunk, decodes one node at a time with ``json.JSONDecoder.raw_decode`` and
+keeps only ``NODE_FIELDS``, so at most one raw node is alive at any moment
+and the result is only as large as the trimmed tree.
+
+The same decoder reads the on-disk snapshot in ``.cache/``.
+"""
+import codecs
+import json
+
+# The only node fields any script looks at
+NODE_FIELDS = ("azId", "mdId", "name", "type", "children")
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = ",:]}" + _WHITESPACE
+
+
+def trim(node) -> dict:
+    """Copy of ``node`` with only NODE_FIELDS (missing ones are left out)."""
+    return {field: node[field] for field in NODE_FIELDS if field in node}
+
+
+class _Reader:
+    """Text buffer over an iterator of byte/str chunks with a moving cursor."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self, at_least: int = 1) -> bool:
+        """Append at least ``at_least`` more characters (fewer at end of input)
+        and drop what was consumed. False when nothing could be added."""
+        pieces = []
+        added = 0
+        while added < at_least and not self.eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                chunk = self._utf8.decode(b"", final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = self._utf8.decode(chunk)
+            pieces.append(chunk)
+            added += len(chunk)
+        if not added:
+            return False
+        self.buf = self.buf[self.pos:] + "".join(pieces)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character (not consumed), or '' at end of input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed hierarchy JSON: expected {char!r}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value, reading more input until it fits."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Double the pending text before retrying so large values stay linear
+                if not self._more(len(self.buf) - self.pos + 1):
+                    raise
+                continue
+            # A number/literal not followed by a delimiter may continue in the next chunk
+            if (not self.eof and self.buf[end - 1] not in '"}]'
+                    and (end == len(self.buf) or self.buf[end] not in _DELIMITERS)):
+                if self._more():
+                    continue
+            self.pos = end
+            return obj
+
+    def skip_separator(self, closing: str) -> bool:
+        """Consume ',' (True: another member follows) or ``closing`` (False)."""
+        char = self.peek()
+        self.pos += 1
+        if char == ",":
+            return True
+        if char == closing:
+            return False
+        raise ValueError(f"Malformed hierarchy JSON: unexpected {char!r}")
+
+
+def _iter_members(reader: _Reader):
+    """(key, reader) for each member of the object at the cursor; caller consumes the value."""
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        yield key
+        if not reader.skip_separator("}"):
+            return
+
+
+def iter_nodes(reader: _Reader):
+    """(key, trimmed node) for each entry of the ``mapping`` object at the cursor."""
+    if reader.peek() == "n":  # "mapping": null
+        reader.value()
+        return
+    for key in _iter_members(reader):
+        node = reader.value()
+        if isinstance(node, dict):
+            yield key, trim(node)
+
+
+def decode(chunks, with_mapping: bool = True) -> dict:
+    """Decode a hierarchy document (API response or cache file) from ``chunks``.
+
+    Returns the top-level object with ``mapping`` holding trimmed nodes. With
+    ``with_mapping=False`` decoding stops at the ``mapping`` key (which is set
+    to None); tree_cache writes it last, so everything else is already read.
+    """
+    reader = _Reader(chunks)
+    document = {}
+    for key in _iter_members(reader):
+        if key != "mapping":
+            document[key] = reader.value()
+            continue
+        if not with_mapping:
+            document["mapping"] = None
+            break
+        document["mapping"] = dict(iter_nodes(reader))
+    return document
+
+
+def decode_response(resp) -> dict:
+    """Stream-decode a ``requests`` response (sent with ``stream=True``)."""
+    if hasattr(resp, "iter_content"):
+        try:
+            return decode(resp.iter_content(CHUNK_SIZE))
+        finally:
+            close = getattr(resp, "close", None)
+            if close is not None:
+                close()
+    return decode([resp.content])
+
+
+def decode_file(path: str, with_mapping: bool = True) -> dict:
+    """Stream-decode a JSON file written by ``tree_cache``."""
+    with open(path, "rb") as f:
+        return decode(iter(lambda: f.read(CHUNK_SIZE), b""), with_mapping=with_mapping)
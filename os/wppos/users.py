@@ -0,0 +1,276 @@
+"""Local SQLite mirror of /api/users.
+
+adduser.py and osadd/alluser/api.py used to call /api/users once per lookup.
+``UserMirror`` crawls the user list with parallel offset pages into
+``.cache/users.sqlite`` (indexed on lowercased email, username, first, last
+and full name) and answers lookups locally. ``search`` tries an indexed prefix
+match first and only scans for substrings, like the API's ``filter[search]``,
+when no prefix matches.
+
+Refresh is incremental: once the mirror is older than WPP_USERS_TTL, users
+are read newest ``updatedAt`` first and only the pages down to the last-seen
+stamp are fetched. A full crawl, which also prunes users that disappeared,
+runs after WPP_USERS_FULL_TTL or when the API does not stamp users. A lookup
+that still misses locally sends that term to the API's own search and stores
+what comes back.
+
+Environment knobs:
+    WPP_USERS_TTL        seconds before changed users are pulled (default 3600)
+    WPP_USERS_FULL_TTL   seconds before a full recrawl (default 86400)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from wppos import config, runner, transport
+from wppos.tree_cache import CACHE_DIR
+
+USERS_URL = f"{config.BASE_URL}/api/users"
+DB_PATH = os.path.join(CACHE_DIR, "users.sqlite")
+TTL = float(os.getenv("WPP_USERS_TTL", "3600"))
+FULL_TTL = float(os.getenv("WPP_USERS_FULL_TTL", str(24 * 3600)))
+PAGE_SIZE = 50
+SEARCH_LIMIT = 50
+SEARCH_COLUMNS = ("username_lc", "email_lc", "first_lc", "last_lc", "full_lc")
+# Offsets requested per round when the API does not report a total
+WAVE = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    key TEXT PRIMARY KEY,
+    email_lc TEXT,
+    username_lc TEXT,
+    first_lc TEXT,
+    last_lc TEXT,
+    full_lc TEXT,
+    data TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_email ON users (email_lc);
+CREATE INDEX IF NOT EXISTS users_username ON users (username_lc);
+CREATE INDEX IF NOT EXISTS users_first ON users (first_lc);
+CREATE INDEX IF NOT EXISTS users_last ON users (last_lc);
+CREATE INDEX IF NOT EXISTS users_full ON users (full_lc);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _lc(value) -> str:
+    return (value or "").strip().lower()
+
+
+def _row(user: dict, synced_at: float) -> tuple:
+    email = _lc(user.get("email"))
+    username = _lc(user.get("username")) or email.split("@")[0]
+    first = _lc(user.get("firstname") or user.get("firstName"))
+    last = _lc(user.get("lastname") or user.get("lastName"))
+    key = str(user.get("id") or email)
+    full = f"{first} {last}".strip()
+    return key, email, username, first, last, full, json.dumps(user), synced_at
+
+
+def _total(page: dict):
+    """Total user count if the response reports one."""
+    paginator = page.get("paginator") or page.get("meta") or {}
+    return page.get("total") or paginator.get("totalItems") or paginator.get("total")
+
+
+def _watermark(users: list):
+    """Newest ``updatedAt`` of ``users``, or None if any user lacks one."""
+    stamps = [u.get("updatedAt") for u in users]
+    if not stamps or any(s is None for s in stamps):
+        return None
+    return max(stamps)
+
+
+class UserMirror:
+    """Users of the OS platform, mirrored into an embedded SQLite database."""
+
+    def __init__(self, session=None, headers=None, cookies=None, db_path: str = DB_PATH,
+                 ttl: float = TTL, full_ttl: float = FULL_TTL, page_size: int = PAGE_SIZE):
+        self.http = session or transport
+        self.headers = headers
+        self.cookies = cookies
+        self.ttl = ttl
+        self.full_ttl = full_ttl
+        self.page_size = page_size
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.RLock()
+
+    # --- API side ---
+    def _fetch(self, offset: int, search: str = None, newest_first: bool = False) -> dict:
+        params = {"offset": offset, "limit": self.page_size, "sortBy": "firstname", "orderBy": "asc"}
+        if newest_first:
+            params.update(sortBy="updatedAt", orderBy="desc")
+        if search:
+            params["filter[search]"] = search
+        resp = self.http.get(USERS_URL, headers=self.headers, cookies=self.cookies, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _crawl(self) -> list:
+        first = self._fetch(0)
+        users = list(first.get("data", []))
+        if len(users) < self.page_size:
+            return users
+
+        total = _total(first)
+        if total:
+            offsets = range(self.page_size, int(total), self.page_size)
+            for outcome in runner.run_ordered(self._fetch, offsets):
+                if not outcome.ok:
+                    raise outcome.error
+                users.extend(outcome.result.get("data", []))
+            return users
+
+        # No total reported: fetch WAVE pages at a time until one comes back short
+        offset = self.page_size
+        while True:
+            offsets = [offset + i * self.page_size for i in range(WAVE)]
+            done = False
+            for outcome in runner.run_ordered(self._fetch, offsets):
+                if not outcome.ok:
+                    raise outcome.error
+                page = outcome.result.get("data", [])
+                users.extend(page)
+                done = done or len(page) < self.page_size
+            if done:
+                return users
+            offset += WAVE * self.page_size
+
+    def _changed_since(self, watermark: str):
+        """Users updated at or after ``watermark``; None if the API cannot sort by updatedAt."""
+        changed = []
+        offset = 0
+        previous = None
+        while True:
+            page = self._fetch(offset, newest_first=True).get("data", [])
+            stamps = [u.get("updatedAt") for u in page]
+            if any(s is None for s in stamps) or stamps != sorted(stamps, reverse=True):
+                return None
+            if page == previous:
+                break  # offset clamped to the last page
+            changed.extend(u for u in page if u["updatedAt"] >= watermark)
+            if len(page) < self.page_size or stamps[-1] < watermark:
+                break
+            previous = page
+            offset += self.page_size
+        return changed
+
+    # --- Local side ---
+    def _upsert(self, users: list, synced_at: float):
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [_row(u, synced_at) for u in users],
+            )
+
+    def _meta(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                 [(k, v) for k, v in values.items() if v is not None])
+
+    def last_sync(self) -> float:
+        return float(self._meta("last_sync") or 0.0)
+
+    def sync(self, force: bool = False) -> int:
+        """Bring a stale mirror up to date (see the module docstring). Returns users stored."""
+        started = time.time()
+        if not force and started - self.last_sync() < self.ttl:
+            return self.count()
+        watermark = self._meta("watermark")
+        if force or started - float(self._meta("last_crawl") or 0.0) >= self.full_ttl:
+            return self._full_sync(started)
+        if watermark is None:
+            # Users carry no updatedAt: wait for the next full crawl
+            self._set_meta(last_sync=str(started))
+            return self.count()
+        changed = self._changed_since(watermark)
+        if changed is None:
+            return self._full_sync(started)  # not sortable by updatedAt here
+        gone = [u for u in changed if u.get("deletedAt")]
+        self._upsert([u for u in changed if not u.get("deletedAt")], started)
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM users WHERE key = ?", [(_row(u, started)[0],) for u in gone])
+        self._set_meta(last_sync=str(started), watermark=_watermark(changed))
+        return self.count()
+
+    def _full_sync(self, started: float) -> int:
+        users = self._crawl()
+        self._upsert(users, started)
+        with self._lock, self._db:
+            # Anything not seen in this crawl was removed upstream
+            self._db.execute("DELETE FROM users WHERE synced_at < ?", (started,))
+            self._db.execute("DELETE FROM meta WHERE key = 'watermark'")
+        self._set_meta(last_sync=str(started), last_crawl=str(started), watermark=_watermark(users))
+        return len(users)
+
+    def fetch_search(self, term: str) -> int:
+        """Store whatever the API's ``filter[search]`` returns for one term."""
+        users = self._fetch(0, search=term.strip()).get("data", [])
+        self._upsert(users, time.time())
+        return len(users)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def _query(self, sql: str, args: tuple) -> list:
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def find_by_email(self, email: str, refresh_on_miss: bool = True):
+        """User with exactly this email (case-insensitive) or None."""
+        found = self._query("SELECT data FROM users WHERE email_lc = ? LIMIT 1", (_lc(email),))
+        if not found and refresh_on_miss and self.fetch_search(email):
+            found = self._query("SELECT data FROM users WHERE email_lc = ? LIMIT 1", (_lc(email),))
+        return found[0] if found else None
+
+    def _search_local(self, term: str, limit: int) -> list:
+        # Prefix match (LIKE 'term%') as an index range scan: term <= column < term + U+10FFFF
+        upper = term + "\U0010ffff"
+        sql = " UNION ".join(
+            f"SELECT data, first_lc FROM users WHERE {col} >= ? AND {col} < ?" for col in SEARCH_COLUMNS
+        ) + " ORDER BY first_lc LIMIT ?"
+        found = self._query(sql, (term, upper) * len(SEARCH_COLUMNS) + (limit,))
+        if found:
+            return found
+        # Substring match like the API's filter[search]; a full scan, so only on a prefix miss
+        sql = ("SELECT data FROM users WHERE "
+               + " OR ".join(f"instr({col}, ?) > 0" for col in SEARCH_COLUMNS)
+               + " ORDER BY first_lc LIMIT ?")
+        return self._query(sql, (term,) * len(SEARCH_COLUMNS) + (limit,))
+
+    def search(self, term: str, limit: int = SEARCH_LIMIT, refresh_on_miss: bool = True) -> list:
+        """Users whose username, email or name starts with ``term``, else contains it."""
+        term = _lc(term)
+        if not term:
+            return []
+        found = self._search_local(term, limit)
+        if not found and refresh_on_miss and self.fetch_search(term):
+            found = self._search_local(term, limit)
+        return found
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror(session=None, headers=None, cookies=None) -> UserMirror:
+    """Process-wide mirror, synced on first use if older than the TTL."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = UserMirror(session=session, headers=headers, cookies=cookies)
+            _mirror.sync()
+        return _mirror